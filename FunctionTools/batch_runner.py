@@ -0,0 +1,238 @@
+"""
+Headless batch runner for researching many companies without the Streamlit UI.
+
+Reads one research run per row from a CSV or JSONL file, executes
+``common_structure`` for the rows with bounded concurrency and appends one JSON
+line per finished row to the output file as soon as it completes. Rows already
+recorded as completed in the output file are skipped, so an interrupted batch
+is resumed by running the same command again; failed rows are retried.
+
+Input columns / keys:
+    id (optional): Stable row identifier; defaults to a hash of the row's fields
+    company_name, country, prompt (required)
+    search_queries: List, or queries separated by "/" as in the Streamlit form
+    support_urls: List, or URLs separated by ","
+    enable_validation (optional): true/false, defaults to true
+    max_cost, max_seconds, max_calls (optional): Budget of the run, see common_structure
+
+Before executing, the batch's estimated calls, wall time and cost are printed;
+``--estimate`` prints the estimate of every pending row and exits.
+
+Usage:
+    python -m FunctionTools.batch_runner companies.csv --output results.jsonl --workers 4
+    python -m FunctionTools.batch_runner companies.csv --estimate
+"""
+from FunctionTools.estimator import estimate_batch, format_duration
+from FunctionTools.timings import percentile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List
+import traceback
+import argparse
+import hashlib
+import json
+import time
+import csv
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def read_rows(path: str) -> List[Dict]:
+    """
+    Read research runs from a CSV or JSONL file
+
+    Args:
+        path: Input file; ``.jsonl``/``.json`` files are read as JSON lines, anything else as CSV
+
+    Returns:
+        list: Normalised rows with an ``id``
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".json")):
+            raw_rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            raw_rows = list(csv.DictReader(f))
+
+    rows = []
+    for line_number, raw in enumerate(raw_rows, start=1):
+        company_name = (raw.get("company_name") or "").strip()
+        country = (raw.get("country") or "").strip()
+        prompt = raw.get("prompt") or ""
+        if not company_name or not country or not prompt.strip():
+            print(f"Skipping row {line_number}: company_name, country and prompt are required.")
+            continue
+        row = {
+            "company_name": company_name,
+            "country": country,
+            "prompt": prompt,
+            "search_queries": _split(raw.get("search_queries"), "/"),
+            "support_urls": _split(raw.get("support_urls"), ","),
+            "enable_validation": str(raw.get("enable_validation", "true")).strip().lower() not in ("false", "0", "no")
+        }
+        row["id"] = str(raw.get("id") or "").strip() or _row_id(row)
+        # Budgets are not part of the id, so a completed row is not run again under a new budget
+        row.update({"max_cost": _number(raw.get("max_cost"), float),
+                    "max_seconds": _number(raw.get("max_seconds"), float),
+                    "max_calls": _number(raw.get("max_calls"), int)})
+        rows.append(row)
+    return rows
+
+
+def _split(value, separator: str):
+    """Turn a list or a separated string into a list, or None when empty"""
+    if not value:
+        return None
+    if isinstance(value, list):
+        return value
+    parts = [part.strip() for part in str(value).split(separator) if part.strip()]
+    return parts or None
+
+
+def _number(value, cast):
+    """A number from a CSV cell or JSON value, or None when empty"""
+    if value is None or str(value).strip() == "":
+        return None
+    return cast(value)
+
+
+def _row_id(row: Dict) -> str:
+    payload = json.dumps(row, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def completed_ids(output_path: str) -> set:
+    """Ids of the rows already recorded as completed in an output file"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A partially written last line from an interrupted batch
+                continue
+            if record.get("status") == "completed":
+                done.add(record["id"])
+    return done
+
+
+def run_row(row: Dict) -> Dict:
+    """Execute one research run and return its output record"""
+    # Pipeline modules build API clients at import time, so load them only when a run is executed
+    from FunctionTools.version_one.common import common_structure
+
+    started = time.time()
+    record = {"id": row["id"], "company_name": row["company_name"], "country": row["country"], "started_at": started}
+    try:
+        result = common_structure(company_name=row["company_name"],
+                                  country=row["country"],
+                                  search_queries=row["search_queries"],
+                                  prompt=row["prompt"],
+                                  support_urls=row["support_urls"],
+                                  enable_validation=row["enable_validation"],
+                                  max_cost=row["max_cost"],
+                                  max_seconds=row["max_seconds"],
+                                  max_calls=row["max_calls"])
+        final_data = result.get("final_data", {})
+        record.update({
+            "status": "completed",
+            "elapsed_seconds": round(time.time() - started, 2),
+            "cost": round(final_data.get("total_cost", 0) + final_data.get("llm_total_cost", 0), 6),
+            "tokens": final_data.get("total_tokens", 0),
+            "result": result
+        })
+    except Exception as e:
+        traceback.print_exc()
+        record.update({"status": "failed", "elapsed_seconds": round(time.time() - started, 2), "error": str(e)})
+    return record
+
+
+def run_batch(rows: List[Dict], output_path: str, workers: int) -> List[Dict]:
+    """
+    Execute rows concurrently, appending each record to the output file as it finishes
+
+    Returns:
+        list: Records produced in this invocation
+    """
+    records = []
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers,
+                                                                           thread_name_prefix="batch-run") as executor:
+        futures = {executor.submit(run_row, row): row for row in rows}
+        for finished, future in enumerate(as_completed(futures), start=1):
+            record = future.result()
+            out.write(json.dumps(record, default=str) + "\n")
+            out.flush()
+            records.append(record)
+            print(f"[{finished}/{len(rows)}] {record['status']}: {record['company_name']} ({record['country']}) "
+                  f"in {record['elapsed_seconds']:.1f}s")
+    return records
+
+
+def print_summary(records: List[Dict], skipped: int, wall_seconds: float) -> None:
+    completed = [r for r in records if r["status"] == "completed"]
+    failed = [r for r in records if r["status"] == "failed"]
+    latencies = [r["elapsed_seconds"] for r in completed]
+    total_cost = sum(r["cost"] for r in completed)
+
+    print("\n==== Batch summary ====")
+    print(f"Rows executed:        {len(records)} ({len(completed)} completed, {len(failed)} failed, {skipped} skipped)")
+    print(f"Wall time:            {wall_seconds:.1f}s")
+    print(f"Throughput:           {len(completed) / wall_seconds * 60 if wall_seconds else 0:.2f} rows/min")
+    print(f"Total cost:           ${total_cost:.4f}")
+    print(f"Cost per row:         ${total_cost / len(completed) if completed else 0:.4f}")
+    print(f"Provider tokens:      {sum(r['tokens'] for r in completed)}")
+    print(f"Latency p50/p90/p99:  {percentile(latencies, 50):.1f}s / {percentile(latencies, 90):.1f}s / "
+          f"{percentile(latencies, 99):.1f}s (max {max(latencies, default=0):.1f}s)")
+
+
+def print_estimate(rows: List[Dict], estimate: Dict, per_row: bool) -> None:
+    if per_row:
+        print(f"{'row':<18}{'company':<30}{'validation':>11}{'perplexity':>11}{'tavily':>8}{'llm':>6}"
+              f"{'time':>10}{'cost ($)':>10}")
+        for row, run in zip(rows, estimate["runs"]):
+            print(f"{row['id'][:16]:<18}{row['company_name'][:28]:<30}{str(row['enable_validation']):>11}"
+                  f"{run['calls']['perplexity']:>11}{run['calls']['tavily']:>8}{run['calls']['llm']:>6}"
+                  f"{format_duration(run['wall_seconds']):>10}{run['cost']:>10.4f}")
+        print()
+    calls = estimate["calls"]
+    basis = f"history of {estimate['history_runs']} runs" if estimate["history_runs"] else "default call statistics"
+    print(f"Estimate: {calls['perplexity']} Perplexity, {calls['tavily']} Tavily and {calls['llm']} LLM calls, "
+          f"about {format_duration(estimate['wall_seconds'])} and ${estimate['cost']:.2f} (from {basis}).")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Research companies listed in a CSV or JSONL file")
+    parser.add_argument("input", help="CSV or JSONL file with one research run per row")
+    parser.add_argument("--output", "-o", default="research_results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("RESEARCH_MAX_WORKERS", 3)),
+                        help="Runs executed at once")
+    parser.add_argument("--limit", type=int, default=None, help="Execute at most this many pending rows")
+    parser.add_argument("--estimate", action="store_true",
+                        help="Print the estimated calls, time and cost of each pending row and exit")
+    args = parser.parse_args()
+
+    rows = read_rows(args.input)
+    done = completed_ids(args.output)
+    pending = [row for row in rows if row["id"] not in done]
+    skipped = len(rows) - len(pending)
+    if args.limit is not None:
+        pending = pending[:args.limit]
+
+    estimate = estimate_batch(pending, workers=args.workers)
+    if args.estimate:
+        print(f"{len(rows)} rows read, {skipped} already completed, {len(pending)} pending with {args.workers} workers.\n")
+        print_estimate(pending, estimate, per_row=True)
+        return
+
+    print(f"{len(rows)} rows read, {skipped} already completed, executing {len(pending)} with {args.workers} workers.")
+    if pending:
+        print_estimate(pending, estimate, per_row=False)
+    started = time.perf_counter()
+    records = run_batch(pending, args.output, args.workers) if pending else []
+    print_summary(records, skipped, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Per-run cost, wall time and call budgets.
+
+A ``RunBudget`` is a progress listener for the duration of a run that adds up
+the run's external calls and their cost. Before optional or open-ended work
+the pipeline asks it how much of that work still fits with ``take``, which
+prices the work with the estimator's per-call latency and cost statistics and
+keeps back what the run's essential remaining calls (synthesis, the final
+answer, support extraction) are expected to need. Work that does not fit is
+skipped and listed in ``summary``, stored as ``final_data["budget"]``:
+
+    limits     max_cost, max_seconds, max_calls (None when unlimited)
+    spent      cost, seconds and calls used by the run
+    skipped    {phase, item, planned, kept, limit} for every piece of work cut short
+    exceeded   limits the finished run went over, e.g. because the final answer always runs
+
+Lower-value work comes last in the pipeline, so it is cut first: claims stop
+being validated before targeted research is trimmed, and the initial research
+always keeps at least one query. Limits default to RESEARCH_BUDGET_MAX_COST,
+RESEARCH_BUDGET_MAX_SECONDS and RESEARCH_BUDGET_MAX_CALLS (see ``from_env``);
+unset means unlimited, in which case every check passes without pricing anything.
+"""
+from FunctionTools.estimator import call_stats, get_run_history
+from FunctionTools import progress
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import contextvars
+import threading
+import logging
+import sqlite3
+import math
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+_current_budget = contextvars.ContextVar("run_budget", default=None)
+
+
+def _env_limit(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+class RunBudget:
+    """
+    Cost, wall time and call limits of one research run; None leaves a limit off
+
+    Args:
+        max_cost: Maximum USD spent on Perplexity and LLM calls
+        max_seconds: Maximum wall time in seconds
+        max_calls: Maximum external calls; cached LLM responses do not count
+    """
+
+    def __init__(self, max_cost: float = None, max_seconds: float = None, max_calls: int = None):
+        self.max_cost = max_cost
+        self.max_seconds = max_seconds
+        self.max_calls = int(max_calls) if max_calls is not None else None
+        self.started = time.perf_counter()
+        self.cost = 0.0
+        self.calls = 0
+        self.skipped: List[Dict] = []
+        self._reserved: Dict[str, int] = {}
+        self._stats = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, max_cost: float = None, max_seconds: float = None, max_calls: int = None) -> "RunBudget":
+        """Budget with the given limits, defaulting to RESEARCH_BUDGET_MAX_COST/_SECONDS/_CALLS"""
+        return cls(max_cost=max_cost if max_cost is not None else _env_limit("RESEARCH_BUDGET_MAX_COST"),
+                   max_seconds=max_seconds if max_seconds is not None else _env_limit("RESEARCH_BUDGET_MAX_SECONDS"),
+                   max_calls=max_calls if max_calls is not None else _env_limit("RESEARCH_BUDGET_MAX_CALLS"))
+
+    @property
+    def limited(self) -> bool:
+        return any(limit is not None for limit in (self.max_cost, self.max_seconds, self.max_calls))
+
+    def __call__(self, event: Dict) -> None:
+        event_type = event["type"]
+        if event_type in (progress.QUERY_COMPLETED, progress.QUERY_FAILED):
+            kind = event["provider"]
+        elif event_type == progress.LLM_CALL and not event["cache_hit"]:
+            kind = f"llm:{event['phase']}"
+        else:
+            return
+        with self._lock:
+            self.calls += 1
+            self.cost += event.get("cost") or 0.0
+            # A reserved call has now been made
+            if self._reserved.get(kind):
+                self._reserved[kind] -= 1
+
+    def reserve(self, calls: Dict[str, int]) -> None:
+        """Keep back budget for essential calls the run will make later, by kind (see estimator)"""
+        with self._lock:
+            for kind, count in calls.items():
+                self._reserved[kind] = self._reserved.get(kind, 0) + count
+
+    def release(self, kind: str) -> None:
+        """Give back the reservation of a call the run will not make after all"""
+        with self._lock:
+            self._reserved[kind] = max(self._reserved.get(kind, 0) - 1, 0)
+
+    def take(self, phase: str, items: List, calls_per_item: Dict[str, int], item: str, minimum: int = 0) -> List:
+        """
+        The leading items whose calls still fit the budget when made together
+
+        The rest are recorded as skipped, so put the most valuable items first.
+
+        Args:
+            phase: Pipeline phase doing the work
+            items: Planned work whose Perplexity queries are queued at once, e.g. a phase's queries
+            calls_per_item: Calls each item makes, by kind ("perplexity", "tavily_extract", "llm:<phase>")
+            item: What the items are, for the summary
+            minimum: Items kept even when they do not fit
+
+        Returns:
+            list: The items to do
+        """
+        if not self.limited:
+            return items
+        kept, limit = len(items), None
+        while kept > minimum:
+            exceeded = self.check({kind: count * kept for kind, count in calls_per_item.items()})
+            if exceeded is None:
+                break
+            limit = limit or exceeded
+            kept -= 1
+        if kept < len(items):
+            self.skip(phase, item, planned=len(items), kept=kept, limit=limit)
+        return items[:kept]
+
+    def allows(self, phase: str, calls: Dict[str, int], item: str) -> bool:
+        """Whether an optional step fits the budget; a step that does not is recorded as skipped"""
+        limit = self.check(calls)
+        if limit is not None:
+            self.skip(phase, item, planned=1, kept=0, limit=limit)
+        return limit is None
+
+    def allows_reserved(self, phase: str, kind: str, item: str) -> bool:
+        """Whether a reserved step still fits the budget; one that does not is skipped and its reservation released"""
+        allowed = self.allows(phase, {}, item)
+        if not allowed:
+            self.release(kind)
+        return allowed
+
+    def check(self, calls: Dict[str, int]) -> Optional[str]:
+        """The first limit ("calls", "cost" or "seconds") the calls plus the reserved ones would exceed, or None"""
+        if not self.limited:
+            return None
+        return self._exceeded(calls)
+
+    def skip(self, phase: str, item: str, planned: int, kept: int, limit: str) -> None:
+        """Record work left out to stay within a limit"""
+        with self._lock:
+            self.skipped.append({"phase": phase, "item": item, "planned": planned, "kept": kept, "limit": limit})
+        logger.info("Budget %s limit: %s keeps %d of %d %s", limit, phase, kept, planned, item)
+
+    def _exceeded(self, calls: Dict[str, int]) -> Optional[str]:
+        with self._lock:
+            reserved = dict(self._reserved)
+            spent_cost, spent_calls = self.cost, self.calls
+        stats = self._call_stats()
+        needed = {kind: calls.get(kind, 0) + reserved.get(kind, 0) for kind in {**calls, **reserved}}
+
+        if self.max_calls is not None and spent_calls + sum(needed.values()) > self.max_calls:
+            return "calls"
+        if self.max_cost is not None:
+            cost = sum(count * stats.get(kind, {}).get("cost", 0.0) for kind, count in needed.items())
+            if spent_cost + cost > self.max_cost:
+                return "cost"
+        if self.max_seconds is not None:
+            seconds = self._seconds(calls, stats) + self._seconds(reserved, stats)
+            if time.perf_counter() - self.started + seconds > self.max_seconds:
+                return "seconds"
+        return None
+
+    @staticmethod
+    def _seconds(calls: Dict[str, int], stats: Dict[str, Dict]) -> float:
+        """Expected wall time of a phase's calls: Perplexity queries share the query slots, the rest run in turn"""
+        slots = int(os.getenv("PPLX_MAX_CONCURRENCY", 4))
+        seconds = 0.0
+        for kind, count in calls.items():
+            latency = stats.get(kind, {}).get("latency", 0.0)
+            seconds += latency * (math.ceil(count / slots) if kind == "perplexity" else count)
+        return seconds
+
+    def _call_stats(self) -> Dict[str, Dict]:
+        if self._stats is None:
+            try:
+                history = get_run_history().runs()
+            except sqlite3.Error as e:
+                logger.warning("Run history unavailable, budgeting with default call statistics: %s", e)
+                history = []
+            self._stats = call_stats(history)
+        return self._stats
+
+    def summary(self) -> Dict:
+        """The budget section of the run's final_data"""
+        seconds = time.perf_counter() - self.started
+        with self._lock:
+            spent = {"cost": round(self.cost, 6), "seconds": round(seconds, 1), "calls": self.calls}
+            skipped = list(self.skipped)
+        limits = {"max_cost": self.max_cost, "max_seconds": self.max_seconds, "max_calls": self.max_calls}
+        exceeded = [name for name, limit, used in (("cost", self.max_cost, spent["cost"]),
+                                                   ("seconds", self.max_seconds, spent["seconds"]),
+                                                   ("calls", self.max_calls, spent["calls"]))
+                    if limit is not None and used > limit]
+        return {"limits": limits, "spent": spent, "skipped": skipped, "exceeded": exceeded}
+
+
+@contextmanager
+def run_budget(budget: RunBudget):
+    """Make budget the one ``current()`` returns inside the block and count the run's calls against it"""
+    token = _current_budget.set(budget)
+    try:
+        with progress.progress_listener(budget):
+            yield budget
+    finally:
+        _current_budget.reset(token)
+
+
+def current() -> RunBudget:
+    """The budget of the run executing in this context, or an unlimited one outside a run"""
+    budget = _current_budget.get()
+    return budget if budget is not None else RunBudget()
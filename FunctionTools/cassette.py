@@ -0,0 +1,263 @@
+"""
+Record-and-replay of the pipeline's external calls.
+
+With RESEARCH_CASSETTE_MODE=record, every Perplexity request made by
+``research()``, every Tavily search and extract and every LLM completion is
+appended to the cassette at RESEARCH_CASSETTE_PATH (default
+research_cassette.jsonl.gz), one gzip-compressed JSON line per call:
+
+    provider   perplexity, tavily, tavily_extract or azure_openai
+    key        hash of the request the call is matched on
+    label      start of the request, for reading the cassette and for miss errors
+    at         seconds from the start of the recording to the start of the call
+    latency    seconds the call took; streamed completions add first_chunk
+    response   the JSON-able response, or error with the type and message of a failure
+
+With RESEARCH_CASSETTE_MODE=replay the same calls are answered from the
+cassette without touching the network or needing API keys. Each call waits
+for its recorded latency times RESEARCH_CASSETTE_LATENCY_SCALE (default 1, 0
+replays instantly) and recorded failures are raised again, so a run replays
+with its original, or proportionally scaled, timing and outcome.
+
+Identical requests are replayed in recording order, the last recording being
+repeated once they are used up. A request the cassette does not contain raises
+CassetteMissError rather than reaching the provider.
+"""
+from langchain_core.messages import AIMessage, AIMessageChunk
+from elsai_core.model.llm_cache import _message_pairs
+from collections import deque
+from typing import Callable, Dict, Iterator
+import threading
+import hashlib
+import logging
+import atexit
+import json
+import gzip
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+OFF = "off"
+RECORD = "record"
+REPLAY = "replay"
+
+# Stands in for API keys the clients require at construction when replaying
+REPLAY_API_KEY = "cassette-replay"
+
+# Content pieces a replayed streamed completion is split into
+REPLAY_STREAM_CHUNKS = 20
+
+
+class CassetteMissError(LookupError):
+    """The replayed cassette has no recording of a request."""
+
+
+class RecordedError(Exception):
+    """A failure recorded in the cassette, raised again on replay."""
+
+
+class Cassette:
+    """
+    Records the pipeline's external calls to a cassette file, or replays them from it.
+
+    Args:
+        mode: "record", "replay" or "off"
+        path: Cassette file
+        latency_scale: Factor applied to recorded latencies on replay
+    """
+
+    def __init__(self, mode: str = OFF, path: str = None, latency_scale: float = 1.0):
+        if mode not in (OFF, RECORD, REPLAY):
+            raise ValueError(f"Unknown RESEARCH_CASSETTE_MODE '{mode}'. Use record, replay or off.")
+        self.mode = mode
+        self.path = path or "research_cassette.jsonl.gz"
+        self.latency_scale = latency_scale
+        self.started = time.perf_counter()
+        self._recordings: Dict[tuple, deque] = {}
+        self._file = None
+        self._lock = threading.Lock()
+        if mode == REPLAY:
+            self._load()
+        elif mode == RECORD:
+            self._file = gzip.open(self.path, "at", encoding="utf-8")
+            atexit.register(self.close)
+            logger.info("Recording external calls to %s", self.path)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def call(self, provider: str, request, fn: Callable, encode: Callable = None, decode: Callable = None):
+        """
+        Make a call, recording it or serving it from the cassette
+
+        Args:
+            provider: Provider label the call is recorded under
+            request: JSON-able description of the request the call is matched on
+            fn: Makes the real call and returns its response
+            encode: Turns the response into JSON-able data (default: stored as is)
+            decode: Turns recorded data back into a response (default: returned as is)
+        """
+        if self.mode == OFF:
+            return fn()
+        key, label = _request_key(provider, request)
+        if self.mode == REPLAY:
+            recording = self._take(provider, key, label)
+            self._sleep(recording["latency"])
+            return _replayed(recording, decode)
+
+        at = time.perf_counter() - self.started
+        try:
+            response = fn()
+        except Exception as e:
+            self._write(provider, key, label, at, time.perf_counter() - self.started - at, error=e)
+            raise
+        self._write(provider, key, label, at, time.perf_counter() - self.started - at,
+                    response=encode(response) if encode else response)
+        return response
+
+    def stream(self, provider: str, input, fn: Callable[[], Iterator]) -> Iterator:
+        """
+        Stream a chat completion, recording it or replaying it from the cassette
+
+        A replayed completion yields its content in pieces spread over the
+        recorded latency, starting after the recorded time to first chunk.
+
+        Args:
+            provider: Provider label the call is recorded under
+            input: Chat model input the call is matched on
+            fn: Starts the real stream and returns its chunk iterator
+        """
+        if self.mode == OFF:
+            yield from fn()
+            return
+        key, label = _request_key(provider, llm_request(input))
+        if self.mode == REPLAY:
+            recording = self._take(provider, key, label)
+            first_chunk = recording.get("first_chunk", recording["latency"])
+            self._sleep(first_chunk)
+            if "error" in recording:
+                _replayed(recording, None)
+            message = recording["response"]
+            content = message["content"]
+            size = max(-(-len(content) // REPLAY_STREAM_CHUNKS), 1)
+            pieces = [content[start:start + size] for start in range(0, len(content), size)] or [""]
+            for index, piece in enumerate(pieces):
+                if index:
+                    self._sleep((recording["latency"] - first_chunk) / len(pieces))
+                last = index == len(pieces) - 1
+                yield AIMessageChunk(content=piece,
+                                     usage_metadata=message.get("usage_metadata") if last else None,
+                                     response_metadata=message.get("response_metadata", {}) if last else {})
+            return
+
+        at = time.perf_counter() - self.started
+        first_chunk = None
+        response = None
+        try:
+            for chunk in fn():
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - self.started - at
+                response = chunk if response is None else response + chunk
+                yield chunk
+        except Exception as e:
+            self._write(provider, key, label, at, time.perf_counter() - self.started - at, error=e)
+            raise
+        self._write(provider, key, label, at, time.perf_counter() - self.started - at,
+                    response=encode_message(response if response is not None else AIMessageChunk(content="")),
+                    first_chunk=round(first_chunk or 0.0, 4))
+
+    def close(self) -> None:
+        """Flush and close a cassette being recorded"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _write(self, provider: str, key: str, label: str, at: float, latency: float, response=None,
+               error: Exception = None, **extra) -> None:
+        entry = {"provider": provider, "key": key, "label": label, "at": round(at, 4), "latency": round(latency, 4),
+                 **extra}
+        if error is not None:
+            entry["error"] = {"type": type(error).__name__, "message": str(error)}
+        else:
+            entry["response"] = response
+        line = json.dumps(entry, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line)
+                # Keep what has been recorded readable if the process dies
+                self._file.flush()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette {self.path} not found. Record one with RESEARCH_CASSETTE_MODE=record.")
+        count = 0
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._recordings.setdefault((entry["provider"], entry["key"]), deque()).append(entry)
+                        count += 1
+        except (EOFError, json.JSONDecodeError):
+            logger.warning("Cassette %s ends in a truncated recording; replaying the first %d calls", self.path, count)
+        logger.info("Replaying %d recorded calls from %s", count, self.path)
+
+    def _take(self, provider: str, key: str, label: str) -> Dict:
+        with self._lock:
+            recordings = self._recordings.get((provider, key))
+            if not recordings:
+                raise CassetteMissError(f"Cassette {self.path} has no {provider} recording of: {label}")
+            return recordings.popleft() if len(recordings) > 1 else recordings[0]
+
+    def _sleep(self, seconds: float) -> None:
+        if self.latency_scale > 0 and seconds > 0:
+            time.sleep(seconds * self.latency_scale)
+
+
+def llm_request(input) -> Dict:
+    """The part of a chat model call a recording is matched on: its messages"""
+    return {"messages": _message_pairs(input)}
+
+
+def encode_message(message) -> Dict:
+    """JSON-able content, usage and metadata of a chat model response"""
+    return {"content": message.content,
+            "usage_metadata": dict(message.usage_metadata) if message.usage_metadata else None,
+            "response_metadata": message.response_metadata}
+
+
+def decode_message(data: Dict) -> AIMessage:
+    """The chat model response of a recording"""
+    return AIMessage(content=data["content"], usage_metadata=data.get("usage_metadata"),
+                     response_metadata=data.get("response_metadata") or {})
+
+
+def _request_key(provider: str, request) -> tuple:
+    text = json.dumps(request, sort_keys=True, default=str)
+    label = text if len(text) <= 160 else text[:157] + "..."
+    return hashlib.sha256(f"{provider}\n{text}".encode("utf-8")).hexdigest()[:32], label
+
+
+def _replayed(recording: Dict, decode: Callable):
+    if "error" in recording:
+        error = recording["error"]
+        raise RecordedError(f"{error['type']}: {error['message']}")
+    return decode(recording["response"]) if decode else recording["response"]
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Cassette:
+    """Returns the process-wide cassette configured by RESEARCH_CASSETTE_MODE, creating it on first use."""
+    global _cassette
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(mode=os.getenv("RESEARCH_CASSETTE_MODE", OFF).lower() or OFF,
+                                 path=os.getenv("RESEARCH_CASSETTE_PATH"),
+                                 latency_scale=float(os.getenv("RESEARCH_CASSETTE_LATENCY_SCALE", 1)))
+        return _cassette
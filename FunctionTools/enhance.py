@@ -1,4 +1,5 @@
 from FunctionTools.perplexity import process_perplexity_in_batches
+from FunctionTools import progress, budget
 from typing import List, Dict
 import json
 from dataclasses import dataclass
@@ -8,6 +9,9 @@ from dotenv import load_dotenv
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# Calls made to validate one claim
+CLAIM_VALIDATION_CALLS = {"perplexity": 3, "llm:claim_validation": 1}
+
 @dataclass
 class ValidationResult:
     is_valid: bool
@@ -26,23 +30,38 @@ class EnhancedDataCollector:
         self.perplexity_total_tokens = 0
         self.all_citations = []
         
+    def _invoke_llm(self, prompt: str, phase: str, company_name: str, country: str):
+        """Invoke the LLM with the pipeline phase attached so it can be routed and accounted for"""
+        metadata = {"phase": phase, "company_name": company_name, "country": country}
+        return self.llm.invoke(prompt, config={"metadata": metadata})
+        
     def collect_comprehensive_data_sync(self, company_name: str, country: str, 
                                       search_queries: List[str] = None) -> Dict:
         """Synchronous version of collect_comprehensive_data"""
         try:
         
-            initial_data = self._initial_research_phase_sync(company_name, country, search_queries)
+            with progress.phase("initial_research"):
+                initial_data = self._initial_research_phase_sync(company_name, country, search_queries)
             
-            # Phase 2: Gap identification and targeted research
-            gaps = self._identify_data_gaps_sync(initial_data, company_name, country)
-            targeted_data = self._targeted_research_phase_sync(gaps, company_name, country)
+            # Phase 2: Gap identification and targeted research, trimmed when the run's budget runs short
+            run_budget = budget.current()
+            with progress.phase("gap_identification"):
+                gaps = []
+                if run_budget.allows("gap_identification", {"llm:gap_identification": 1, "perplexity": 1},
+                                     item="gap analysis"):
+                    gaps = self._identify_data_gaps_sync(initial_data, company_name, country)
+            with progress.phase("targeted_research"):
+                gaps = run_budget.take("targeted_research", gaps, {"perplexity": 1}, item="gap queries")
+                targeted_data = self._targeted_research_phase_sync(gaps, company_name, country)
             
             # Phase 3: Data validation and refinement (simplified for sync)
-            validated_data = self._validation_phase_sync(initial_data, targeted_data, 
-                                                    company_name, country)
+            with progress.phase("validation"):
+                validated_data = self._validation_phase_sync(initial_data, targeted_data, 
+                                                        company_name, country)
             
             # Phase 4: Final synthesis
-            final_data = self._synthesis_phase_sync(validated_data, company_name, country)
+            with progress.phase("synthesis"):
+                final_data = self._synthesis_phase_sync(validated_data, company_name, country)
             
             return final_data
             
@@ -60,9 +79,7 @@ class EnhancedDataCollector:
             context_dict = process_perplexity_in_batches(
                 company_name=company_name,
                 country=country,
-                search_queries=search_queries,
-                batch_size=2,
-                delay_between_batches=2
+                search_queries=search_queries
             )
             
             context = context_dict['content']
@@ -101,7 +118,7 @@ class EnhancedDataCollector:
         Return only the search queries, one per line.
         """
         
-        response = self.llm.invoke(prompt)
+        response = self._invoke_llm(prompt, "gap_identification", company_name, country)
         gaps = [q.strip() for q in response.content.split('\n') if q.strip()]
         return gaps[:6]  # Limit to 6 additional queries
     
@@ -116,9 +133,7 @@ class EnhancedDataCollector:
             context_dict = process_perplexity_in_batches(
                 company_name=company_name,
                 country=country,
-                search_queries=gaps,
-                batch_size=2,
-                delay_between_batches=2
+                search_queries=gaps
             )
             targeted_context = context_dict['content']
             self.perplexity_total_tokens += context_dict['total_tokens']
@@ -135,16 +150,26 @@ class EnhancedDataCollector:
                              company_name: str, country: str) -> Dict:
         """Validate collected data using simplified validation (synchronous)"""
         
-        # Extract key claims for validation
-        all_content = initial_data.get('batch_results', '') + '\n' + targeted_data.get('targeted_results', '')
-        key_claims = self._extract_key_claims_sync(all_content, company_name, country)
+        # Extract key claims for validation, unless the run's budget cannot validate even one
+        run_budget = budget.current()
+        key_claims = []
+        if run_budget.allows("validation", {"llm:claim_extraction": 1, **CLAIM_VALIDATION_CALLS},
+                             item="claim validation"):
+            all_content = initial_data.get('batch_results', '') + '\n' + targeted_data.get('targeted_results', '')
+            key_claims = self._extract_key_claims_sync(all_content, company_name, country)
         
         # Simplified validation using direct research calls (no async)
         validation_results = {}
         context = {'company_name': company_name, 'country': country}
         
         # Limit validations to prevent overwhelming the system
-        for claim in key_claims[:10]:  # Validate top 10 claims only for sync version
+        claims = key_claims[:10]  # Validate top 10 claims only for sync version
+        for index, claim in enumerate(claims):
+            # Validation is the first work given up when the budget runs short
+            limit = run_budget.check(CLAIM_VALIDATION_CALLS)
+            if limit is not None:
+                run_budget.skip("validation", "claims", planned=len(claims), kept=index, limit=limit)
+                break
             try:
                 validation = self._validate_claim_sync(claim, context)
                 validation_results[claim] = validation
@@ -190,7 +215,7 @@ class EnhancedDataCollector:
         Return only the claims that needs to be validated, one per line.
         """
         
-        response = self.llm.invoke(prompt)
+        response = self._invoke_llm(prompt, "claim_extraction", company_name, country)
         claims = [claim.strip() for claim in response.content.split('\n') if claim.strip()]
         return claims[:10]  # Limit for sync version
     
@@ -211,9 +236,7 @@ class EnhancedDataCollector:
         context_dict = process_perplexity_in_batches(
             company_name=context.get('company_name'),
             country=context.get('country'),
-            search_queries=validation_queries,
-            batch_size=2,
-            delay_between_batches=2
+            search_queries=validation_queries
         )
         
         content = context_dict['content']
@@ -234,7 +257,8 @@ class EnhancedDataCollector:
             KEY_POINT: one sentence summary
             """
             
-            analysis = self.llm.invoke(analysis_prompt)
+            analysis = self._invoke_llm(analysis_prompt, "claim_validation",
+                                        context.get('company_name'), context.get('country'))
             analysis_content = analysis.content
             
             # Extract support score (simplified parsing)
@@ -317,7 +341,7 @@ class EnhancedDataCollector:
         Structure your response clearly with sections for validated findings, concerns, and recommendations.
         """
         
-        response = self.llm.invoke(prompt)
+        response = self._invoke_llm(prompt, "synthesis", company_name, country)
         
         return {
             'initial_data': str(validated_data['initial_data'])[:3000],
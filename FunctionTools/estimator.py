@@ -0,0 +1,295 @@
+"""
+Pre-flight estimate of the calls, wall time and cost of planned research runs.
+
+Every finished run is summarised into the run history (RESEARCH_HISTORY_PATH,
+default .research_history.sqlite3; the last RESEARCH_HISTORY_RUNS runs, default
+50, are kept): how many questions, gap queries and validated claims it had, and
+the calls, latency and cost of each kind of call. A kind is a provider
+(perplexity, tavily_extract) or ``llm:<phase>`` for LLM calls.
+
+``estimate_batch`` plans the calls of each run configuration the way the
+pipeline makes them, including validation mode, and prices them with the mean
+latency and cost per call of the history, falling back to DEFAULT_CALL_STATS
+for kinds never seen. Wall time follows the pipeline's phases: each phase
+waits for its calls, Perplexity queries share the PPLX_MAX_CONCURRENCY slots
+of the query scheduler with the other runs in flight, and runs are spread over
+the batch's workers.
+"""
+from FunctionTools.timings import LLM_PROVIDER
+from typing import Dict, List
+import threading
+import logging
+import sqlite3
+import math
+import json
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Questions generate_questions asks for when no search queries are given
+DEFAULT_QUESTIONS = 10
+# Limits of EnhancedDataCollector's gap identification and claim validation
+MAX_GAP_QUERIES = 6
+MAX_CLAIMS = 10
+VALIDATION_QUERIES_PER_CLAIM = 3
+
+# (mean latency seconds, mean USD cost) per call, used until the history has calls of a kind
+DEFAULT_CALL_STATS = {
+    "perplexity": (12.0, 0.008),
+    "tavily_extract": (8.0, 0.0),
+    "llm:question_generation": (4.0, 0.0003),
+    "llm:gap_identification": (3.0, 0.0003),
+    "llm:claim_extraction": (5.0, 0.0015),
+    "llm:claim_validation": (3.0, 0.0005),
+    "llm:synthesis": (20.0, 0.01),
+    "llm:final_answer": (40.0, 0.03),
+}
+
+
+class RunHistory:
+    """SQLite table of per-run call summaries the estimator learns from."""
+
+    def __init__(self, path: str = None, max_runs: int = None):
+        self.path = path or os.getenv("RESEARCH_HISTORY_PATH", ".research_history.sqlite3")
+        self.max_runs = int(max_runs if max_runs is not None else os.getenv("RESEARCH_HISTORY_RUNS", 50))
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS run_history ("
+                         "id INTEGER PRIMARY KEY AUTOINCREMENT, recorded_at REAL NOT NULL, "
+                         "validation INTEGER NOT NULL, data TEXT NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def record(self, final_data: Dict, enable_validation: bool) -> None:
+        """Add a finished run, given its final_data with timings, and drop the oldest beyond max_runs"""
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("INSERT INTO run_history (recorded_at, validation, data) VALUES (?, ?, ?)",
+                                 (time.time(), int(enable_validation), json.dumps(summarize_run(final_data))))
+                    conn.execute("DELETE FROM run_history WHERE id IN ("
+                                 "SELECT id FROM run_history ORDER BY id DESC LIMIT -1 OFFSET ?)", (self.max_runs,))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            # A run's results matter more than the estimator's history
+            logger.warning("Could not record the run in %s: %s", self.path, e)
+
+    def runs(self) -> List[Dict]:
+        """Summaries of the stored runs, with a ``validation`` flag, oldest first"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT validation, data FROM run_history ORDER BY id").fetchall()
+        finally:
+            conn.close()
+        return [{**json.loads(data), "validation": bool(validation)} for validation, data in rows]
+
+
+def summarize_run(final_data: Dict) -> Dict:
+    """Plan shape and per-kind calls, provider seconds and cost of a finished run"""
+    timings = final_data.get("timings") or {}
+    kinds = {}
+    phase_calls = {}
+    for call in timings.get("calls", []):
+        kind = f"llm:{call['label']}" if call["provider"] == LLM_PROVIDER else call["provider"]
+        stats = kinds.setdefault(kind, {"calls": 0, "uncached": 0, "seconds": 0.0, "cost": 0.0})
+        stats["calls"] += 1
+        # Cached responses say nothing about provider latency, so latency is averaged over the uncached calls
+        if not call["cache_hit"]:
+            stats["uncached"] += 1
+            stats["seconds"] += call["duration_seconds"]
+        if call["provider"] == "perplexity":
+            phase_calls[call["phase"]] = phase_calls.get(call["phase"], 0) + 1
+
+    if kinds.get("perplexity"):
+        kinds["perplexity"]["cost"] = final_data.get("total_cost", 0.0)
+    for phase, stats in (final_data.get("llm_phases") or {}).items():
+        if f"llm:{phase}" in kinds:
+            kinds[f"llm:{phase}"]["cost"] = stats.get("cost", 0.0)
+    return {
+        "questions": phase_calls.get("initial_research", 0),
+        "gap_queries": phase_calls.get("targeted_research", 0),
+        "claims": phase_calls.get("validation", 0) // VALIDATION_QUERIES_PER_CLAIM,
+        "kinds": kinds,
+    }
+
+
+def call_stats(history: List[Dict]) -> Dict[str, Dict]:
+    """
+    Mean latency and cost per call of each kind, from the history or DEFAULT_CALL_STATS
+
+    Latency is the mean of the uncached calls, the provider latency a call waits
+    for; cost is spread over all calls, cached ones costing nothing.
+    """
+    totals = {}
+    for run in history:
+        for kind, stats in run["kinds"].items():
+            total = totals.setdefault(kind, {"calls": 0, "uncached": 0, "seconds": 0.0, "cost": 0.0})
+            for field in ("calls", "seconds", "cost"):
+                total[field] += stats[field]
+            # Runs recorded before uncached calls were counted separately
+            total["uncached"] += stats.get("uncached", stats["calls"])
+
+    result = {}
+    for kind in {**DEFAULT_CALL_STATS, **totals}:
+        total = totals.get(kind)
+        if total and total["uncached"]:
+            result[kind] = {"latency": total["seconds"] / total["uncached"], "cost": total["cost"] / total["calls"],
+                            "source": "history"}
+        else:
+            latency, cost = DEFAULT_CALL_STATS.get(kind, (0.0, 0.0))
+            result[kind] = {"latency": latency, "cost": cost, "source": "default"}
+    return result
+
+
+def plan_calls(config: Dict, history: List[Dict] = ()) -> List[Dict]:
+    """
+    The phases of a run and the calls each one makes
+
+    Counts the pipeline does not know in advance (generated questions, gap
+    queries, claims) are the means of the history's runs, or the pipeline's
+    limits when it has none.
+
+    Args:
+        config: Run configuration with search_queries, support_urls and enable_validation (default True)
+        history: RunHistory.runs()
+
+    Returns:
+        list: {"phase", "calls": {kind: count}, "perplexity_batches": [queries per batch]} in execution order
+    """
+    validation = config.get("enable_validation", True)
+    enhanced_runs = [run for run in history if run["validation"]]
+
+    def mean(field: str, default: int, runs: List[Dict]) -> int:
+        values = [run[field] for run in runs if run[field]]
+        return round(sum(values) / len(values)) if values else default
+
+    phases = []
+    queries = config.get("search_queries")
+    if queries is None:
+        phases.append({"phase": "question_generation", "calls": {"llm:question_generation": 1},
+                       "perplexity_batches": []})
+    question_count = len(queries) if queries is not None else mean("questions", DEFAULT_QUESTIONS, history)
+    phases.append({"phase": "initial_research", "calls": {"perplexity": question_count},
+                   "perplexity_batches": [question_count]})
+
+    if validation:
+        gap_queries = min(mean("gap_queries", MAX_GAP_QUERIES, enhanced_runs), MAX_GAP_QUERIES)
+        claims = min(mean("claims", MAX_CLAIMS, enhanced_runs), MAX_CLAIMS)
+        phases.append({"phase": "gap_identification", "calls": {"llm:gap_identification": 1},
+                       "perplexity_batches": []})
+        phases.append({"phase": "targeted_research", "calls": {"perplexity": gap_queries},
+                       "perplexity_batches": [gap_queries]})
+        # Claims are validated one after the other, each with a batch of queries and an analysis
+        phases.append({"phase": "validation",
+                       "calls": {"llm:claim_extraction": 1, "perplexity": claims * VALIDATION_QUERIES_PER_CLAIM,
+                                 "llm:claim_validation": claims},
+                       "perplexity_batches": [VALIDATION_QUERIES_PER_CLAIM] * claims})
+        phases.append({"phase": "synthesis", "calls": {"llm:synthesis": 1}, "perplexity_batches": []})
+
+    if config.get("support_urls"):
+        phases.append({"phase": "support_extraction", "calls": {"tavily_extract": 1}, "perplexity_batches": []})
+    phases.append({"phase": "final_answer", "calls": {"llm:final_answer": 1}, "perplexity_batches": []})
+    return phases
+
+
+def estimate_run(config: Dict, stats: Dict[str, Dict], history: List[Dict] = (),
+                 query_slots: float = None) -> Dict:
+    """
+    Calls, wall time and cost of one run
+
+    Args:
+        config: Run configuration
+        stats: call_stats()
+        history: RunHistory.runs()
+        query_slots: Perplexity queries the run gets in flight at once (default: PPLX_MAX_CONCURRENCY)
+
+    Returns:
+        dict: calls {perplexity, tavily, llm}, phases {phase: seconds}, wall_seconds and cost
+    """
+    # Fewer than one slot means runs take turns, e.g. 0.5 doubles the rounds of queries
+    query_slots = query_slots or int(os.getenv("PPLX_MAX_CONCURRENCY", 4))
+    perplexity = stats["perplexity"]["latency"]
+    calls = {"perplexity": 0, "tavily": 0, "llm": 0}
+    phases = {}
+    cost = 0.0
+    for phase in plan_calls(config, history):
+        seconds = sum(perplexity * max(math.ceil(queries / query_slots), 1)
+                      for queries in phase["perplexity_batches"] if queries)
+        for kind, count in phase["calls"].items():
+            cost += count * stats[kind]["cost"]
+            if kind == "perplexity":
+                calls["perplexity"] += count
+                continue
+            calls["llm" if kind.startswith("llm:") else "tavily"] += count
+            seconds += count * stats[kind]["latency"]
+        phases[phase["phase"]] = round(seconds, 1)
+    return {"calls": calls, "phases": phases, "wall_seconds": round(sum(phases.values()), 1), "cost": round(cost, 4)}
+
+
+def estimate_batch(configs: List[Dict], workers: int = None, concurrency: int = None,
+                   history: "RunHistory" = None) -> Dict:
+    """
+    Estimate a batch of runs before executing it
+
+    Args:
+        configs: Run configurations (company_name, country, search_queries, support_urls, enable_validation)
+        workers: Runs executed at once (default: RESEARCH_MAX_WORKERS or 3)
+        concurrency: Perplexity queries in flight across the batch (default: PPLX_MAX_CONCURRENCY or 4)
+        history: Run history to learn from (default: the shared one)
+
+    Returns:
+        dict: runs (one estimate per config), calls, wall_seconds, cost, history_runs and sources
+            ({kind: "history" or "default"})
+    """
+    workers = int(workers or os.getenv("RESEARCH_MAX_WORKERS", 3))
+    concurrency = int(concurrency or os.getenv("PPLX_MAX_CONCURRENCY", 4))
+    try:
+        runs = (history or get_run_history()).runs()
+    except sqlite3.Error as e:
+        logger.warning("Run history unavailable, estimating from defaults: %s", e)
+        runs = []
+    stats = call_stats(runs)
+
+    # Runs in flight together share the query scheduler's slots
+    in_flight = max(min(workers, len(configs)), 1)
+    estimates = [estimate_run(config, stats, runs, query_slots=concurrency / in_flight) for config in configs]
+
+    # Runs are taken in order by whichever worker frees up first
+    worker_loads = [0.0] * max(workers, 1)
+    for estimate in estimates:
+        worker_loads[worker_loads.index(min(worker_loads))] += estimate["wall_seconds"]
+
+    return {
+        "runs": estimates,
+        "calls": {kind: sum(estimate["calls"][kind] for estimate in estimates) for kind in ("perplexity", "tavily", "llm")},
+        "wall_seconds": round(max(worker_loads), 1) if estimates else 0.0,
+        "cost": round(sum(estimate["cost"] for estimate in estimates), 4),
+        "history_runs": len(runs),
+        "sources": {kind: kind_stats["source"] for kind, kind_stats in stats.items()},
+    }
+
+
+def format_duration(seconds: float) -> str:
+    """Seconds as e.g. "45s", "12m 05s" or "1h 03m" """
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_run_history() -> RunHistory:
+    """Returns the process-wide run history, creating it on first use."""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = RunHistory()
+        return _history
@@ -0,0 +1,178 @@
+from concurrent.futures import ThreadPoolExecutor
+from FunctionTools import progress
+from collections import OrderedDict
+from typing import Dict, List
+import traceback
+import threading
+import logging
+import time
+import uuid
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+class ResearchJobManager:
+    """
+    Process-wide background executor for batches of research runs.
+
+    Each saved run configuration becomes a job on a shared thread pool sized by
+    RESEARCH_MAX_WORKERS, so runs of a batch execute concurrently and outlive the
+    Streamlit script run (and browser session) that submitted them. Callers poll
+    ``get_batch`` for status, progress and the partially streamed report.
+    """
+
+    def __init__(self, max_workers: int = None, retention: int = None):
+        """
+        Args:
+            max_workers: Maximum number of runs executing at once (default: RESEARCH_MAX_WORKERS or 3)
+            retention: Number of finished batches kept for polling (default: RESEARCH_JOB_RETENTION or 20)
+        """
+        self.max_workers = int(max_workers or os.getenv("RESEARCH_MAX_WORKERS", 3))
+        self.retention = int(retention if retention is not None else os.getenv("RESEARCH_JOB_RETENTION", 20))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="research-run")
+        self._batches: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit_batch(self, states: List[Dict]) -> str:
+        """
+        Queue every run configuration of a batch
+
+        Args:
+            states: Saved run configurations (company_name, country, search_queries, prompt, support_urls, run_number)
+
+        Returns:
+            str: Batch id to poll with get_batch
+        """
+        batch_id = uuid.uuid4().hex[:12]
+        runs = [{
+            "run_number": state["run_number"],
+            "company_name": state["company_name"],
+            "country": state["country"],
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "partial_response": "",
+            "phase": None,
+            "cost_so_far": 0.0,
+            "queries_completed": 0,
+            "result": None
+        } for state in states]
+
+        with self._lock:
+            self._batches[batch_id] = {"batch_id": batch_id, "created_at": time.time(), "runs": runs}
+            self._evict_finished()
+
+        for run, state in zip(runs, states):
+            self._executor.submit(self._execute, run, state)
+        return batch_id
+
+    def _execute(self, run: Dict, state: Dict) -> None:
+        """Execute a single research run and store its result on the run entry"""
+        # Pipeline modules build API clients at import time, so load them only when a run is executed
+        from FunctionTools.version_one.common import common_structure
+
+        def append_token(token: str):
+            with self._lock:
+                run["partial_response"] += token
+
+        def record_progress(event: dict):
+            with self._lock:
+                run["cost_so_far"] = event.get("cost_so_far", run["cost_so_far"])
+                run["queries_completed"] = event.get("queries_completed", run["queries_completed"])
+                if event["type"] == progress.PHASE_STARTED:
+                    run["phase"] = event["phase"]
+
+        with self._lock:
+            run["status"] = "running"
+            run["started_at"] = time.time()
+
+        try:
+            result = common_structure(company_name=state.get('company_name'),
+                                      country=state.get('country'),
+                                      search_queries=state.get('search_queries'),
+                                      prompt=state.get('prompt'),
+                                      support_urls=state.get('support_urls'),
+                                      on_token=append_token,
+                                      on_progress=record_progress)
+            finished_at = time.time()
+            result_with_metadata = {
+                "run_number": run["run_number"],
+                "company_name": state['company_name'],
+                "country": state['country'],
+                "elapsed_minutes": (finished_at - run["started_at"]) / 60,
+                "result": result,
+                "support_urls": state.get('support_urls', [])
+            }
+            status = "completed"
+        except Exception as e:
+            traceback.print_exc()
+            finished_at = time.time()
+            result_with_metadata = {
+                "run_number": run["run_number"],
+                "company_name": state['company_name'],
+                "country": state['country'],
+                "elapsed_minutes": 0,
+                "error": str(e),
+                "result": None,
+                "state": state,
+                "support_urls": state.get('support_urls', [])
+            }
+            status = "failed"
+
+        with self._lock:
+            run["status"] = status
+            run["finished_at"] = finished_at
+            run["result"] = result_with_metadata
+
+    def get_batch(self, batch_id: str) -> Dict:
+        """
+        Snapshot of a batch's progress
+
+        Returns:
+            dict: Batch with per-run status, or None if the batch id is unknown
+        """
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                return None
+            runs = [dict(run) for run in batch["runs"]]
+        finished = [run for run in runs if run["status"] in ("completed", "failed")]
+        return {
+            "batch_id": batch_id,
+            "created_at": batch["created_at"],
+            "runs": runs,
+            "total": len(runs),
+            "finished": len(finished),
+            "done": len(finished) == len(runs)
+        }
+
+    def results(self, batch_id: str) -> List[Dict]:
+        """Results of the finished runs of a batch, in run order"""
+        batch = self.get_batch(batch_id)
+        if batch is None:
+            return []
+        return [run["result"] for run in batch["runs"] if run["result"] is not None]
+
+    def _evict_finished(self) -> None:
+        """Forget the oldest finished batches beyond the retention limit (caller holds the lock)"""
+        finished = [batch_id for batch_id, batch in self._batches.items()
+                    if all(run["status"] in ("completed", "failed") for run in batch["runs"])]
+        for batch_id in finished[:max(len(finished) - self.retention, 0)]:
+            del self._batches[batch_id]
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> ResearchJobManager:
+    """Returns the process-wide research job manager, creating it on first use."""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = ResearchJobManager()
+        return _job_manager
@@ -0,0 +1,316 @@
+"""
+In-process metrics registry with Prometheus text exposition.
+
+Counters, gauges and histograms are plain in-memory values guarded by a lock,
+so recording a sample costs a dict lookup and an addition. Processes that do
+not serve ``/metrics`` themselves (the research workers) periodically store a
+snapshot of their registry with ``MetricsSnapshotStore``; the API merges those
+snapshots into its own output so one scrape covers every process.
+"""
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+import threading
+import sqlite3
+import json
+import math
+import time
+import os
+
+# Seconds; covers cache hits through multi-minute research runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            values = [[list(key), value if not isinstance(value, list) else list(value)]
+                      for key, value in self._values.items()]
+        return {"kind": self.kind, "documentation": self.documentation,
+                "labelnames": list(self.labelnames), "values": values}
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # Per-bucket (non-cumulative) counts followed by the sum and the count
+            state = self._values.get(key)
+            if state is None:
+                state = [0] * (len(self.buckets) + 2)
+                self._values[key] = state
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> Dict:
+        snapshot = super().snapshot()
+        snapshot["buckets"] = list(self.buckets)
+        return snapshot
+
+
+class MetricsRegistry:
+    """Named metrics of a process plus collectors that refresh gauges before each export."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Register a function called before every snapshot, e.g. to set queue depth gauges"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """JSON-serialisable state of every metric"""
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collector in collectors:
+            collector()
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+
+def merge_snapshots(snapshots: List[Dict[str, Dict]]) -> Dict[str, Dict]:
+    """Sum counters, gauges and histograms with the same name and labels across snapshots"""
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "values": {}})
+            for key, value in metric["values"]:
+                key = tuple(key)
+                if isinstance(value, list):
+                    current = target["values"].get(key)
+                    target["values"][key] = value if current is None else [a + b for a, b in zip(current, value)]
+                else:
+                    target["values"][key] = target["values"].get(key, 0) + value
+    return merged
+
+
+def render(snapshots: List[Dict[str, Dict]]) -> str:
+    """Prometheus text exposition (format 0.0.4) of the merged snapshots"""
+    lines = []
+    for name, metric in sorted(merge_snapshots(snapshots).items()):
+        lines.append(f"# HELP {name} {metric['documentation']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        labelnames = metric["labelnames"]
+        for key, value in sorted(metric["values"].items()):
+            labels = [f'{label}="{_escape(part)}"' for label, part in zip(labelnames, key)]
+            if metric["kind"] != "histogram":
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric["buckets"], value):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + [_le(bound)])} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels + [_le(math.inf)])} {value[-1]}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(value[-2])}")
+            lines.append(f"{name}_count{_labels(labels)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def _labels(labels: List[str]) -> str:
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+def _le(bound: float) -> str:
+    return 'le="%s"' % _number(float(bound))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsSnapshotStore:
+    """
+    SQLite table of the latest metrics snapshot of each process.
+
+    Counters and histograms of every stored process are merged, so totals keep
+    growing across worker restarts; gauges are only taken from snapshots younger
+    than ``gauge_max_age`` seconds, so a stopped worker's in-flight values vanish.
+    Snapshots older than METRICS_SNAPSHOT_TTL_SECONDS are deleted.
+    """
+
+    def __init__(self, path: str, gauge_max_age: float = None):
+        self.path = path
+        interval = float(os.getenv("METRICS_SNAPSHOT_INTERVAL", 5))
+        self.gauge_max_age = gauge_max_age or 3 * interval
+        self.ttl_seconds = float(os.getenv("METRICS_SNAPSHOT_TTL_SECONDS", 24 * 3600))
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS metrics_snapshots ("
+                         "process TEXT PRIMARY KEY, pid INTEGER NOT NULL, updated_at REAL NOT NULL, data TEXT NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def save(self, process: str, snapshot: Dict) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO metrics_snapshots (process, pid, updated_at, data) "
+                             "VALUES (?, ?, ?, ?)", (process, os.getpid(), time.time(), json.dumps(snapshot)))
+        finally:
+            conn.close()
+
+    def load(self) -> List[Dict]:
+        """Snapshots stored by other processes, with stale gauges removed"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM metrics_snapshots WHERE updated_at < ?", (now - self.ttl_seconds,))
+                # The calling process's own registry is exported directly
+                rows = conn.execute("SELECT updated_at, data FROM metrics_snapshots WHERE pid != ?",
+                                    (os.getpid(),)).fetchall()
+        finally:
+            conn.close()
+
+        snapshots = []
+        for updated_at, data in rows:
+            snapshot = json.loads(data)
+            if now - updated_at > self.gauge_max_age:
+                snapshot = {name: metric for name, metric in snapshot.items() if metric["kind"] != "gauge"}
+            snapshots.append(snapshot)
+        return snapshots
+
+    def start_publishing(self, process: str, registry: "MetricsRegistry" = None, interval: float = None) -> None:
+        """Save the registry's snapshot every METRICS_SNAPSHOT_INTERVAL seconds from a daemon thread"""
+        registry = registry or REGISTRY
+        interval = float(interval or os.getenv("METRICS_SNAPSHOT_INTERVAL", 5))
+
+        def publish():
+            while True:
+                time.sleep(interval)
+                self.save(process, registry.snapshot())
+
+        threading.Thread(target=publish, name="metrics-publisher", daemon=True).start()
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to handle HTTP requests, per route and status.",
+    ("method", "route", "status"))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "HTTP requests being handled.")
+
+PROVIDER_REQUEST_DURATION = REGISTRY.histogram(
+    "provider_request_duration_seconds", "Latency of calls to external providers.", ("provider",))
+PROVIDER_REQUESTS = REGISTRY.counter(
+    "provider_requests_total", "Calls to external providers by outcome (success or error).", ("provider", "outcome"))
+PROVIDER_REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "provider_requests_in_flight", "Calls to external providers awaiting a response.", ("provider",))
+
+LLM_CACHE_REQUESTS = REGISTRY.counter(
+    "llm_cache_requests_total", "LLM calls by pipeline phase and cache result (hit, semantic_hit or miss).",
+    ("phase", "result"))
+
+RESEARCH_RUNS = REGISTRY.counter("research_runs_total", "Research runs by outcome (completed or failed).", ("outcome",))
+RESEARCH_RUN_DURATION = REGISTRY.histogram("research_run_duration_seconds", "Wall time of research runs.")
+RESEARCH_RUNS_IN_FLIGHT = REGISTRY.gauge("research_runs_in_flight", "Research runs executing.")
+
+QUERY_SCHEDULER_QUEUED = REGISTRY.gauge("query_scheduler_queued", "Provider queries waiting in the query scheduler.")
+QUERY_SCHEDULER_IN_FLIGHT = REGISTRY.gauge("query_scheduler_in_flight", "Provider queries executing on the query scheduler.")
+QUERY_SCHEDULER_WAIT = REGISTRY.histogram("query_scheduler_wait_seconds", "Time provider queries waited for a scheduler slot.")
+RESEARCH_JOBS = REGISTRY.gauge("research_jobs", "Research jobs in the service queue by status.", ("status",))
+
+
+@contextmanager
+def track_provider_call(provider: str):
+    """
+    Record in-flight count, latency and outcome of one call to an external provider
+
+    Exceptions count as errors. The block receives a dict whose ``outcome`` it can
+    set to "error" for failures reported without an exception, e.g. HTTP 5xx.
+    """
+    PROVIDER_REQUESTS_IN_FLIGHT.inc(provider=provider)
+    started = time.perf_counter()
+    call = {"outcome": "success"}
+    try:
+        yield call
+    except BaseException:
+        PROVIDER_REQUESTS.inc(provider=provider, outcome="error")
+        raise
+    else:
+        PROVIDER_REQUESTS.inc(provider=provider, outcome=call["outcome"])
+    finally:
+        PROVIDER_REQUEST_DURATION.observe(time.perf_counter() - started, provider=provider)
+        PROVIDER_REQUESTS_IN_FLIGHT.dec(provider=provider)
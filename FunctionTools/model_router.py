@@ -0,0 +1,239 @@
+from elsai_core.model.azure_openai_connector import AzureOpenAIConnector
+from elsai_core.model.llm_cache import (is_cache_hit, record_cache_usage, summarize_cache_usage, UNLABELLED_PHASE,
+                                        SIMILARITY_KEY)
+from elsai_core.model.hedging import HEDGED_KEY
+from FunctionTools.cassette import get_cassette, llm_request, encode_message, decode_message
+from FunctionTools.timings import LLM_PROVIDER
+from FunctionTools import progress, metrics, tracing
+from typing import Dict
+import threading
+import logging
+import json
+import time
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Pipeline phases that call the LLM and the tier of model each one needs
+PHASE_TIERS = {
+    "question_generation": "fast",
+    "gap_identification": "fast",
+    "claim_extraction": "fast",
+    "claim_validation": "fast",
+    "synthesis": "strong",
+    "final_answer": "strong",
+}
+
+# USD per 1M (input, output) tokens, keyed by deployment name; extend with LLM_PRICING
+MODEL_PRICING = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+}
+
+DEFAULT_DEPLOYMENT = "gpt-4o-mini"
+
+
+class ModelRouter:
+    """
+    Maps each pipeline phase to a configured Azure OpenAI deployment.
+
+    List-producing phases use LLM_FAST_DEPLOYMENT and synthesis phases use
+    LLM_STRONG_DEPLOYMENT; a single phase can be pinned with LLM_DEPLOYMENT_<PHASE>.
+    When a tier has a fallback (LLM_FAST_FALLBACK_DEPLOYMENT /
+    LLM_STRONG_FALLBACK_DEPLOYMENT) and the primary's smoothed latency exceeds
+    LLM_ROUTER_SLOW_SECONDS, calls go to the fallback until the primary has been
+    left alone for LLM_ROUTER_RECOVERY_SECONDS, after which it is tried again.
+    """
+
+    def __init__(self, connector: AzureOpenAIConnector = None):
+        self.connector = connector or AzureOpenAIConnector()
+        self.slow_seconds = float(os.getenv("LLM_ROUTER_SLOW_SECONDS", 20))
+        self.recovery_seconds = float(os.getenv("LLM_ROUTER_RECOVERY_SECONDS", 120))
+        self.smoothing = float(os.getenv("LLM_ROUTER_SMOOTHING", 0.3))
+        self.pricing = {**MODEL_PRICING, **{name: tuple(prices) for name, prices in
+                                            json.loads(os.getenv("LLM_PRICING", "{}")).items()}}
+        tiers = {
+            "fast": os.getenv("LLM_FAST_DEPLOYMENT", DEFAULT_DEPLOYMENT),
+            "strong": os.getenv("LLM_STRONG_DEPLOYMENT", DEFAULT_DEPLOYMENT),
+        }
+        tier_fallbacks = {
+            "fast": os.getenv("LLM_FAST_FALLBACK_DEPLOYMENT"),
+            "strong": os.getenv("LLM_STRONG_FALLBACK_DEPLOYMENT"),
+        }
+        self.routes = {}
+        self.fallbacks = {}
+        for phase, tier in PHASE_TIERS.items():
+            self.routes[phase] = os.getenv(f"LLM_DEPLOYMENT_{phase.upper()}", tiers[tier])
+            self.fallbacks[phase] = tier_fallbacks[tier]
+        self.routes[UNLABELLED_PHASE] = tiers["strong"]
+        self.fallbacks[UNLABELLED_PHASE] = tier_fallbacks["strong"]
+        self._latency = {}
+        self._last_sample = {}
+        self._lock = threading.Lock()
+
+    def deployment_for(self, phase: str) -> str:
+        """Returns the deployment that should serve the next call of a phase."""
+        phase = phase if phase in self.routes else UNLABELLED_PHASE
+        primary, fallback = self.routes[phase], self.fallbacks[phase]
+        if not fallback:
+            return primary
+        with self._lock:
+            slow = self._latency.get(primary, 0.0) > self.slow_seconds
+            resting = time.monotonic() - self._last_sample.get(primary, 0.0) < self.recovery_seconds
+        if slow and resting:
+            return fallback
+        return primary
+
+    def record_latency(self, deployment: str, seconds: float) -> None:
+        """Folds a call latency into the deployment's exponentially weighted average."""
+        with self._lock:
+            previous = self._latency.get(deployment)
+            self._latency[deployment] = seconds if previous is None else (
+                self.smoothing * seconds + (1 - self.smoothing) * previous)
+            self._last_sample[deployment] = time.monotonic()
+
+    def cost(self, deployment: str, input_tokens: int, output_tokens: int) -> float:
+        """Returns the USD cost of a call, or 0.0 for deployments without known pricing."""
+        input_price, output_price = self.pricing.get(deployment, (0.0, 0.0))
+        return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+    def llm_for(self, deployment: str):
+        """Returns the (shared) chat client of a deployment."""
+        return self.connector.connect_azure_open_ai(deployment)
+
+    def for_run(self) -> "RunLLM":
+        """Returns a per-run handle that routes calls and records their latency and cost."""
+        return RunLLM(self)
+
+
+class RunLLM:
+    """
+    Chat model handle for a single research run.
+
+    Each call is routed by the phase in ``config["metadata"]["phase"]``, and its
+    deployment, latency, tokens, cost and cache usage are accumulated per phase.
+    """
+
+    def __init__(self, router: ModelRouter):
+        self.router = router
+        self.phase_stats: Dict[str, Dict] = {}
+        self.cache_usage: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def invoke(self, input, config=None, **kwargs):
+        phase = ((config or {}).get("metadata") or {}).get("phase") or UNLABELLED_PHASE
+        deployment = self.router.deployment_for(phase)
+        with tracing.span("llm.invoke", phase=phase, deployment=deployment) as llm_span:
+            started = time.perf_counter()
+            metrics.PROVIDER_REQUESTS_IN_FLIGHT.inc(provider=LLM_PROVIDER)
+            try:
+                response = get_cassette().call(
+                    LLM_PROVIDER, llm_request(input),
+                    lambda: self.router.llm_for(deployment).invoke(input, config, **kwargs),
+                    encode=encode_message, decode=decode_message)
+            except Exception:
+                metrics.PROVIDER_REQUESTS.inc(provider=LLM_PROVIDER, outcome="error")
+                raise
+            finally:
+                metrics.PROVIDER_REQUESTS_IN_FLIGHT.dec(provider=LLM_PROVIDER)
+            self._record(phase, deployment, response, time.perf_counter() - started, llm_span)
+        return response
+
+    def stream(self, input, config=None, **kwargs):
+        """Streams a routed call, recording it once the last chunk has arrived."""
+        phase = ((config or {}).get("metadata") or {}).get("phase") or UNLABELLED_PHASE
+        deployment = self.router.deployment_for(phase)
+        # Not the current span: the caller's code runs between the chunks
+        with tracing.span("llm.stream", current=False, phase=phase, deployment=deployment) as llm_span:
+            started = time.perf_counter()
+            response = None
+            metrics.PROVIDER_REQUESTS_IN_FLIGHT.inc(provider=LLM_PROVIDER)
+            try:
+                for chunk in get_cassette().stream(
+                        LLM_PROVIDER, input, lambda: self.router.llm_for(deployment).stream(input, config, **kwargs)):
+                    response = chunk if response is None else response + chunk
+                    yield chunk
+            except Exception:
+                metrics.PROVIDER_REQUESTS.inc(provider=LLM_PROVIDER, outcome="error")
+                raise
+            finally:
+                metrics.PROVIDER_REQUESTS_IN_FLIGHT.dec(provider=LLM_PROVIDER)
+            if response is not None:
+                self._record(phase, deployment, response, time.perf_counter() - started, llm_span)
+
+    def _record(self, phase: str, deployment: str, response, latency: float, llm_span=None) -> None:
+        cache_hit = is_cache_hit(response)
+        if not cache_hit:
+            self.router.record_latency(deployment, latency)
+            metrics.PROVIDER_REQUEST_DURATION.observe(latency, provider=LLM_PROVIDER)
+            metrics.PROVIDER_REQUESTS.inc(provider=LLM_PROVIDER, outcome="success")
+            metrics.LLM_CACHE_REQUESTS.inc(phase=phase, result="miss")
+        else:
+            semantic = SIMILARITY_KEY in response.response_metadata
+            metrics.LLM_CACHE_REQUESTS.inc(phase=phase, result="semantic_hit" if semantic else "hit")
+        usage = (getattr(response, "usage_metadata", None) or {}) if not cache_hit else {}
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        cost = self.router.cost(deployment, input_tokens, output_tokens)
+        progress.emit(progress.LLM_CALL, phase=phase, deployment=deployment, latency_seconds=round(latency, 3),
+                      input_tokens=input_tokens, output_tokens=output_tokens, cost=cost, cache_hit=cache_hit)
+        if llm_span is not None:
+            tracing.set_attributes(llm_span, input_tokens=input_tokens, output_tokens=output_tokens, cost=cost,
+                                   cache_hit=cache_hit)
+        with self._lock:
+            record_cache_usage(self.cache_usage, phase, response)
+            stats = self.phase_stats.setdefault(phase, {
+                "deployments": [], "calls": 0, "latency_seconds": 0.0, "max_latency_seconds": 0.0,
+                "input_tokens": 0, "output_tokens": 0, "cost": 0.0, "fallback_calls": 0, "hedged_calls": 0
+            })
+            if deployment not in stats["deployments"]:
+                stats["deployments"].append(deployment)
+            stats["calls"] += 1
+            stats["latency_seconds"] += latency
+            stats["max_latency_seconds"] = max(stats["max_latency_seconds"], latency)
+            stats["input_tokens"] += input_tokens
+            stats["output_tokens"] += output_tokens
+            stats["cost"] += cost
+            if deployment != self.router.routes.get(phase, deployment):
+                stats["fallback_calls"] += 1
+            if response.response_metadata.get(HEDGED_KEY):
+                stats["hedged_calls"] += 1
+
+    def phase_summary(self) -> Dict[str, Dict]:
+        """Returns rounded per-phase latency, token and cost figures."""
+        with self._lock:
+            return {
+                phase: {**stats,
+                        "latency_seconds": round(stats["latency_seconds"], 2),
+                        "max_latency_seconds": round(stats["max_latency_seconds"], 2),
+                        "cost": round(stats["cost"], 6)}
+                for phase, stats in self.phase_stats.items()
+            }
+
+    def total_cost(self) -> float:
+        """Returns the LLM cost of the run so far."""
+        with self._lock:
+            return round(sum(stats["cost"] for stats in self.phase_stats.values()), 6)
+
+    def cache_summary(self) -> Dict[str, Dict]:
+        """Returns per-phase LLM cache hit rates."""
+        with self._lock:
+            return summarize_cache_usage(self.cache_usage)
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """Returns the process-wide model router, creating it on first use."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
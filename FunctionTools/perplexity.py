@@ -1,15 +1,19 @@
-from concurrent.futures import ThreadPoolExecutor
-import time
+from FunctionTools.query_scheduler import get_query_scheduler, current_queue_wait
+from FunctionTools.cassette import get_cassette
+from FunctionTools import progress, metrics, tracing
 import requests
 import traceback
+import time
 import os
 from typing import List, Dict, Any
 from dotenv import load_dotenv
 load_dotenv()
 
+PPLX_API_URL = "https://api.perplexity.ai/chat/completions"
+
 def research(text):
     try: 
-        url = "https://api.perplexity.ai/chat/completions"
+        url = os.getenv("PPLX_API_URL", PPLX_API_URL)
         
         payload = {
             "model": f"{os.getenv('PPLX_MODEL_NAME')}",
@@ -22,8 +26,14 @@ def research(text):
             "Content-Type": "application/json"
         }
 
-        response = requests.post(url, json=payload, headers=headers)
-        return response.json()
+        def post():
+            with metrics.track_provider_call("perplexity") as call:
+                response = requests.post(url, json=payload, headers=headers)
+                if response.status_code >= 400:
+                    call["outcome"] = "error"
+            return response.json()
+
+        return get_cassette().call("perplexity", {"text": text}, post)
     except Exception as e:
         traceback.print_exc()
         raise Exception(f"Error in deep_research: {e}")
@@ -31,13 +41,16 @@ def research(text):
     
 def process_perplexity_in_batches(company_name: str, country: str, search_queries: List[str], batch_size: int=2, delay_between_batches: int=2) -> Dict[str, Any]:
     """
-    Process Perplexity queries in batches with threading
+    Process Perplexity queries on the shared query scheduler
+    
+    All queries are queued at once on the process-wide QueryScheduler, which
+    bounds provider concurrency (PPLX_MAX_CONCURRENCY) across every active run.
     
     Args:
         company_name: Company name to search for
         search_queries: List of search queries
-        batch_size: Number of queries to process simultaneously (default: 4)
-        delay_between_batches: Seconds to wait between batches (default: 2)
+        batch_size: Unused, kept for backwards compatibility; concurrency is set by PPLX_MAX_CONCURRENCY
+        delay_between_batches: Unused, kept for backwards compatibility
     
     Returns:
         str: Combined results from all queries
@@ -47,21 +60,27 @@ def process_perplexity_in_batches(company_name: str, country: str, search_querie
     
     def single_query(query, company_name, country):
         """Execute a single query"""
+        started = time.perf_counter()
         try:
-            print(f"Searching: {query}")
-            
-            perplexity_result = research(f"For {company_name} company located in {country}, Answer the following Question in detail: \n{query}.")
-            
-            content = perplexity_result['choices'][0]['message']['content']
-            tokens = perplexity_result['usage']['total_tokens']
-            cost = perplexity_result['usage']['cost']['total_cost']
-            source = perplexity_result['citations']
+            with tracing.span("perplexity.query", provider="perplexity", phase=progress.current_phase(),
+                              query=query) as query_span:
+                perplexity_result = research(f"For {company_name} company located in {country}, Answer the following Question in detail: \n{query}.")
+                
+                content = perplexity_result['choices'][0]['message']['content']
+                tokens = perplexity_result['usage']['total_tokens']
+                cost = perplexity_result['usage']['cost']['total_cost']
+                source = perplexity_result['citations']
+                tracing.set_attributes(query_span, tokens=tokens, cost=cost, citations=len(source))
             
-            print(f"✓ Completed: {query}")
+            progress.emit(progress.QUERY_COMPLETED, provider="perplexity", query=query, tokens=tokens, cost=cost,
+                          latency_seconds=round(time.perf_counter() - started, 3),
+                          queue_wait_seconds=round(current_queue_wait(), 3))
             return {'content': content, 'tokens': tokens, 'cost': cost, 'source': source} 
             
         except Exception as e:
-            print(f"✗ ERROR in query '{query}': {e}")
+            progress.emit(progress.QUERY_FAILED, provider="perplexity", query=query, error=str(e),
+                          latency_seconds=round(time.perf_counter() - started, 3),
+                          queue_wait_seconds=round(current_queue_wait(), 3))
             raise RuntimeError(f"Error in query '{query}': {e}")
     
     all_results = ""
@@ -70,32 +89,24 @@ def process_perplexity_in_batches(company_name: str, country: str, search_querie
     citations = []
     total_queries = len(search_queries)
     
-    # Process queries in batches
-    for i in range(0, total_queries, batch_size):
-        batch = search_queries[i:i + batch_size]
-        batch_num = (i // batch_size) + 1
-        
-        print(f"\n[BATCH {batch_num}] Processing {len(batch)} queries...")
-        
-        # Use ThreadPoolExecutor for current batch
-        with ThreadPoolExecutor(max_workers=len(batch)) as executor:
-            # Submit all queries in current batch
-            futures = [executor.submit(single_query, query, company_name, country) for query in batch]
-            
-            # Collect results as they complete
-            for future in futures:
-                result = future.result()
-                if result:  # Only add non-empty results
-                    all_results += result['content'] + "\n"
-                    total_tokens += result['tokens']
-                    total_cost += result['cost']
-                    citations.extend(result['source'])
-        
-        print(f"[BATCH {batch_num}] Completed!")
-        
-        # Wait before next batch (except for the last batch)
-        if i + batch_size < total_queries:
-            print(f"Waiting {delay_between_batches} seconds before next batch...")
-            time.sleep(delay_between_batches)
+    progress.emit(progress.QUERIES_QUEUED, provider="perplexity", count=total_queries)
+    
+    scheduler = get_query_scheduler()
+    futures = [scheduler.submit(single_query, query, company_name, country) for query in search_queries]
+    
+    # Collect results in query order
+    try:
+        for future in futures:
+            result = future.result()
+            if result:  # Only add non-empty results
+                all_results += result['content'] + "\n"
+                total_tokens += result['tokens']
+                total_cost += result['cost']
+                citations.extend(result['source'])
+    except Exception:
+        # Free the shared queue from the remaining queries of a failed call
+        for future in futures:
+            future.cancel()
+        raise
     
     return {"content": all_results, "total_tokens": total_tokens, "total_cost": total_cost, "citations": citations}
\ No newline at end of file
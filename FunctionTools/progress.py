@@ -0,0 +1,143 @@
+"""
+Structured progress events for research runs.
+
+Pipeline code calls ``emit`` (or wraps a step in ``phase``) instead of printing.
+Events are plain dicts with a ``type``, a ``timestamp``, the run's
+``cost_so_far`` and, inside a phase, the ``pipeline_phase``, delivered to every callback registered with
+``progress_listener`` in the emitting context. Listeners and run totals live in
+context variables, so events from provider calls executed on the query
+scheduler's workers still reach the run that queued them.
+
+Event types:
+    run_started, run_finished, run_failed
+    phase_started, phase_finished, phase_failed
+    queries_queued, query_completed, query_failed
+    llm_call
+    partial_synthesis (``text`` holds the report text generated since the previous event)
+"""
+from FunctionTools import tracing
+from contextlib import contextmanager
+from typing import Callable, Dict
+import contextvars
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+RUN_STARTED = "run_started"
+RUN_FINISHED = "run_finished"
+RUN_FAILED = "run_failed"
+PHASE_STARTED = "phase_started"
+PHASE_FINISHED = "phase_finished"
+PHASE_FAILED = "phase_failed"
+QUERIES_QUEUED = "queries_queued"
+QUERY_COMPLETED = "query_completed"
+QUERY_FAILED = "query_failed"
+LLM_CALL = "llm_call"
+PARTIAL_SYNTHESIS = "partial_synthesis"
+
+# Minimum seconds between partial_synthesis events while the final report streams
+PARTIAL_SYNTHESIS_INTERVAL = 0.5
+
+_listeners = contextvars.ContextVar("progress_listeners", default=())
+_run_totals = contextvars.ContextVar("progress_run_totals", default=None)
+_current_phase = contextvars.ContextVar("progress_current_phase", default=None)
+
+
+@contextmanager
+def progress_listener(callback: Callable[[Dict], None] = None):
+    """
+    Deliver every event emitted inside the block to callback
+
+    Args:
+        callback: Receives each event dict; None registers nothing
+    """
+    if callback is None:
+        yield
+        return
+    token = _listeners.set(_listeners.get() + (callback,))
+    try:
+        yield
+    finally:
+        _listeners.reset(token)
+
+
+@contextmanager
+def run_progress(company_name: str, country: str):
+    """Track the totals of one research run and emit its start and end events"""
+    token = _run_totals.set({"cost": 0.0, "queries": 0, "started": time.perf_counter(), "lock": threading.Lock()})
+    emit(RUN_STARTED, company_name=company_name, country=country)
+    try:
+        yield
+    except Exception as e:
+        emit(RUN_FAILED, company_name=company_name, country=country, error=str(e), **_elapsed())
+        raise
+    else:
+        emit(RUN_FINISHED, company_name=company_name, country=country, **_elapsed())
+    finally:
+        _run_totals.reset(token)
+
+
+@contextmanager
+def phase(name: str, **fields):
+    """
+    Emit phase_started, then phase_finished or phase_failed with the phase duration
+
+    The phase is also traced as a span, the parent of the phase's queries and LLM calls.
+    """
+    emit(PHASE_STARTED, phase=name, **fields)
+    started = time.perf_counter()
+    token = _current_phase.set(name)
+    with tracing.span(f"phase {name}", phase=name):
+        try:
+            yield
+        except Exception as e:
+            _current_phase.reset(token)
+            emit(PHASE_FAILED, phase=name, error=str(e), duration_seconds=round(time.perf_counter() - started, 3))
+            raise
+    _current_phase.reset(token)
+    emit(PHASE_FINISHED, phase=name, duration_seconds=round(time.perf_counter() - started, 3))
+
+
+def emit(event_type: str, **fields) -> None:
+    """
+    Deliver an event to the listeners of the current context
+
+    A ``cost`` field is added to the run's cost so far, and query_completed events
+    count towards its completed queries. Listener errors are logged, never raised.
+    """
+    event = {"type": event_type, "timestamp": time.time(), **fields}
+    pipeline_phase = _current_phase.get()
+    if pipeline_phase is not None:
+        event.setdefault("pipeline_phase", pipeline_phase)
+    totals = _run_totals.get()
+    if totals is not None:
+        with totals["lock"]:
+            totals["cost"] += fields.get("cost") or 0
+            if event_type == QUERY_COMPLETED:
+                totals["queries"] += 1
+            event["cost_so_far"] = round(totals["cost"], 6)
+            event["queries_completed"] = totals["queries"]
+    logger.debug("progress %s", event)
+
+    for callback in _listeners.get():
+        try:
+            callback(event)
+        except Exception:
+            logger.exception("Progress listener failed for %s event", event_type)
+
+
+def current_phase():
+    """Pipeline phase executing in the current context, or None outside a phase"""
+    return _current_phase.get()
+
+
+def has_listeners() -> bool:
+    """True if anything in the current context receives progress events"""
+    return bool(_listeners.get())
+
+
+def _elapsed() -> Dict:
+    totals = _run_totals.get()
+    return {"elapsed_seconds": round(time.perf_counter() - totals["started"], 3)}
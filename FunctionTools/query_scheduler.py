@@ -0,0 +1,134 @@
+from concurrent.futures import Future
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Hashable
+from FunctionTools import metrics
+import contextvars
+import threading
+import time
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_queue_wait = contextvars.ContextVar("query_scheduler_queue_wait", default=0.0)
+
+
+class QueryScheduler:
+    """
+    Shared work queue for search provider calls of every active research run.
+
+    Each run gets its own FIFO queue and a fixed pool of PPLX_MAX_CONCURRENCY
+    workers serves the runs round-robin, so the provider's concurrency limit is
+    applied across the whole batch, no run can starve the others, and a run that
+    is busy in an LLM phase leaves its share of the pipe to the runs that have
+    queries waiting. Tasks run in a copy of the submitting thread's context.
+    """
+
+    def __init__(self, max_concurrency: int = None):
+        """
+        Args:
+            max_concurrency: Maximum number of provider calls in flight (default: PPLX_MAX_CONCURRENCY or 4)
+        """
+        self.max_concurrency = int(max_concurrency or os.getenv("PPLX_MAX_CONCURRENCY", 4))
+        self._queues: "OrderedDict[Hashable, deque]" = OrderedDict()
+        self._condition = threading.Condition()
+        self._workers = []
+        self._in_flight = 0
+        self._stats = {"dispatched": 0, "queue_wait_seconds": 0.0, "max_queue_wait_seconds": 0.0}
+
+    def submit(self, fn: Callable, *args, run_key: Hashable = None, **kwargs) -> Future:
+        """
+        Queue a call on behalf of a research run
+
+        Args:
+            fn: Function performing the provider call
+            run_key: Identifies the run the call belongs to (default: the calling thread)
+
+        Returns:
+            Future: Resolves to the return value of fn
+        """
+        future = Future()
+        key = run_key if run_key is not None else threading.get_ident()
+        task = (future, contextvars.copy_context(), fn, args, kwargs, time.perf_counter())
+        with self._condition:
+            self._queues.setdefault(key, deque()).append(task)
+            if len(self._workers) < self.max_concurrency:
+                worker = threading.Thread(target=self._work, name=f"query-scheduler-{len(self._workers)}", daemon=True)
+                self._workers.append(worker)
+                worker.start()
+            self._condition.notify()
+        return future
+
+    def _next_task(self):
+        """Pop the next task from the run at the head of the rotation (caller holds the lock)"""
+        key, queue = next(iter(self._queues.items()))
+        task = queue.popleft()
+        if queue:
+            self._queues.move_to_end(key)
+        else:
+            del self._queues[key]
+        return task
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queues:
+                    self._condition.wait()
+                future, context, fn, args, kwargs, submitted_at = self._next_task()
+                waited = time.perf_counter() - submitted_at
+                self._in_flight += 1
+                self._stats["dispatched"] += 1
+                self._stats["queue_wait_seconds"] += waited
+                self._stats["max_queue_wait_seconds"] = max(self._stats["max_queue_wait_seconds"], waited)
+            metrics.QUERY_SCHEDULER_WAIT.observe(waited)
+
+            if future.set_running_or_notify_cancel():
+                context.run(_queue_wait.set, waited)
+                try:
+                    result = context.run(fn, *args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+
+            with self._condition:
+                self._in_flight -= 1
+
+    def stats(self) -> Dict:
+        """Queue depth, calls in flight and queue wait figures"""
+        with self._condition:
+            dispatched = self._stats["dispatched"]
+            return {
+                "max_concurrency": self.max_concurrency,
+                "queued": sum(len(queue) for queue in self._queues.values()),
+                "waiting_runs": len(self._queues),
+                "in_flight": self._in_flight,
+                "dispatched": dispatched,
+                "avg_queue_wait_seconds": round(self._stats["queue_wait_seconds"] / dispatched, 3) if dispatched else 0.0,
+                "max_queue_wait_seconds": round(self._stats["max_queue_wait_seconds"], 3)
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_query_scheduler() -> QueryScheduler:
+    """Returns the process-wide query scheduler, creating it on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = QueryScheduler()
+            metrics.REGISTRY.add_collector(_collect_metrics)
+        return _scheduler
+
+
+def current_queue_wait() -> float:
+    """Seconds the running scheduler task waited in the queue (0.0 outside scheduler tasks)"""
+    return _queue_wait.get()
+
+
+def _collect_metrics() -> None:
+    stats = _scheduler.stats()
+    metrics.QUERY_SCHEDULER_QUEUED.set(stats["queued"])
+    metrics.QUERY_SCHEDULER_IN_FLIGHT.set(stats["in_flight"])
@@ -1,4 +1,6 @@
-from elsai_core.model.azure_openai_connector import AzureOpenAIConnector
+from FunctionTools.model_router import get_model_router
+from FunctionTools.cassette import get_cassette, REPLAY_API_KEY
+from FunctionTools import progress, metrics, tracing
 from langchain_core.output_parsers import JsonOutputParser
 from concurrent.futures import ThreadPoolExecutor
 from tavily import TavilyClient
@@ -8,8 +10,6 @@ import os
 from dotenv import load_dotenv 
 load_dotenv()
 
-connector = AzureOpenAIConnector()
-llm = connector.connect_azure_open_ai("gpt-4o-mini")
 parser = JsonOutputParser()
 
 DOMAINS = [
@@ -131,6 +131,18 @@ DOMAINS = [
     "plainsite.org"
 ]
 
+def create_tavily_client() -> TavilyClient:
+    """
+    Tavily client for TAVILY_API_KEY that sends its requests to TAVILY_API_BASE_URL when set, e.g. a local stand-in
+
+    When a cassette is replayed the key may be unset, as no request leaves the process.
+    """
+    api_key = os.getenv("TAVILY_API_KEY") or (REPLAY_API_KEY if get_cassette().replaying else None)
+    client = TavilyClient(api_key=api_key)
+    client.base_url = os.getenv("TAVILY_API_BASE_URL", client.base_url)
+    return client
+
+
 def process_tavily_from_urls(tavily_client: TavilyClient, urls: List[str], company_name: str=None):
     """
     Process Tavily queries from a list of URLs
@@ -143,12 +155,17 @@ def process_tavily_from_urls(tavily_client: TavilyClient, urls: List[str], compa
         str: Combined results from all queries
     """
     try:
-        print(f"Searching provide supporting links...")
-        
-        extract_response = tavily_client.extract(urls,extract_depth="advanced",timeout=180)
+        started = time.perf_counter()
+        with tracing.span("tavily.extract", provider="tavily_extract", phase=progress.current_phase(),
+                          urls=len(urls)), \
+                metrics.track_provider_call("tavily_extract"):
+            extract_response = get_cassette().call(
+                "tavily_extract", {"urls": urls},
+                lambda: tavily_client.extract(urls,extract_depth="advanced",timeout=180))
         extract_content = "\n".join(r['raw_content'] for r in extract_response['results'] if 'raw_content' in r)
         
-        print(f"✓ Completed: {urls}")
+        progress.emit(progress.QUERY_COMPLETED, provider="tavily_extract", query=", ".join(urls),
+                      latency_seconds=round(time.perf_counter() - started, 3))
         return extract_content
         
     except Exception as e:
@@ -179,25 +196,32 @@ def process_tavily_in_batches(tavily_client: TavilyClient,
     
     def single_query(query, company_name, country):
         """Execute a single Tavily query"""
+        started = time.perf_counter()
         try:
-            print(f"Searching: {query}")
-            
-            tavily_response = tavily_client.search(query=f"For {company_name} in {country}, {query}",
-                                                   topic=research_topic,
-                                                   search_depth="advanced",
-                                                   max_results=os.getenv("TAVILY_MAX_RESULTS", 2),
-                                                   time_range='year',
-                                                   include_domains=DOMAINS,
-                                                   timeout=180
-                                                   )
+            with tracing.span("tavily.query", provider="tavily", phase=progress.current_phase(), query=query), \
+                    metrics.track_provider_call("tavily"):
+                search_query = f"For {company_name} in {country}, {query}"
+                max_results = os.getenv("TAVILY_MAX_RESULTS", 2)
+                tavily_response = get_cassette().call(
+                    "tavily", {"query": search_query, "topic": research_topic, "max_results": max_results},
+                    lambda: tavily_client.search(query=search_query,
+                                                 topic=research_topic,
+                                                 search_depth="advanced",
+                                                 max_results=max_results,
+                                                 time_range='year',
+                                                 include_domains=DOMAINS,
+                                                 timeout=180
+                                                 ))
             
             content = "\n".join(r['content'] for r in tavily_response['results'] if 'content' in r)
             
-            print(f"✓ Completed: {query}")
+            progress.emit(progress.QUERY_COMPLETED, provider="tavily", query=query,
+                          latency_seconds=round(time.perf_counter() - started, 3))
             return content
             
         except Exception as e:
-            print(f"✗ ERROR in query '{query}': {e}")
+            progress.emit(progress.QUERY_FAILED, provider="tavily", query=query, error=str(e),
+                          latency_seconds=round(time.perf_counter() - started, 3))
             raise RuntimeError(f"Error in query '{query}': {e}")
     
     all_results = ""
@@ -208,7 +232,7 @@ def process_tavily_in_batches(tavily_client: TavilyClient,
         batch = search_queries[i:i + batch_size]
         batch_num = (i // batch_size) + 1
         
-        print(f"\n[BATCH {batch_num}] Processing {len(batch)} queries...")
+        progress.emit(progress.QUERIES_QUEUED, provider="tavily", count=len(batch), batch=batch_num)
         
         # Use ThreadPoolExecutor for current batch
         with ThreadPoolExecutor(max_workers=len(batch)) as executor:
@@ -221,17 +245,14 @@ def process_tavily_in_batches(tavily_client: TavilyClient,
                 if result:  # Only add non-empty results
                     all_results += result + "\n\n"
         
-        print(f"[BATCH {batch_num}] Completed!")
-        
         # Wait before next batch (except for the last batch)
         if i + batch_size < total_queries:
-            print(f"Waiting {delay_between_batches} seconds before next batch...")
             time.sleep(delay_between_batches)
     
     return all_results
 
 
-def generate_questions(company_name, prompt):
+def generate_questions(company_name, prompt, llm=None, country: str = None):
     question_prompt = """
     Based on the following company name and user requirements, generate 10 specific question, 
     targeted search questions that would help gather comprehensive information to answer the user's requirements.
@@ -263,8 +284,11 @@ def generate_questions(company_name, prompt):
         ]
     }}
     """
+    if llm is None:
+        llm = get_model_router().for_run()
     def get_response(prompt:str):
-        return llm.invoke(prompt)
+        metadata = {"phase": "question_generation", "company_name": company_name, "country": country}
+        return llm.invoke(prompt, config={"metadata": metadata})
     formatted_prompt = question_prompt.format(company_name=company_name, prompt=prompt)
     final_unparsed = get_response(formatted_prompt)
     final_structured_data = parser.parse(final_unparsed.content)
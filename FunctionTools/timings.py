@@ -0,0 +1,183 @@
+"""
+Per-run timing and cost breakdown built from the run's progress events.
+
+``RunTimings`` is registered as a progress listener for the duration of a run
+and records every phase and every provider and LLM call. Its ``summary`` is
+stored as ``final_data["timings"]``:
+
+    wall_seconds, provider_seconds, queue_wait_seconds, tokens, cost
+    phases          {phase: start_seconds, wall_seconds, provider_seconds, queue_wait_seconds, calls, tokens, cost}
+    query_latency   {provider: count, p50, p90, p99, max} of the provider's call latencies
+    calls           one entry per call: provider, phase, label, start_seconds, duration_seconds,
+                    queue_wait_seconds, ok, cache_hit
+
+Provider time is the summed latency of the calls, so with concurrent calls it
+can exceed the wall time. Cached LLM responses count as calls but not as
+provider time. Times are in seconds from the start of the run.
+"""
+from FunctionTools import progress
+from typing import Dict, List
+import threading
+import time
+
+# Provider label of LLM calls in timings and service metrics
+LLM_PROVIDER = "azure_openai"
+
+# Calls made outside any pipeline phase
+UNPHASED = "other"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(max(int(round(pct / 100 * len(ordered))) - 1, 0), len(ordered) - 1)
+    return ordered[index]
+
+
+class RunTimings:
+    """Progress listener accumulating the phases and calls of one research run."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.phases: Dict[str, Dict] = {}
+        self.calls: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Dict) -> None:
+        event_type = event["type"]
+        if event_type == progress.PHASE_STARTED:
+            with self._lock:
+                self._phase(event["phase"], event["timestamp"])
+        elif event_type in (progress.PHASE_FINISHED, progress.PHASE_FAILED):
+            with self._lock:
+                self._phase(event["phase"], event["timestamp"])["wall_seconds"] += event["duration_seconds"]
+        elif event_type in (progress.QUERY_COMPLETED, progress.QUERY_FAILED):
+            self._call(event, provider=event["provider"], label=event.get("query", ""),
+                       ok=event_type == progress.QUERY_COMPLETED, tokens=event.get("tokens") or 0, cache_hit=False)
+        elif event_type == progress.LLM_CALL:
+            self._call(event, provider=LLM_PROVIDER, label=event["phase"], ok=True, cache_hit=event["cache_hit"],
+                       tokens=event["input_tokens"] + event["output_tokens"])
+
+    def _phase(self, name: str, timestamp: float) -> Dict:
+        """Stats of a phase, created when first seen (caller holds the lock)"""
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = {"start_seconds": round(timestamp - self.started, 3), "wall_seconds": 0.0,
+                     "provider_seconds": 0.0, "queue_wait_seconds": 0.0, "calls": 0, "tokens": 0, "cost": 0.0}
+            self.phases[name] = stats
+        return stats
+
+    def _call(self, event: Dict, provider: str, label: str, ok: bool, tokens: int, cache_hit: bool) -> None:
+        duration = event.get("latency_seconds") or 0.0
+        queue_wait = event.get("queue_wait_seconds") or 0.0
+        phase = event.get("pipeline_phase") or UNPHASED
+        with self._lock:
+            self.calls.append({
+                "provider": provider,
+                "phase": phase,
+                "label": label,
+                "start_seconds": round(event["timestamp"] - duration - self.started, 3),
+                "duration_seconds": duration,
+                "queue_wait_seconds": queue_wait,
+                "ok": ok,
+                "cache_hit": cache_hit
+            })
+            stats = self._phase(phase, event["timestamp"] - duration)
+            stats["calls"] += 1
+            stats["tokens"] += tokens
+            stats["cost"] += event.get("cost") or 0.0
+            stats["queue_wait_seconds"] += queue_wait
+            if not cache_hit:
+                stats["provider_seconds"] += duration
+
+    def summary(self) -> Dict:
+        """The timings section of the run's final_data"""
+        with self._lock:
+            phases = {name: {**stats, "wall_seconds": round(stats["wall_seconds"], 3),
+                             "provider_seconds": round(stats["provider_seconds"], 3),
+                             "queue_wait_seconds": round(stats["queue_wait_seconds"], 3),
+                             "cost": round(stats["cost"], 6)}
+                      for name, stats in self.phases.items()}
+            calls = sorted(self.calls, key=lambda call: call["start_seconds"])
+
+        latencies = {}
+        for call in calls:
+            if not call["cache_hit"]:
+                latencies.setdefault(call["provider"], []).append(call["duration_seconds"])
+        return {
+            "wall_seconds": round(time.time() - self.started, 3),
+            "provider_seconds": round(sum(stats["provider_seconds"] for stats in phases.values()), 3),
+            "queue_wait_seconds": round(sum(stats["queue_wait_seconds"] for stats in phases.values()), 3),
+            "tokens": sum(stats["tokens"] for stats in phases.values()),
+            "cost": round(sum(stats["cost"] for stats in phases.values()), 6),
+            "phases": phases,
+            "query_latency": {provider: {"count": len(values),
+                                         "p50": round(percentile(values, 50), 3),
+                                         "p90": round(percentile(values, 90), 3),
+                                         "p99": round(percentile(values, 99), 3),
+                                         "max": round(max(values), 3)}
+                              for provider, values in latencies.items()},
+            "calls": calls
+        }
+
+
+def phase_table(timings: Dict) -> List[List[str]]:
+    """Header and rows of the per-phase breakdown, with a total row, for reports"""
+    rows = [["Phase", "Wall (s)", "Provider (s)", "Queue wait (s)", "Calls", "Tokens", "Cost ($)"]]
+    for name, stats in timings.get("phases", {}).items():
+        rows.append([name, f"{stats['wall_seconds']:.1f}", f"{stats['provider_seconds']:.1f}",
+                     f"{stats['queue_wait_seconds']:.1f}", str(stats["calls"]), str(stats["tokens"]),
+                     f"{stats['cost']:.4f}"])
+    rows.append(["Total", f"{timings.get('wall_seconds', 0):.1f}", f"{timings.get('provider_seconds', 0):.1f}",
+                 f"{timings.get('queue_wait_seconds', 0):.1f}", str(len(timings.get("calls", []))),
+                 str(timings.get("tokens", 0)), f"{timings.get('cost', 0):.4f}"])
+    return rows
+
+
+def latency_table(timings: Dict) -> List[List[str]]:
+    """Header and rows of the per-provider call latency percentiles, for reports"""
+    rows = [["Provider", "Calls", "p50 (s)", "p90 (s)", "p99 (s)", "Max (s)"]]
+    for provider, stats in timings.get("query_latency", {}).items():
+        rows.append([provider, str(stats["count"]), f"{stats['p50']:.2f}", f"{stats['p90']:.2f}",
+                     f"{stats['p99']:.2f}", f"{stats['max']:.2f}"])
+    return rows
+
+
+def timeline(timings: Dict) -> List[Dict]:
+    """
+    Calls of a run laid out for a Gantt chart
+
+    Each call gets a ``lane``: calls are packed greedily into the fewest lanes
+    in which they do not overlap, so the number of lanes in use at a time is the
+    run's concurrency. Calls on the critical path, the chain of calls found by
+    walking back from the last call to finish through the latest-finishing call
+    that ended before each one was queued, are marked ``critical``; shortening
+    any other call would not have finished the run sooner.
+
+    Returns:
+        list: The calls with lane, end_seconds, queued_seconds and critical added, ordered by start
+    """
+    rows = [{**call, "end_seconds": round(call["start_seconds"] + call["duration_seconds"], 3),
+             "queued_seconds": round(call["start_seconds"] - call["queue_wait_seconds"], 3), "critical": False}
+            for call in sorted(timings.get("calls", []), key=lambda call: call["start_seconds"])]
+
+    lane_ends = []
+    for row in rows:
+        for lane, end in enumerate(lane_ends):
+            if end <= row["start_seconds"]:
+                break
+        else:
+            lane = len(lane_ends)
+            lane_ends.append(0.0)
+        row["lane"] = lane
+        lane_ends[lane] = row["end_seconds"]
+
+    # Timestamps are rounded to milliseconds, so allow that much overlap between a call and its predecessor
+    cursor = float("inf")
+    for row in sorted(rows, key=lambda row: row["end_seconds"], reverse=True):
+        if row["end_seconds"] <= cursor + 0.001:
+            row["critical"] = True
+            cursor = row["queued_seconds"]
+    return rows
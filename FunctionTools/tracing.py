@@ -0,0 +1,119 @@
+"""
+OpenTelemetry tracing of research runs.
+
+Each run is a ``research_run`` span whose children are the pipeline phases,
+the provider queries and the LLM calls, so an exported trace is a waterfall of
+where the run's time went. Every span carries the run's company and country;
+query and LLM spans add the pipeline phase, tokens and cost.
+
+Spans are exported when RESEARCH_TRACE_EXPORTER is set:
+    console  print finished spans to stdout
+    file     append finished spans as JSON lines to RESEARCH_TRACE_FILE (default research_traces.jsonl)
+Otherwise the OpenTelemetry API's no-op tracer is used and spans cost next to
+nothing. An application that configures its own TracerProvider (e.g. with an
+OTLP exporter) receives the spans too.
+
+The span context lives in context variables, so queries executed on the query
+scheduler's workers are children of the phase that queued them.
+"""
+from opentelemetry import trace
+from contextlib import contextmanager
+from typing import Dict
+import contextvars
+import threading
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+tracer = trace.get_tracer("gtm_researcher")
+
+_run_attributes = contextvars.ContextVar("trace_run_attributes", default={})
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure_tracing(exporter: str = None) -> None:
+    """
+    Install a TracerProvider exporting to the console or a file
+
+    Args:
+        exporter: "console", "file" or "none" (default: RESEARCH_TRACE_EXPORTER or "none")
+    """
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        _configured = True
+        exporter = (exporter or os.getenv("RESEARCH_TRACE_EXPORTER", "none")).lower()
+        if exporter in ("", "none"):
+            return
+
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+        if exporter == "console":
+            span_exporter = ConsoleSpanExporter()
+        elif exporter == "file":
+            path = os.getenv("RESEARCH_TRACE_FILE", "research_traces.jsonl")
+            span_exporter = ConsoleSpanExporter(out=open(path, "a"),
+                                                formatter=lambda span: span.to_json(indent=None) + "\n")
+        else:
+            raise ValueError(f"Unknown RESEARCH_TRACE_EXPORTER '{exporter}'. Use console, file or none.")
+
+        provider = TracerProvider(resource=Resource.create({"service.name": "gtm-researcher"}))
+        provider.add_span_processor(BatchSpanProcessor(span_exporter))
+        trace.set_tracer_provider(provider)
+        logger.info("Exporting research traces to %s", exporter)
+
+
+@contextmanager
+def run_span(company_name: str, country: str):
+    """Root span of a research run; spans started inside it carry its company and country"""
+    configure_tracing()
+    attributes = {"company_name": company_name, "country": country}
+    token = _run_attributes.set(attributes)
+    try:
+        with span("research_run") as run:
+            yield run
+    finally:
+        _run_attributes.reset(token)
+
+
+@contextmanager
+def span(name: str, current: bool = True, **attributes):
+    """
+    Span with the run's attributes plus the given ones; exceptions are recorded on it
+
+    Args:
+        name: Span name
+        current: Make it the parent of spans started inside the block. Use False
+            around generators, whose blocks span yields into the caller's code.
+        **attributes: Span attributes; None values are left out
+    """
+    attributes = _attributes({**_run_attributes.get(), **attributes})
+    if current:
+        with tracer.start_as_current_span(name, attributes=attributes) as active:
+            yield active
+        return
+
+    detached = tracer.start_span(name, attributes=attributes)
+    try:
+        yield detached
+    except Exception as e:
+        detached.record_exception(e)
+        detached.set_status(trace.Status(trace.StatusCode.ERROR, str(e)))
+        raise
+    finally:
+        detached.end()
+
+
+def set_attributes(target: trace.Span, **attributes) -> None:
+    """Set attributes known only once the work is done, e.g. tokens and cost"""
+    if target.is_recording():
+        target.set_attributes(_attributes(attributes))
+
+
+def _attributes(attributes: Dict) -> Dict:
+    return {key: value for key, value in attributes.items() if value is not None}
@@ -1,16 +1,17 @@
-from FunctionTools.tavily_batch import process_tavily_from_urls, generate_questions
-from elsai_core.model.azure_openai_connector import AzureOpenAIConnector
+from FunctionTools.tavily_batch import process_tavily_from_urls, generate_questions, create_tavily_client
+from FunctionTools.model_router import get_model_router
 from FunctionTools.perplexity import process_perplexity_in_batches
-from FunctionTools.version_one.optimized import enhanced_research
-from tavily import TavilyClient
-from typing import List
-import os
+from FunctionTools.version_one.optimized import enhanced_research, generate_final_answer
+from FunctionTools.estimator import get_run_history
+from FunctionTools.cassette import get_cassette
+from FunctionTools.timings import RunTimings
+from FunctionTools import progress, metrics, tracing, budget
+from typing import Callable, List
+import time
 from dotenv import load_dotenv 
 load_dotenv()
 
-tavily = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
-connector = AzureOpenAIConnector()
-llm = connector.connect_azure_open_ai("gpt-4o-mini")
+tavily = create_tavily_client()
 
 
 def common_structure(company_name: str = None, 
@@ -18,7 +19,12 @@ def common_structure(company_name: str = None,
                      search_queries: List[str] = None, 
                      prompt: str = None, 
                      support_urls: List[str] = None,
-                     enable_validation: bool = True) -> dict:
+                     enable_validation: bool = True,
+                     on_token: Callable[[str], None] = None,
+                     on_progress: Callable[[dict], None] = None,
+                     max_cost: float = None,
+                     max_seconds: float = None,
+                     max_calls: int = None) -> dict:
     """
     Enhanced version of the original common_structure function
     
@@ -29,14 +35,62 @@ def common_structure(company_name: str = None,
         prompt: Final processing prompt
         support_urls: Optional support URLs
         enable_validation: Whether to use enhanced validation features
+        on_token: Optional callback that receives the final report text as it streams
+        on_progress: Optional callback that receives the run's progress events (see FunctionTools.progress)
+        max_cost: Optional USD budget of the run (default: RESEARCH_BUDGET_MAX_COST)
+        max_seconds: Optional wall time budget of the run in seconds (default: RESEARCH_BUDGET_MAX_SECONDS)
+        max_calls: Optional budget of external calls of the run (default: RESEARCH_BUDGET_MAX_CALLS);
+            when a budget runs short, validation, gap research and support extraction are cut back
+            and final_data["budget"] lists what was skipped
     
     Returns:
         dict: Research results (enhanced or original based on enable_validation)
     """
     if prompt is None:
                 raise ValueError("required parameter prompt is missing")
+    metrics.RESEARCH_RUNS_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    outcome = "failed"
+    timings = RunTimings()
+    run_budget = budget.RunBudget.from_env(max_cost=max_cost, max_seconds=max_seconds, max_calls=max_calls)
+    # Keep back what the calls every run has to make are expected to cost
+    run_budget.reserve({"llm:final_answer": 1})
+    if enable_validation:
+        run_budget.reserve({"llm:synthesis": 1})
+    if support_urls is not None:
+        run_budget.reserve({"tavily_extract": 1})
+    try:
+        with progress.progress_listener(on_progress), progress.progress_listener(timings), \
+                budget.run_budget(run_budget), progress.run_progress(company_name, country), \
+                tracing.run_span(company_name, country) as run_span:
+            result = _research(company_name, country, search_queries, prompt, support_urls, enable_validation, on_token)
+            final_data = result["final_data"]
+            final_data["timings"] = timings.summary()
+            final_data["budget"] = run_budget.summary()
+            # Replayed runs take the cassette's scaled latencies, not the providers'
+            if not get_cassette().replaying:
+                get_run_history().record(final_data, enable_validation)
+            tracing.set_attributes(run_span, enable_validation=enable_validation,
+                                   perplexity_tokens=final_data["total_tokens"],
+                                   cost=final_data["total_cost"] + final_data["llm_total_cost"])
+        outcome = "completed"
+        return result
+    finally:
+        metrics.RESEARCH_RUNS_IN_FLIGHT.dec()
+        metrics.RESEARCH_RUNS.inc(outcome=outcome)
+        metrics.RESEARCH_RUN_DURATION.observe(time.perf_counter() - started)
+
+
+def _research(company_name: str, country: str, search_queries: List[str], prompt: str,
+              support_urls: List[str], enable_validation: bool, on_token: Callable[[str], None]) -> dict:
+    """Run the research pipeline selected by enable_validation"""
+    llm = get_model_router().for_run()
     if search_queries is None:
-        search_queries = generate_questions(company_name, prompt)['questions']
+        with progress.phase("question_generation"):
+            search_queries = generate_questions(company_name, prompt, llm=llm, country=country)['questions']
+    # The first queries are kept when the budget cannot pay for all of them
+    search_queries = budget.current().take("initial_research", search_queries, {"perplexity": 1},
+                                           item="queries", minimum=1)
     
     if enable_validation:
         # Use enhanced research (now synchronous)
@@ -45,35 +99,34 @@ def common_structure(company_name: str = None,
             country=country,
             search_queries=search_queries,
             prompt=prompt,
-            support_urls=support_urls
+            support_urls=support_urls,
+            llm=llm,
+            on_token=on_token
         )
     else:
         # Use original approach
         try:
-            print(f"Searching for {company_name} company in {country}...")
-            
-            def get_response(prompt: str):
-                return llm.invoke(prompt)
-            
-            context_one_dict = process_perplexity_in_batches(
-                company_name=company_name,
-                country=country,
-                search_queries=search_queries,
-                batch_size=2,
-                delay_between_batches=2
-            )
+            with progress.phase("initial_research"):
+                context_one_dict = process_perplexity_in_batches(
+                    company_name=company_name,
+                    country=country,
+                    search_queries=search_queries
+                )
             
             context = context_one_dict['content']
             
-            if support_urls is not None:
-                tavily_support_results = process_tavily_from_urls(
-                    tavily_client=tavily, 
-                    urls=support_urls, 
-                    company_name=company_name
-                )
+            if support_urls is not None and budget.current().allows_reserved("support_extraction", "tavily_extract",
+                                                                             item="support extraction"):
+                with progress.phase("support_extraction"):
+                    tavily_support_results = process_tavily_from_urls(
+                        tavily_client=tavily, 
+                        urls=support_urls, 
+                        company_name=company_name
+                    )
                 context = tavily_support_results + "\n" + context
             
-            response = get_response(prompt + "\n\nContext:\n" + context)  
+            final_content, final_timing = generate_final_answer(llm, prompt, context, company_name, country,
+                                                                on_token=on_token)
 
             response_data = {
                 "company_name": company_name,
@@ -84,10 +137,14 @@ def common_structure(company_name: str = None,
                     "validation_enabled": False
                 },
                 "final_data": {
-                    "web_response": response.content,
+                    "web_response": final_content,
+                    "final_answer_timing": final_timing,
                     "total_tokens": context_one_dict['total_tokens'],
                     "total_cost": context_one_dict['total_cost'],
                     "citations": context_one_dict['citations'],
+                    "llm_cache": llm.cache_summary(),
+                    "llm_phases": llm.phase_summary(),
+                    "llm_total_cost": llm.total_cost(),
                     "research_phases": {
                         "initial_queries": search_queries
                     }
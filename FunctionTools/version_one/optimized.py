@@ -1,9 +1,9 @@
-from FunctionTools.tavily_batch import process_tavily_from_urls
+from FunctionTools.tavily_batch import process_tavily_from_urls, create_tavily_client
 from FunctionTools.enhance import EnhancedDataCollector
-from elsai_core.model.azure_openai_connector import AzureOpenAIConnector
-from tavily import TavilyClient
-from typing import List
-import os
+from FunctionTools.model_router import get_model_router, RunLLM
+from FunctionTools import progress, tracing, budget
+from typing import Callable, List
+import time
 import logging
 from dotenv import load_dotenv 
 
@@ -11,16 +11,70 @@ load_dotenv()
 logger = logging.getLogger(__name__)
     
 # Initialize global components
-tavily = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
-connector = AzureOpenAIConnector()
-llm = connector.connect_azure_open_ai("gpt-4o-mini")
+tavily = create_tavily_client()
+
+
+def generate_final_answer(llm: RunLLM, prompt: str, context: str, company_name: str, country: str,
+                          on_token: Callable[[str], None] = None):
+    """
+    Generate the final report from the prompt and research context
+    
+    Args:
+        llm: Per-run LLM handle
+        prompt: Final prompt to process the research data
+        context: Research context appended to the prompt
+        company_name: Company name the report is about
+        country: Country the report is about
+        on_token: Optional callback that receives the report text as it is generated
+    
+    Returns:
+        tuple: (report text, timing dict with time_to_first_token and total seconds)
+    """
+    config = {"metadata": {"phase": "final_answer", "company_name": company_name, "country": country}}
+    final_input = prompt + "\n\nContext:\n" + context
+    
+    with progress.phase("final_answer"):
+        started = time.perf_counter()
+        
+        # Stream whenever someone is watching, either the caller or a progress listener
+        if on_token is None and not progress.has_listeners():
+            content = llm.invoke(final_input, config=config).content
+            elapsed = time.perf_counter() - started
+            return content, {"time_to_first_token": round(elapsed, 2), "total_seconds": round(elapsed, 2),
+                             "streamed": False}
+        
+        parts = []
+        pending = []
+        first_token_at = None
+        last_emitted = started
+        for chunk in llm.stream(final_input, config=config):
+            if not chunk.content:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter() - started
+            parts.append(chunk.content)
+            pending.append(chunk.content)
+            if on_token is not None:
+                on_token(chunk.content)
+            # Partial synthesis events are coalesced so listeners are not called per token
+            if time.perf_counter() - last_emitted >= progress.PARTIAL_SYNTHESIS_INTERVAL:
+                progress.emit(progress.PARTIAL_SYNTHESIS, text="".join(pending))
+                pending = []
+                last_emitted = time.perf_counter()
+        if pending:
+            progress.emit(progress.PARTIAL_SYNTHESIS, text="".join(pending))
+        elapsed = time.perf_counter() - started
+        return "".join(parts), {"time_to_first_token": round(first_token_at if first_token_at is not None else elapsed, 2),
+                                "total_seconds": round(elapsed, 2), "streamed": True}
 
 
 def enhanced_research(company_name: str = None, 
                      country: str = None, 
                      search_queries: List[str] = None, 
                      prompt: str = None, 
-                     support_urls: List[str] = None) -> dict:
+                     support_urls: List[str] = None,
+                     llm: RunLLM = None,
+                     on_token: Callable[[str], None] = None) -> dict:
     """
     Enhanced research function with validation and content enhancement
     
@@ -31,69 +85,84 @@ def enhanced_research(company_name: str = None,
         prompt: Final prompt to process the research data
         support_urls: Optional URLs for additional context
         enable_validation: Whether to enable validation (default: True)
+        llm: Optional per-run LLM handle, so earlier phases of the run are accounted together
+        on_token: Optional callback that receives the final report text as it streams
     
     Returns:
         dict: Enhanced research results with validation data
     """
-    try:
-        # Initialize enhanced collector
-        enhanced_collector = EnhancedDataCollector(llm)
-        if prompt is None:
-            raise ValueError("required parameter prompt is missing")
+    with tracing.span("enhanced_research") as research_span:
+        try:
+            # Initialize enhanced collector
+            if llm is None:
+                llm = get_model_router().for_run()
+            enhanced_collector = EnhancedDataCollector(llm)
+            if prompt is None:
+                raise ValueError("required parameter prompt is missing")
         
-        print(f"Starting Enhanced research for {company_name} in {country}...")
-        
-        # Use enhanced data collection with validation (synchronous version)
-        enhanced_data = enhanced_collector.collect_comprehensive_data_sync(
-            company_name=company_name,
-            country=country,
-            search_queries=search_queries
-        )
+            # Use enhanced data collection with validation (synchronous version)
+            enhanced_data = enhanced_collector.collect_comprehensive_data_sync(
+                company_name=company_name,
+                country=country,
+                search_queries=search_queries
+            )
         
-        # Get context from enhanced data
-        context = (enhanced_data['initial_data'] + '\n' + 
-                    enhanced_data['targeted_data'] + '\n' + 
-                    "Synthesized Context data: " + enhanced_data['synthesis'] + '\n' + 
-                    "Context data Validation summary: " + enhanced_data['validation_summary'])
+            # Get context from enhanced data
+            context = (enhanced_data['initial_data'] + '\n' + 
+                        enhanced_data['targeted_data'] + '\n' + 
+                        "Synthesized Context data: " + enhanced_data['synthesis'] + '\n' + 
+                        "Context data Validation summary: " + enhanced_data['validation_summary'])
         
-        # Add Tavily support results if URLs provided
-        if support_urls is not None:
-            tavily_support_results = process_tavily_from_urls(
-                tavily_client=tavily, 
-                urls=support_urls, 
-                company_name=company_name
-            )
-            context = tavily_support_results + "\n" + context
+            # Add Tavily support results if URLs provided and the run's budget still has room for them
+            if support_urls is not None and budget.current().allows_reserved("support_extraction", "tavily_extract",
+                                                                             item="support extraction"):
+                with progress.phase("support_extraction"):
+                    tavily_support_results = process_tavily_from_urls(
+                        tavily_client=tavily, 
+                        urls=support_urls, 
+                        company_name=company_name
+                    )
+                context = tavily_support_results + "\n" + context
         
-        # Generate final response
-        final_response = llm.invoke(prompt + "\n\nContext:\n" + context)
+            # Generate final response
+            final_content, final_timing = generate_final_answer(llm, prompt, context, company_name, country,
+                                                                on_token=on_token)
         
-        response_data = {
-            "company_name": company_name,
-            "country": country,
-            "prompt": prompt,
-            "enhanced_features": {
-                "validation_enabled": True,
-                "data_quality_score": enhanced_data.get('data_quality_score', 0.0),
-                "high_confidence_claims": enhanced_data.get('high_confidence_claims', []),
-                "requires_manual_review": enhanced_data.get('requires_manual_review', []),
-                "validation_summary": enhanced_data.get('validation_summary', {})
-            },
-            "final_data": {
-                "web_response": final_response.content,
-                "enhanced_synthesis": enhanced_data.get('synthesis', ''),
-                "total_tokens": enhanced_collector.perplexity_total_tokens,
-                "total_cost": enhanced_collector.perplexity_total_cost,
-                "citations": enhanced_collector.all_citations,
-                "research_phases": {
-                    "initial_queries": enhanced_data.get('queries_used',[]),
-                    "gap_queries": enhanced_data.get('gap_queries',[])
+            response_data = {
+                "company_name": company_name,
+                "country": country,
+                "prompt": prompt,
+                "enhanced_features": {
+                    "validation_enabled": True,
+                    "data_quality_score": enhanced_data.get('data_quality_score', 0.0),
+                    "high_confidence_claims": enhanced_data.get('high_confidence_claims', []),
+                    "requires_manual_review": enhanced_data.get('requires_manual_review', []),
+                    "validation_summary": enhanced_data.get('validation_summary', {})
+                },
+                "final_data": {
+                    "web_response": final_content,
+                    "final_answer_timing": final_timing,
+                    "enhanced_synthesis": enhanced_data.get('synthesis', ''),
+                    "total_tokens": enhanced_collector.perplexity_total_tokens,
+                    "total_cost": enhanced_collector.perplexity_total_cost,
+                    "citations": enhanced_collector.all_citations,
+                    "llm_cache": llm.cache_summary(),
+                    "llm_phases": llm.phase_summary(),
+                    "llm_total_cost": llm.total_cost(),
+                    "research_phases": {
+                        "initial_queries": enhanced_data.get('queries_used',[]),
+                        "gap_queries": enhanced_data.get('gap_queries',[])
+                    }
                 }
             }
-        }
         
-        return response_data
+            tracing.set_attributes(research_span,
+                                   data_quality_score=enhanced_data.get('data_quality_score', 0.0),
+                                   perplexity_tokens=enhanced_collector.perplexity_total_tokens,
+                                   perplexity_cost=enhanced_collector.perplexity_total_cost,
+                                   llm_cost=llm.total_cost())
+            return response_data
     
-    except Exception as e:
-        print(f"Enhanced research function error: {str(e)}")
-        raise RuntimeError(f"Enhanced research function error: {str(e)}")
\ No newline at end of file
+        except Exception as e:
+            print(f"Enhanced research function error: {str(e)}")
+            raise RuntimeError(f"Enhanced research function error: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,140 @@
+from cachetools import TTLCache
+import asyncio
+import httpx
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LICENSE_VALIDATION_URL = "https://scanflowdev.azurewebsites.net/LicenseKey/ValidateLicenseKey"
+
+AUTH_PAYLOAD = {
+    "deviceMake": "Web",
+    "deviceModel": "a10e",
+    "osVersion": "9",
+    "bundleId": "com.sample.test",
+    "deviceUId": "testingscanflowa2",
+    "platform" : "Android",
+    "productType": ""
+    }
+
+# Statuses with which the license server rejects the key itself; others say nothing about the key
+INVALID_KEY_STATUSES = (401, 403, 404)
+
+
+class LicenseServerError(Exception):
+    """The license server could not be reached or answered with an unexpected response."""
+
+
+class LicenseClient:
+    """
+    Async license key validation with caching and request coalescing.
+
+    Valid keys are cached for LICENSE_CACHE_TTL_SECONDS and rejected keys for the
+    shorter LICENSE_NEGATIVE_CACHE_TTL_SECONDS. Concurrent validations of the same
+    uncached key share a single request to the license server (single-flight).
+    Requests go through one pooled ``httpx.AsyncClient`` so they never block the
+    event loop. Errors reaching the server, and statuses other than 200 and the
+    invalid-key statuses 401/403/404, are raised as LicenseServerError and are
+    not cached.
+    """
+
+    def __init__(self, url: str = None, ttl_seconds: float = None, negative_ttl_seconds: float = None,
+                 max_keys: int = None, transport: httpx.AsyncBaseTransport = None):
+        """
+        Args:
+            url: License validation endpoint (default: LICENSE_VALIDATION_URL env or the Scanflow endpoint)
+            ttl_seconds: Lifetime of a cached valid key (default: LICENSE_CACHE_TTL_SECONDS or 300)
+            negative_ttl_seconds: Lifetime of a cached rejected key (default: LICENSE_NEGATIVE_CACHE_TTL_SECONDS or 30)
+            max_keys: Maximum keys held in each cache (default: LICENSE_CACHE_MAX_KEYS or 10000)
+            transport: Optional httpx transport, e.g. to validate against a local stand-in server
+        """
+        self.url = url or os.getenv("LICENSE_VALIDATION_URL", LICENSE_VALIDATION_URL)
+        max_keys = int(max_keys if max_keys is not None else os.getenv("LICENSE_CACHE_MAX_KEYS", 10000))
+        self._valid = TTLCache(maxsize=max_keys, ttl=float(ttl_seconds if ttl_seconds is not None
+                                                           else os.getenv("LICENSE_CACHE_TTL_SECONDS", 300)))
+        self._invalid = TTLCache(maxsize=max_keys,
+                                 ttl=float(negative_ttl_seconds if negative_ttl_seconds is not None
+                                           else os.getenv("LICENSE_NEGATIVE_CACHE_TTL_SECONDS", 30)))
+        self._inflight = {}
+        self._transport = transport
+        self._client = None
+        self.stats = {"cache_hits": 0, "coalesced": 0, "validations": 0}
+
+    def _http_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                transport=self._transport,
+                limits=httpx.Limits(max_connections=int(os.getenv("LICENSE_HTTP_MAX_CONNECTIONS", 20)),
+                                    max_keepalive_connections=int(os.getenv("LICENSE_HTTP_MAX_KEEPALIVE_CONNECTIONS", 10))),
+                timeout=httpx.Timeout(float(os.getenv("LICENSE_HTTP_TIMEOUT", 10)))
+            )
+        return self._client
+
+    async def validate(self, license_key: str) -> bool:
+        """
+        Check a license key
+
+        Returns:
+            bool: True if the license server accepts the key
+
+        Raises:
+            LicenseServerError: If the license server could not be asked
+        """
+        if license_key in self._valid:
+            self.stats["cache_hits"] += 1
+            return True
+        if license_key in self._invalid:
+            self.stats["cache_hits"] += 1
+            return False
+
+        pending = self._inflight.get(license_key)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            # Shielded so one cancelled waiter does not cancel the validation the others wait on
+            return await asyncio.shield(pending)
+
+        pending = asyncio.get_running_loop().create_future()
+        self._inflight[license_key] = pending
+        try:
+            valid = await self._request(license_key)
+        except Exception as e:
+            error = e if isinstance(e, LicenseServerError) else LicenseServerError(f"License validation failed: {e}")
+            pending.set_exception(error)
+            # Mark the exception retrieved in case no other request was waiting for it
+            pending.exception()
+            raise error
+        else:
+            (self._valid if valid else self._invalid)[license_key] = True
+            pending.set_result(valid)
+            return valid
+        finally:
+            del self._inflight[license_key]
+            if not pending.done():
+                # The validating request was cancelled; release the requests waiting on it
+                pending.cancel()
+
+    async def _request(self, license_key: str) -> bool:
+        self.stats["validations"] += 1
+        headers = {
+            "Content-Type": "application/json",
+            "authkey": license_key
+            }
+        try:
+            response = await self._http_client().post(self.url, headers=headers, json=AUTH_PAYLOAD)
+        except httpx.HTTPError as e:
+            raise LicenseServerError(f"License server request failed: {e}") from e
+        if response.status_code in INVALID_KEY_STATUSES:
+            return False
+        if response.status_code != 200:
+            # Throttling (429) and other unexpected statuses must not cache a valid key as rejected
+            raise LicenseServerError(f"License server returned {response.status_code}")
+        try:
+            return response.json().get("status") == "Success"
+        except ValueError as e:
+            raise LicenseServerError(f"License server returned an invalid response: {e}") from e
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
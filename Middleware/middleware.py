@@ -1,90 +1,153 @@
 import time
-import csv
 import os
-import requests
-from datetime import datetime, timedelta
-from fastapi import Request
+import logging
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from Middleware.rate_limiter import get_rate_limit_backend, AuditLogWriter
+from Middleware.license_client import LicenseClient, LicenseServerError
+from FunctionTools import metrics
 from dotenv import load_dotenv
 load_dotenv()
+logger = logging.getLogger(__name__)
 RATE_LIMIT = os.getenv("RATE_LIMIT", 100)
 WINDOW_SECONDS = os.getenv("WINDOW_SECONDS", 3600)
 REQUEST_LOGS_FILE =  "request_log.csv"
+# Scraped every few seconds by monitoring, so not counted against the rate limit
+RATE_LIMIT_EXEMPT_PATHS = {"/metrics"}
 
-if not os.path.exists(REQUEST_LOGS_FILE):
-    with open(REQUEST_LOGS_FILE, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(["timestamp", "ip"])
+rate_limiter = get_rate_limit_backend(int(RATE_LIMIT), int(WINDOW_SECONDS))
+audit_log = AuditLogWriter(REQUEST_LOGS_FILE)
 
-class AuthenticationMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        if "authkey" not in request.headers:
-            return JSONResponse(
+license_client = LicenseClient()
+
+
+class AuthenticationMiddleware:
+    """
+    Pure ASGI middleware that admits requests carrying a valid ``authkey`` license key header.
+
+    Responses, including streamed ones, pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        license_key = Headers(scope=scope).get("authkey")
+        if license_key is None:
+            response = JSONResponse(
                 status_code=401,
                 content={"detail": "Not authenticated"}
             )
+            await response(scope, receive, send)
+            return
         
-        license_key = request.headers["authkey"]
-        auth_payload = {
-            "deviceMake": "Web",
-            "deviceModel": "a10e",
-            "osVersion": "9",
-            "bundleId": "com.sample.test",
-            "deviceUId": "testingscanflowa2",
-            "platform" : "Android",
-            "productType": ""
-            }
-        auth_url = "https://scanflowdev.azurewebsites.net/LicenseKey/ValidateLicenseKey"
-        auth_headers = {
-            "Content-Type": "application/json",
-            "authkey": license_key
-            }
-        authresponse = requests.post(auth_url, headers=auth_headers, json=auth_payload)
-        authresponse_json = authresponse.json()
-        if authresponse.status_code == 200 and authresponse_json['status'] == "Success":
-            response = await call_next(request)
-            return response
-        else:
-            return JSONResponse(
+        try:
+            valid = await license_client.validate(license_key)
+        except LicenseServerError as e:
+            logger.error(f"License validation unavailable: {e}")
+            response = JSONResponse(
+                    status_code=503,
+                    content={"detail": "License validation unavailable. Try again later."}
+                )
+            await response(scope, receive, send)
+            return
+        if not valid:
+            response = JSONResponse(
                     status_code=401,
                     content={"detail": "Invalid license key"}
                 )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
 
 def log_request(ip: str):
-    with open(REQUEST_LOGS_FILE, mode='a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([datetime.utcnow().isoformat(), ip])
-
-
-def count_recent_requests(ip: str) -> int:
-    now = datetime.utcnow()
-    cutoff = now - timedelta(seconds=int(WINDOW_SECONDS))
-    count = 0
-
-    with open(REQUEST_LOGS_FILE, mode='r') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            if row["ip"] == ip:
-                timestamp = datetime.fromisoformat(row["timestamp"])
-                if timestamp > cutoff:
-                    count += 1
-    return count
-
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        ip = request.client.host
-        if count_recent_requests(ip) >= int(RATE_LIMIT):
-            return JSONResponse(
+    """Queue an audit log row for the request; rows are written to REQUEST_LOGS_FILE in batches"""
+    audit_log.log(ip)
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI middleware enforcing RATE_LIMIT requests per client IP per WINDOW_SECONDS.
+
+    Admitted requests are audit-logged and their response carries an
+    ``X-Process-Time`` header with the seconds taken until the response started.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["path"] in RATE_LIMIT_EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        ip = scope["client"][0] if scope.get("client") else "unknown"
+        # Shared backends lock and wait on their store, which must not stall the event loop
+        allowed = await run_in_threadpool(rate_limiter.hit, ip) if rate_limiter.blocking else rate_limiter.hit(ip)
+        if not allowed:
+            response = JSONResponse(
                 status_code=429,
                 content={"detail": "Rate limit exceeded. Try again later."}
             )
+            await response(scope, receive, send)
+            return
 
         log_request(ip)
 
         start_time = time.perf_counter()
-        response = await call_next(request)
-        process_time = time.perf_counter() - start_time
-        response.headers["X-Process-Time"] = str(process_time)
-        return response
+
+        async def send_with_process_time(message: Message):
+            if message["type"] == "http.response.start":
+                process_time = time.perf_counter() - start_time
+                MutableHeaders(scope=message).append("X-Process-Time", str(process_time))
+            await send(message)
+
+        await self.app(scope, receive, send_with_process_time)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request latency and in-flight requests in the metrics registry.
+
+    Requests are labelled with the matched route template (e.g. ``/research/jobs/{job_id}``)
+    rather than the raw path, so job ids do not create a series each. Add it last
+    so it is outermost and also times requests rejected by the other middleware.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.HTTP_REQUESTS_IN_FLIGHT.dec()
+            # The router stores the matched route in the scope it shares with the middleware
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            metrics.HTTP_REQUEST_DURATION.observe(time.perf_counter() - start_time,
+                                                  method=scope["method"], route=route, status=status)
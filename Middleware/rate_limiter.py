@@ -0,0 +1,275 @@
+from collections import OrderedDict
+from datetime import datetime
+import importlib
+import threading
+import logging
+import sqlite3
+import queue
+import time
+import csv
+import io
+import os
+try:
+    import fcntl
+except ImportError:  # Windows: audit log batches are appended without a lock
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitBackend:
+    """
+    Interface of the rate limit stores used by RateLimitMiddleware.
+
+    Backends implement ``hit``, which counts a request for a key and reports
+    whether it is within ``limit`` requests per ``window_seconds``. Any class with
+    this constructor and method can be selected with RATE_LIMIT_BACKEND, e.g. a
+    networked store shared by several hosts.
+
+    ``blocking`` tells the middleware whether ``hit`` waits on I/O, in which case
+    it is called on the threadpool instead of the event loop.
+    """
+
+    blocking = True
+
+    def __init__(self, limit: int, window_seconds: float):
+        self.limit = int(limit)
+        self.window_seconds = float(window_seconds)
+
+    def hit(self, key: str, now: float = None) -> bool:
+        """
+        Count a request for key if it is within the limit
+
+        Returns:
+            bool: True if the request is allowed, False if the key is over its limit
+        """
+        raise NotImplementedError
+
+
+class SlidingWindowLimiter(RateLimitBackend):
+    """
+    Per-key sliding-window-counter rate limiter held in memory.
+
+    Each key keeps the number of requests allowed in the current and previous
+    fixed windows; the previous window is weighted by how much of it still
+    overlaps the sliding window, which approximates a true sliding log with O(1)
+    time and memory per key. Keys idle for two windows are expired.
+    """
+
+    blocking = False
+
+    def __init__(self, limit: int, window_seconds: float):
+        """
+        Args:
+            limit: Requests allowed per key within a window
+            window_seconds: Length of the sliding window in seconds
+        """
+        super().__init__(limit, window_seconds)
+        # key -> [current window start, current count, previous count]; ordered by last use
+        self._windows: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, now: float = None) -> bool:
+        now = time.time() if now is None else now
+        current_start = now - now % self.window_seconds
+        with self._lock:
+            self._expire(now)
+            window = self._windows.get(key)
+            if window is None:
+                window = [current_start, 0, 0]
+                self._windows[key] = window
+            else:
+                self._windows.move_to_end(key)
+                if window[0] != current_start:
+                    # Roll over; a gap of more than one window leaves nothing to carry
+                    window[2] = window[1] if current_start - window[0] < 1.5 * self.window_seconds else 0
+                    window[1] = 0
+                    window[0] = current_start
+
+            overlap = 1 - (now - current_start) / self.window_seconds
+            if window[1] + window[2] * overlap >= self.limit:
+                return False
+            window[1] += 1
+            return True
+
+    def _expire(self, now: float) -> None:
+        """Drop keys whose last window ended more than a window ago (caller holds the lock)"""
+        cutoff = now - 2 * self.window_seconds
+        while self._windows:
+            key, window = next(iter(self._windows.items()))
+            if window[0] > cutoff:
+                break
+            del self._windows[key]
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """
+    Sliding-window-counter rate limiter shared by every worker process on a host.
+
+    Counters live in a SQLite database in WAL mode. Each check reads and updates
+    the key's counters inside a ``BEGIN IMMEDIATE`` transaction, which holds the
+    database write lock, so concurrent processes never lose or double-count a
+    request. Expired keys are deleted every ``cleanup_every`` checks.
+    """
+
+    def __init__(self, limit: int, window_seconds: float, path: str = None, cleanup_every: int = 1000):
+        """
+        Args:
+            limit: Requests allowed per key within a window
+            window_seconds: Length of the sliding window in seconds
+            path: SQLite file shared by the workers (default: RATE_LIMIT_DB or .rate_limit.sqlite3)
+            cleanup_every: Checks between deletions of expired keys
+        """
+        super().__init__(limit, window_seconds)
+        self.path = path or os.getenv("RATE_LIMIT_DB", ".rate_limit.sqlite3")
+        self.cleanup_every = cleanup_every
+        self._local = threading.local()
+        self._checks = 0
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            "key TEXT PRIMARY KEY, window_start REAL NOT NULL, "
+            "current INTEGER NOT NULL, previous INTEGER NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connection of the calling thread, in autocommit mode so transactions are explicit"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: str, now: float = None) -> bool:
+        now = time.time() if now is None else now
+        current_start = now - now % self.window_seconds
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT window_start, current, previous FROM rate_limits WHERE key = ?",
+                               (key,)).fetchone()
+            window_start, current, previous = row if row is not None else (current_start, 0, 0)
+            if window_start != current_start:
+                # Roll over; a gap of more than one window leaves nothing to carry
+                previous = current if current_start - window_start < 1.5 * self.window_seconds else 0
+                current = 0
+
+            overlap = 1 - (now - current_start) / self.window_seconds
+            allowed = current + previous * overlap < self.limit
+            if allowed:
+                conn.execute(
+                    "INSERT INTO rate_limits (key, window_start, current, previous) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET window_start = excluded.window_start, "
+                    "current = excluded.current, previous = excluded.previous",
+                    (key, current_start, current + 1, previous)
+                )
+
+            self._checks += 1
+            if self._checks % self.cleanup_every == 0:
+                conn.execute("DELETE FROM rate_limits WHERE window_start <= ?", (now - 2 * self.window_seconds,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed
+
+
+RATE_LIMIT_BACKENDS = {
+    "memory": SlidingWindowLimiter,
+    "sqlite": SQLiteRateLimitBackend,
+}
+
+
+def get_rate_limit_backend(limit: int, window_seconds: float, name: str = None) -> RateLimitBackend:
+    """
+    Build the rate limit backend selected by RATE_LIMIT_BACKEND
+
+    Args:
+        limit: Requests allowed per key within a window
+        window_seconds: Length of the sliding window in seconds
+        name: "memory" (default, one process only), "sqlite" (shared by the worker processes
+            of a host) or "package.module:ClassName" of a custom RateLimitBackend
+
+    Returns:
+        RateLimitBackend: The configured backend
+    """
+    name = name or os.getenv("RATE_LIMIT_BACKEND", "memory")
+    if name in RATE_LIMIT_BACKENDS:
+        return RATE_LIMIT_BACKENDS[name](limit, window_seconds)
+    module_name, _, class_name = name.partition(":")
+    if not class_name:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND '{name}'. Use one of {sorted(RATE_LIMIT_BACKENDS)} "
+                         f"or 'package.module:ClassName'.")
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    return backend_class(limit, window_seconds)
+
+
+class AuditLogWriter:
+    """
+    Appends request audit rows to a CSV file from a background thread.
+
+    ``log`` only enqueues the row; the writer thread drains the queue and writes
+    rows in batches of up to ``batch_size`` at least every ``flush_interval``
+    seconds, so request handling never waits on disk I/O.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0, batch_size: int = 1000):
+        """
+        Args:
+            path: CSV file with a ``timestamp,ip`` header
+            flush_interval: Maximum seconds a row waits before it is written
+            batch_size: Maximum rows written per batch
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue = queue.SimpleQueue()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self._thread.start()
+
+    def log(self, ip: str, timestamp: datetime = None) -> None:
+        """Queue an audit row for the request"""
+        self._queue.put(((timestamp or datetime.utcnow()).isoformat(), ip))
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._write_batch(timeout=self.flush_interval)
+        while self._write_batch(timeout=0):
+            pass
+
+    def _write_batch(self, timeout: float) -> int:
+        """Write the queued rows, waiting up to timeout for the first one; returns the rows written"""
+        try:
+            rows = [self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait()]
+        except queue.Empty:
+            return 0
+        while len(rows) < self.batch_size:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        try:
+            with open(self.path, mode='a', newline='') as file:
+                # Worker processes share the file; the lock keeps their batches and the header intact
+                if fcntl is not None:
+                    fcntl.flock(file, fcntl.LOCK_EX)
+                if os.fstat(file.fileno()).st_size == 0:
+                    file.write("timestamp,ip\r\n")
+                file.write(buffer.getvalue())
+        except OSError:
+            logger.exception("Failed to write %d audit log rows to %s", len(rows), self.path)
+        return len(rows)
+
+    def close(self) -> None:
+        """Write every queued row and stop the writer thread"""
+        self._stopped.set()
+        self._thread.join()
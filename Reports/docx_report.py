@@ -0,0 +1,145 @@
+from datetime import datetime
+from io import BytesIO
+from docx import Document
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from bs4 import BeautifulSoup
+from Reports.markdown_utils import clean_markdown_text, markdown_to_html
+from FunctionTools.timings import phase_table, latency_table
+
+def generate_docx_report(all_results):
+    """Generate a DOCX report from research results with better markdown handling"""
+    doc = Document()
+    
+    # Title
+    title = doc.add_heading('Web Research Report', 0)
+    title.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+    
+    # Report metadata
+    doc.add_paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    doc.add_paragraph(f"Total Research Runs: {len(all_results)}")
+    doc.add_paragraph(f"Successful Runs: {len([r for r in all_results if 'error' not in r])}")
+    doc.add_paragraph(f"Failed Runs: {len([r for r in all_results if 'error' in r])}")
+    doc.add_paragraph()
+    
+    # Table of Contents
+    doc.add_heading('Table of Contents', level=1)
+    for result_data in all_results:
+        run_num = result_data["run_number"]
+        company_name = result_data["company_name"]
+        doc.add_paragraph(f"Research Run {run_num}: {company_name}", style='List Number')
+    
+    doc.add_page_break()
+    
+    # Results for each run
+    for i, result_data in enumerate(all_results):
+        if i > 0:
+            doc.add_page_break()
+            
+        run_num = result_data["run_number"]
+        company_name = result_data["company_name"]
+        country = result_data["country"]
+        
+        # Run header
+        doc.add_heading(f'Research Run {run_num}: {company_name}', level=1)
+        
+        # Basic info table
+        table = doc.add_table(rows=3, cols=2)
+        table.style = 'Table Grid'
+        
+        table.cell(0, 0).text = 'Company Name'
+        table.cell(0, 1).text = company_name
+        table.cell(1, 0).text = 'Country'
+        table.cell(1, 1).text = country
+        table.cell(2, 0).text = 'Research Topic'
+        # table.cell(2, 1).text = result_data.get('research_topic', 'N/A')
+        
+        if result_data.get("elapsed_minutes"):
+            row = table.add_row()
+            row.cells[0].text = 'Time Taken'
+            row.cells[1].text = f"{result_data['elapsed_minutes']:.2f} minutes"
+        
+        doc.add_paragraph()
+        
+        # Timing and cost breakdown
+        timings = ((result_data.get("result") or {}).get("final_data") or {}).get("timings")
+        if timings:
+            doc.add_heading('Timing Breakdown', level=2)
+            for rows in (phase_table(timings), latency_table(timings)):
+                timing_table = doc.add_table(rows=len(rows), cols=len(rows[0]))
+                timing_table.style = 'Table Grid'
+                for i, row in enumerate(rows):
+                    for j, value in enumerate(row):
+                        timing_table.cell(i, j).text = value
+                doc.add_paragraph()
+        
+        # Search queries
+        # if result_data.get("search_queries"):
+        #     doc.add_heading('Search Queries Used', level=2)
+        #     for query in result_data["search_queries"]:
+        #         doc.add_paragraph(query, style='List Bullet')
+        
+        # # Support URLs
+        # if result_data.get("support_urls"):
+        #     doc.add_heading('Support URLs Referenced', level=2)
+        #     for url in result_data["support_urls"]:
+        #         doc.add_paragraph(url, style='List Bullet')
+        
+        # Research results
+        if "error" in result_data:
+            doc.add_heading('Error', level=2)
+            doc.add_paragraph(result_data['error'])
+        else:
+            doc.add_heading('Research Results', level=2)
+            
+            if (result_data.get("result") and 
+                result_data["result"].get("final_data") and 
+                result_data["result"]["final_data"].get("web_response")):
+                
+                web_response = result_data["result"]["final_data"]["web_response"]
+                
+                # Clean markdown and convert to proper format
+                cleaned_content = clean_markdown_text(web_response)
+                
+                # Parse markdown content for DOCX
+                html_content = markdown_to_html(cleaned_content)
+                soup = BeautifulSoup(html_content, 'html.parser')
+                
+                # Process HTML elements and add to document
+                for element in soup.find_all(['h1', 'h2', 'h3', 'h4', 'p', 'table', 'ul', 'ol']):
+                    if element.name in ['h1', 'h2', 'h3', 'h4']:
+                        level = int(element.name[1]) + 2  # Offset by 2 since we already have main headings
+                        doc.add_heading(element.get_text().strip(), level=min(level, 9))
+                    
+                    elif element.name == 'p':
+                        text = element.get_text().strip()
+                        if text:
+                            doc.add_paragraph(text)
+                    
+                    elif element.name == 'table':
+                        # Convert HTML table to Word table
+                        rows = element.find_all('tr')
+                        if rows:
+                            # Count maximum columns
+                            max_cols = max(len(row.find_all(['td', 'th'])) for row in rows)
+                            
+                            # Create table
+                            table = doc.add_table(rows=len(rows), cols=max_cols)
+                            table.style = 'Table Grid'
+                            
+                            for i, row in enumerate(rows):
+                                cells = row.find_all(['td', 'th'])
+                                for j, cell in enumerate(cells):
+                                    if j < max_cols:
+                                        table.cell(i, j).text = cell.get_text().strip()
+                    
+                    elif element.name in ['ul', 'ol']:
+                        list_items = element.find_all('li')
+                        for item in list_items:
+                            doc.add_paragraph(item.get_text().strip(), style='List Bullet' if element.name == 'ul' else 'List Number')
+            else:
+                doc.add_paragraph("No research results available for this run.")
+    
+    buffer = BytesIO()
+    doc.save(buffer)
+    buffer.seek(0)
+    return buffer
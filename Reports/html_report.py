@@ -0,0 +1,686 @@
+from datetime import datetime
+import html
+from Reports.markdown_utils import clean_markdown_text, markdown_to_html
+
+def generate_markdown_report(all_results):
+    """Generate a markdown report that pandoc can convert beautifully"""
+    
+    # Start with title and metadata
+    markdown_parts = [
+        "---",
+        "title: 'Web Research Report'",
+        f"date: '{datetime.now().strftime('%B %d, %Y')}'",
+        "author: 'Web Research Agent'",
+        "geometry: 'margin=1in'",
+        "fontsize: '11pt'",
+        "documentclass: 'article'",
+        "---",
+        "",
+        "\\newpage",
+        "",
+        "# Web Research Report",
+        "",
+        f"**Generated on:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        "",
+        "## Report Summary",
+        "",
+        f"| Metric | Value |",
+        f"|--------|-------|",
+        f"| Total Research Runs | {len(all_results)} |",
+        f"| Successful Runs | {len([r for r in all_results if 'error' not in r])} |",
+        f"| Failed Runs | {len([r for r in all_results if 'error' in r])} |",
+        "",
+        "## Table of Contents",
+        ""
+    ]
+    
+    # Add table of contents
+    for result_data in all_results:
+        run_num = result_data["run_number"]
+        company_name = result_data["company_name"]
+        markdown_parts.append(f"- Research Run {run_num}: {company_name}")
+    
+    markdown_parts.extend(["", "\\newpage", ""])
+    
+    # Add individual run sections
+    for i, result_data in enumerate(all_results):
+        if i > 0:
+            markdown_parts.append("\\newpage")
+            markdown_parts.append("")
+        
+        run_num = result_data["run_number"]
+        company_name = result_data["company_name"]
+        country = result_data["country"]
+        
+        markdown_parts.extend([
+            f"# Research Run {run_num}: {company_name}",
+            "",
+            "## Company Information",
+            "",
+            "| Field | Value |",
+            "|-------|-------|",
+            f"| Company Name | {company_name} |",
+            f"| Country | {country} |",
+            #f"| Research Topic | {result_data.get('research_topic', 'N/A')} |"
+        ])
+        
+        if result_data.get("elapsed_minutes"):
+            markdown_parts.append(f"| Time Taken | {result_data['elapsed_minutes']:.2f} minutes |")
+        
+        markdown_parts.extend(["", ""])
+        
+        # Search queries
+        # if result_data.get("search_queries"):
+        #     markdown_parts.extend([
+        #         "## Search Queries Used",
+        #         ""
+        #     ])
+        #     for query in result_data["search_queries"]:
+        #         markdown_parts.append(f"- {query}")
+        #     markdown_parts.append("")
+        
+        # # Support URLs
+        # if result_data.get("support_urls"):
+        #     markdown_parts.extend([
+        #         "## Support URLs Referenced",
+        #         ""
+        #     ])
+        #     for url in result_data["support_urls"]:
+        #         markdown_parts.append(f"- {url}")
+        #     markdown_parts.append("")
+        
+        # Research results
+        markdown_parts.extend([
+            "## Research Results",
+            ""
+        ])
+        
+        if "error" in result_data:
+            markdown_parts.extend([
+                f"**Error occurred:** {result_data['error']}",
+                ""
+            ])
+        else:
+            if (result_data.get("result") and 
+                result_data["result"].get("final_data") and 
+                result_data["result"]["final_data"].get("web_response")):
+                
+                web_response = result_data["result"]["final_data"]["web_response"]
+                
+                # Clean and format the markdown content
+                cleaned_content = clean_markdown_text(web_response)
+                
+                markdown_parts.extend([
+                    cleaned_content,
+                    ""
+                ])
+            else:
+                markdown_parts.extend([
+                    "No research results available for this run.",
+                    ""
+                ])
+    
+    return "\n".join(markdown_parts)
+
+
+
+def generate_html_report_for_pdf(all_results):
+    """Generate HTML content optimized for xhtml2pdf conversion"""
+    
+    # CSS styles optimized for xhtml2pdf (inline styles work better)
+    css_styles = """
+    <style>
+        @page {
+            size: A4;
+            margin: 2cm;
+        }
+        
+        body {
+            font-family: Arial, sans-serif;
+            line-height: 1.6;
+            color: #333;
+            font-size: 12pt;
+        }
+        
+        .header {
+            text-align: center;
+            margin-bottom: 30px;
+            border-bottom: 2px solid #2E86AB;
+            padding-bottom: 15px;
+        }
+        
+        .title {
+            color: #2E86AB;
+            font-size: 24pt;
+            font-weight: bold;
+            margin-bottom: 10px;
+        }
+        
+        .subtitle {
+            color: #666;
+            font-size: 14pt;
+            margin-bottom: 15px;
+        }
+        
+        .metadata-table {
+            width: 100%;
+            border-collapse: collapse;
+            margin: 20px 0;
+        }
+        
+        .metadata-table th, .metadata-table td {
+            border: 1px solid #ddd;
+            padding: 8px;
+            text-align: left;
+        }
+        
+        .metadata-table th {
+            background-color: #2E86AB;
+            color: white;
+            font-weight: bold;
+        }
+        
+        .run-section {
+            margin: 30px 0;
+            page-break-inside: avoid;
+            border: 1px solid #e0e0e0;
+            padding: 15px;
+            background-color: #fafafa;
+        }
+        
+        .run-header {
+            color: #2E86AB;
+            font-size: 16pt;
+            font-weight: bold;
+            margin-bottom: 15px;
+            border-bottom: 1px solid #2E86AB;
+            padding-bottom: 5px;
+        }
+        
+        .info-table {
+            width: 100%;
+            border-collapse: collapse;
+            margin: 10px 0;
+        }
+        
+        .info-table th, .info-table td {
+            border: 1px solid #ddd;
+            padding: 6px;
+            text-align: left;
+        }
+        
+        .info-table th {
+            background-color: #f0f0f0;
+            font-weight: bold;
+            width: 30%;
+        }
+        
+        .section-header {
+            color: #1a5490;
+            font-size: 14pt;
+            font-weight: bold;
+            margin: 20px 0 8px 0;
+        }
+        
+        .content-section {
+            margin: 15px 0;
+            padding: 10px;
+            background-color: white;
+            border-left: 3px solid #2E86AB;
+        }
+        
+        .query-list, .url-list {
+            margin: 10px 0;
+            padding-left: 20px;
+        }
+        
+        .query-list li, .url-list li {
+            margin: 5px 0;
+            padding: 5px;
+            background-color: #f8f9fa;
+            border-radius: 3px;
+        }
+        
+        .error-message {
+            color: #dc3545;
+            background-color: #f8d7da;
+            border: 1px solid #f5c6cb;
+            padding: 10px;
+            margin: 10px 0;
+            border-radius: 3px;
+        }
+        
+        .research-content {
+            line-height: 1.5;
+        }
+        
+        .research-content h1, .research-content h2, .research-content h3 {
+            color: #2E86AB;
+            margin-top: 20px;
+            margin-bottom: 10px;
+        }
+        
+        .research-content table {
+            width: 100%;
+            border-collapse: collapse;
+            margin: 15px 0;
+        }
+        
+        .research-content table th, .research-content table td {
+            border: 1px solid #ddd;
+            padding: 6px;
+            text-align: left;
+        }
+        
+        .research-content table th {
+            background-color: #e3f2fd;
+            font-weight: bold;
+        }
+        
+        .page-break {
+            page-break-before: always;
+        }
+    </style>
+    """
+    
+    # Start building HTML
+    html_parts = [
+        "<!DOCTYPE html>",
+        "<html>",
+        "<head>",
+        "<meta charset='UTF-8'>",
+        "<title>Web Research Report</title>",
+        css_styles,
+        "</head>",
+        "<body>",
+        
+        # Header section
+        "<div class='header'>",
+        "<div class='title'>Web Research Report</div>",
+        f"<div class='subtitle'>Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</div>",
+        "</div>",
+        
+        # Metadata table
+        "<table class='metadata-table'>",
+        "<tr><th>Report Information</th><th>Value</th></tr>",
+        f"<tr><td>Total Research Runs</td><td>{len(all_results)}</td></tr>",
+        f"<tr><td>Successful Runs</td><td>{len([r for r in all_results if 'error' not in r])}</td></tr>",
+        f"<tr><td>Failed Runs</td><td>{len([r for r in all_results if 'error' in r])}</td></tr>",
+        "</table>",
+    ]
+    
+    # Table of Contents
+    html_parts.extend([
+        "<h2 class='section-header'>Table of Contents</h2>",
+        "<ul>"
+    ])
+    
+    for result_data in all_results:
+        run_num = result_data["run_number"]
+        company_name = result_data["company_name"]
+        html_parts.append(f"<li>Research Run {run_num}: {html.escape(company_name)}</li>")
+    
+    html_parts.append("</ul>")
+    
+    # Individual run sections
+    for i, result_data in enumerate(all_results):
+        if i > 0:
+            html_parts.append("<div class='page-break'></div>")
+        
+        run_num = result_data["run_number"]
+        company_name = result_data["company_name"]
+        country = result_data["country"]
+        
+        html_parts.extend([
+            "<div class='run-section'>",
+            f"<div class='run-header'>Research Run {run_num}: {html.escape(company_name)}</div>",
+            
+            # Basic information table
+            "<table class='info-table'>",
+            f"<tr><th>Company Name</th><td>{html.escape(company_name)}</td></tr>",
+            f"<tr><th>Country</th><td>{html.escape(country)}</td></tr>",
+            # f"<tr><th>Research Topic</th><td>{html.escape(result_data.get('research_topic', 'N/A'))}</td></tr>",
+        ])
+        
+        if result_data.get("elapsed_minutes"):
+            html_parts.append(f"<tr><th>Time Taken</th><td>{result_data['elapsed_minutes']:.2f} minutes</td></tr>")
+        
+        html_parts.append("</table>")
+        
+        # # Search queries
+        # if result_data.get("search_queries"):
+        #     html_parts.extend([
+        #         "<div class='section-header'>Search Queries Used</div>",
+        #         "<ul class='query-list'>"
+        #     ])
+        #     for query in result_data["search_queries"]:
+        #         html_parts.append(f"<li>{html.escape(query)}</li>")
+        #     html_parts.append("</ul>")
+        
+        # # Support URLs
+        # if result_data.get("support_urls"):
+        #     html_parts.extend([
+        #         "<div class='section-header'>Support URLs Referenced</div>",
+        #         "<ul class='url-list'>"
+        #     ])
+        #     for url in result_data["support_urls"]:
+        #         html_parts.append(f"<li>{html.escape(url)}</li>")
+        #     html_parts.append("</ul>")
+        
+        # Research results
+        html_parts.append("<div class='section-header'>Research Results</div>")
+        
+        if "error" in result_data:
+            html_parts.append(f"<div class='error-message'>Error occurred: {html.escape(result_data['error'])}</div>")
+        else:
+            if (result_data.get("result") and 
+                result_data["result"].get("final_data") and 
+                result_data["result"]["final_data"].get("web_response")):
+                
+                web_response = result_data["result"]["final_data"]["web_response"]
+                
+                # Convert markdown content to HTML
+                formatted_content = markdown_to_html(web_response)
+                
+                html_parts.extend([
+                    "<div class='content-section'>",
+                    "<div class='research-content'>",
+                    formatted_content,
+                    "</div>",
+                    "</div>"
+                ])
+            else:
+                html_parts.append("<p>No research results available for this run.</p>")
+        
+        html_parts.append("</div>")  # Close run-section
+    
+    # Close HTML
+    html_parts.extend([
+        "</body>",
+        "</html>"
+    ])
+    
+    return "\n".join(html_parts)
+
+def generate_html_report(all_results):
+    """Generate HTML content for the research report"""
+    
+    # CSS styles for better formatting
+    css_styles = """
+    <style>
+        body {
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            line-height: 1.6;
+            margin: 0;
+            padding: 40px;
+            color: #333;
+        }
+        
+        .header {
+            text-align: center;
+            margin-bottom: 40px;
+            border-bottom: 3px solid #2E86AB;
+            padding-bottom: 20px;
+        }
+        
+        .title {
+            color: #2E86AB;
+            font-size: 2.5em;
+            margin-bottom: 10px;
+            font-weight: bold;
+        }
+        
+        .subtitle {
+            color: #666;
+            font-size: 1.2em;
+            margin-bottom: 20px;
+        }
+        
+        .metadata-table {
+            width: 100%;
+            border-collapse: collapse;
+            margin: 20px 0;
+            background: #f8f9fa;
+        }
+        
+        .metadata-table th, .metadata-table td {
+            border: 1px solid #ddd;
+            padding: 12px;
+            text-align: left;
+        }
+        
+        .metadata-table th {
+            background: #2E86AB;
+            color: white;
+            font-weight: bold;
+        }
+        
+        .run-section {
+            margin: 40px 0;
+            page-break-inside: avoid;
+            border: 1px solid #e0e0e0;
+            border-radius: 8px;
+            padding: 20px;
+            background: #fafafa;
+        }
+        
+        .run-header {
+            color: #2E86AB;
+            font-size: 1.8em;
+            margin-bottom: 20px;
+            border-bottom: 2px solid #2E86AB;
+            padding-bottom: 10px;
+        }
+        
+        .info-table {
+            width: 100%;
+            border-collapse: collapse;
+            margin: 15px 0;
+        }
+        
+        .info-table th, .info-table td {
+            border: 1px solid #ddd;
+            padding: 10px;
+            text-align: left;
+        }
+        
+        .info-table th {
+            background: #f0f0f0;
+            font-weight: bold;
+            width: 30%;
+        }
+        
+        .section-header {
+            color: #1a5490;
+            font-size: 1.3em;
+            margin: 25px 0 10px 0;
+            font-weight: bold;
+        }
+        
+        .content-section {
+            margin: 20px 0;
+            padding: 15px;
+            background: white;
+            border-left: 4px solid #2E86AB;
+            border-radius: 4px;
+        }
+        
+        .query-list, .url-list {
+            list-style-type: none;
+            padding: 0;
+        }
+        
+        .query-list li, .url-list li {
+            margin: 8px 0;
+            padding: 8px;
+            background: #f8f9fa;
+            border-radius: 4px;
+            border-left: 3px solid #28a745;
+        }
+        
+        .error-message {
+            color: #dc3545;
+            background: #f8d7da;
+            border: 1px solid #f5c6cb;
+            border-radius: 4px;
+            padding: 15px;
+            margin: 10px 0;
+        }
+        
+        .research-content {
+            line-height: 1.8;
+            text-align: justify;
+        }
+        
+        .research-content h1, .research-content h2, .research-content h3 {
+            color: #2E86AB;
+            margin-top: 25px;
+            margin-bottom: 15px;
+        }
+        
+        .research-content table {
+            width: 100%;
+            border-collapse: collapse;
+            margin: 20px 0;
+            background: white;
+        }
+        
+        .research-content table th, .research-content table td {
+            border: 1px solid #ddd;
+            padding: 12px;
+            text-align: left;
+        }
+        
+        .research-content table th {
+            background: #e3f2fd;
+            font-weight: bold;
+        }
+        
+        .research-content table tr:nth-child(even) {
+            background: #f8f9fa;
+        }
+        
+        .page-break {
+            page-break-before: always;
+        }
+    </style>
+    """
+    
+    # Start building HTML
+    html_parts = [
+        "<!DOCTYPE html>",
+        "<html>",
+        "<head>",
+        "<meta charset='UTF-8'>",
+        "<title>Web Research Report</title>",
+        css_styles,
+        "</head>",
+        "<body>",
+        
+        # Header section
+        "<div class='header'>",
+        "<h1 class='title'>Web Research Report</h1>",
+        f"<p class='subtitle'>Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>",
+        "</div>",
+        
+        # Metadata table
+        "<table class='metadata-table'>",
+        "<tr><th>Report Information</th><th>Value</th></tr>",
+        f"<tr><td>Total Research Runs</td><td>{len(all_results)}</td></tr>",
+        f"<tr><td>Successful Runs</td><td>{len([r for r in all_results if 'error' not in r])}</td></tr>",
+        f"<tr><td>Failed Runs</td><td>{len([r for r in all_results if 'error' in r])}</td></tr>",
+        "</table>",
+    ]
+    
+    # Table of Contents
+    html_parts.extend([
+        "<h2 class='section-header'>Table of Contents</h2>",
+        "<ul>"
+    ])
+    
+    for result_data in all_results:
+        run_num = result_data["run_number"]
+        company_name = result_data["company_name"]
+        html_parts.append(f"<li>Research Run {run_num}: {company_name}</li>")
+    
+    html_parts.append("</ul>")
+    
+    # Individual run sections
+    for i, result_data in enumerate(all_results):
+        if i > 0:
+            html_parts.append("<div class='page-break'></div>")
+        
+        run_num = result_data["run_number"]
+        company_name = result_data["company_name"]
+        country = result_data["country"]
+        
+        html_parts.extend([
+            "<div class='run-section'>",
+            f"<h2 class='run-header'>Research Run {run_num}: {company_name}</h2>",
+            
+            # Basic information table
+            "<table class='info-table'>",
+            f"<tr><th>Company Name</th><td>{company_name}</td></tr>",
+            f"<tr><th>Country</th><td>{country}</td></tr>",
+            # f"<tr><th>Research Topic</th><td>{result_data.get('research_topic', 'N/A')}</td></tr>",
+        ])
+        
+        if result_data.get("elapsed_minutes"):
+            html_parts.append(f"<tr><th>Time Taken</th><td>{result_data['elapsed_minutes']:.2f} minutes</td></tr>")
+        
+        html_parts.append("</table>")
+        
+        # Search queries
+        # if result_data.get("search_queries"):
+        #     html_parts.extend([
+        #         "<h3 class='section-header'>Search Queries Used</h3>",
+        #         "<ul class='query-list'>"
+        #     ])
+        #     for query in result_data["search_queries"]:
+        #         html_parts.append(f"<li>{html.escape(query)}</li>")
+        #     html_parts.append("</ul>")
+        
+        # # Support URLs
+        # if result_data.get("support_urls"):
+        #     html_parts.extend([
+        #         "<h3 class='section-header'>Support URLs Referenced</h3>",
+        #         "<ul class='url-list'>"
+        #     ])
+        #     for url in result_data["support_urls"]:
+        #         html_parts.append(f"<li><a href='{url}'>{html.escape(url)}</a></li>")
+        #     html_parts.append("</ul>")
+        
+        # Research results
+        html_parts.append("<h3 class='section-header'>Research Results</h3>")
+        
+        if "error" in result_data:
+            html_parts.append(f"<div class='error-message'>Error occurred: {html.escape(result_data['error'])}</div>")
+        else:
+            if (result_data.get("result") and 
+                result_data["result"].get("final_data") and 
+                result_data["result"]["final_data"].get("web_response")):
+                
+                web_response = result_data["result"]["final_data"]["web_response"]
+                
+                # Convert markdown content to HTML
+                formatted_content = markdown_to_html(web_response)
+                
+                html_parts.extend([
+                    "<div class='content-section'>",
+                    "<div class='research-content'>",
+                    formatted_content,
+                    "</div>",
+                    "</div>"
+                ])
+            else:
+                html_parts.append("<p>No research results available for this run.</p>")
+        
+        html_parts.append("</div>")  # Close run-section
+    
+    # Close HTML
+    html_parts.extend([
+        "</body>",
+        "</html>"
+    ])
+    
+    return "\n".join(html_parts)
@@ -0,0 +1,42 @@
+import re
+import markdown
+from bs4 import BeautifulSoup
+
+def clean_markdown_text(text:str):
+    """Clean and prepare markdown text for conversion"""
+    if not text:
+        return ""
+    
+    # Remove markdown code blocks wrapper if present
+    if text.strip().startswith('```markdown') and text.strip().endswith('```'):
+        text = text.strip()[11:-3].strip()
+    elif text.strip().startswith('```') and text.strip().endswith('```'):
+        text = text.strip()[3:-3].strip()
+    
+    # Clean up excessive whitespace
+    text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)
+    text = re.sub(r'[ \t]+', ' ', text)
+    text = text.strip()
+    
+    return text
+
+def markdown_to_html(markdown_text):
+    """Convert markdown to clean HTML"""
+    if not markdown_text:
+        return ""
+    
+    # Clean the markdown first
+    cleaned_md = clean_markdown_text(markdown_text)
+    
+    # Convert markdown to HTML
+    html_content = markdown.markdown(cleaned_md, extensions=['tables', 'fenced_code'])
+    
+    # Clean up the HTML with BeautifulSoup
+    soup = BeautifulSoup(html_content, 'html.parser')
+    
+    # Remove empty paragraphs
+    for p in soup.find_all('p'):
+        if not p.get_text().strip():
+            p.decompose()
+    
+    return str(soup)
@@ -0,0 +1,308 @@
+import streamlit as st
+from datetime import datetime
+from io import BytesIO
+import markdown
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+from bs4 import BeautifulSoup
+from Reports.markdown_utils import clean_markdown_text
+from FunctionTools.timings import phase_table, latency_table
+
+def generate_pdf_report(all_results):
+    """Generate a PDF report using ReportLab - pure Python, cloud-friendly"""
+    
+    try:
+        st.info("🎨 Generating professional PDF with ReportLab...")
+        
+        # Create PDF buffer
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4, 
+                               topMargin=0.8*inch, bottomMargin=0.8*inch,
+                               leftMargin=0.8*inch, rightMargin=0.8*inch)
+        
+        # Get styles and create custom ones
+        styles = getSampleStyleSheet()
+        story = []
+        
+        # Custom styles
+        title_style = ParagraphStyle('CustomTitle',
+                                    parent=styles['Heading1'],
+                                    fontSize=24,
+                                    spaceAfter=30,
+                                    textColor=colors.darkblue,
+                                    alignment=TA_CENTER,
+                                    fontName='Helvetica-Bold')
+        
+        heading_style = ParagraphStyle('CustomHeading',
+                                      parent=styles['Heading2'],
+                                      fontSize=16,
+                                      spaceAfter=12,
+                                      spaceBefore=20,
+                                      textColor=colors.darkblue,
+                                      fontName='Helvetica-Bold')
+        
+        subheading_style = ParagraphStyle('CustomSubheading',
+                                         parent=styles['Heading3'],
+                                         fontSize=14,
+                                         spaceAfter=8,
+                                         spaceBefore=15,
+                                         textColor=colors.darkgreen,
+                                         fontName='Helvetica-Bold')
+        
+        body_style = ParagraphStyle('CustomBody',
+                                   parent=styles['Normal'],
+                                   fontSize=11,
+                                   spaceAfter=6,
+                                   spaceBefore=3,
+                                   alignment=TA_JUSTIFY,
+                                   fontName='Helvetica')
+        
+        # Title
+        story.append(Paragraph("Web Research Report", title_style))
+        story.append(Spacer(1, 20))
+        
+        # Report metadata
+        story.append(Paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", body_style))
+        story.append(Spacer(1, 10))
+        
+        # Summary table
+        summary_data = [
+            ['Report Summary', ''],
+            ['Total Research Runs', str(len(all_results))],
+            ['Successful Runs', str(len([r for r in all_results if 'error' not in r]))],
+            ['Failed Runs', str(len([r for r in all_results if 'error' in r]))]
+        ]
+        
+        summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
+        summary_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+        
+        story.append(summary_table)
+        story.append(Spacer(1, 20))
+        
+        # Table of Contents
+        story.append(Paragraph("Table of Contents", heading_style))
+        story.append(Spacer(1, 10))
+        
+        for result_data in all_results:
+            run_num = result_data["run_number"]
+            company_name = result_data["company_name"]
+            story.append(Paragraph(f"Research Run {run_num}: {company_name}", body_style))
+        
+        story.append(PageBreak())
+        
+        # Individual run sections
+        for i, result_data in enumerate(all_results):
+            if i > 0:
+                story.append(PageBreak())
+            
+            run_num = result_data["run_number"]
+            company_name = result_data["company_name"]
+            country = result_data["country"]
+            
+            # Run header
+            story.append(Paragraph(f"Research Run {run_num}: {company_name}", heading_style))
+            story.append(Spacer(1, 15))
+            
+            # Company info table
+            company_data = [
+                ['Company Information', ''],
+                ['Company Name', company_name],
+                ['Country', country],
+                # ['Research Topic', result_data.get('research_topic', 'N/A')]
+            ]
+            
+            if result_data.get("elapsed_minutes"):
+                company_data.append(['Time Taken', f"{result_data['elapsed_minutes']:.2f} minutes"])
+            
+            company_table = Table(company_data, colWidths=[2*inch, 4*inch])
+            company_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+                ('BACKGROUND', (0, 1), (0, -1), colors.lightgrey),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -1), 10),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+                ('TOPPADDING', (0, 0), (-1, -1), 8),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black)
+            ]))
+            
+            story.append(company_table)
+            story.append(Spacer(1, 15))
+            
+            # Timing and cost breakdown
+            timings = ((result_data.get("result") or {}).get("final_data") or {}).get("timings")
+            if timings:
+                story.append(Paragraph("Timing Breakdown", subheading_style))
+                for rows in (phase_table(timings), latency_table(timings)):
+                    timing_table = Table(rows, repeatRows=1)
+                    timing_table.setStyle(TableStyle([
+                        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+                        ('FONTSIZE', (0, 0), (-1, -1), 8),
+                        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+                        ('TOPPADDING', (0, 0), (-1, -1), 4),
+                        ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
+                    ]))
+                    story.append(timing_table)
+                    story.append(Spacer(1, 10))
+            
+            # Search queries
+            # if result_data.get("search_queries"):
+            #     story.append(Paragraph("Search Queries Used", subheading_style))
+            #     for query in result_data["search_queries"]:
+            #         story.append(Paragraph(f"• {query}", body_style))
+            #     story.append(Spacer(1, 10))
+            
+            # # Support URLs
+            # if result_data.get("support_urls"):
+            #     story.append(Paragraph("Support URLs Referenced", subheading_style))
+            #     for url in result_data["support_urls"]:
+            #         story.append(Paragraph(f"• {url}", body_style))
+            #     story.append(Spacer(1, 10))
+            
+            # Research results
+            story.append(Paragraph("Research Results", subheading_style))
+            
+            if "error" in result_data:
+                error_style = ParagraphStyle('ErrorStyle',
+                                           parent=body_style,
+                                           textColor=colors.red,
+                                           fontName='Helvetica-Bold')
+                story.append(Paragraph(f"Error: {result_data['error']}", error_style))
+            else:
+                if (result_data.get("result") and 
+                    result_data["result"].get("final_data") and 
+                    result_data["result"]["final_data"].get("web_response")):
+                    
+                    web_response = result_data["result"]["final_data"]["web_response"]
+                    
+                    # Process the markdown content
+                    processed_content = process_markdown_for_reportlab(web_response, styles, story)
+                    
+                else:
+                    story.append(Paragraph("No research results available for this run.", body_style))
+        
+        # Build PDF
+        doc.build(story)
+        buffer.seek(0)
+        
+        st.success("✅ Professional PDF generated successfully!")
+        return buffer
+        
+    except Exception as e:
+        st.error(f"❌ PDF Generation Error: {str(e)}")
+        raise e
+
+def process_markdown_for_reportlab(markdown_text, styles, story):
+    """Process markdown content and add to ReportLab story"""
+    
+    # Clean the markdown
+    cleaned_md = clean_markdown_text(markdown_text)
+    
+    # Convert to HTML first
+    html_content = markdown.markdown(cleaned_md, extensions=['tables'])
+    soup = BeautifulSoup(html_content, 'html.parser')
+    
+    # Custom styles for content
+    content_heading_style = ParagraphStyle('ContentHeading',
+                                          parent=styles['Heading3'],
+                                          fontSize=13,
+                                          spaceAfter=8,
+                                          spaceBefore=12,
+                                          textColor=colors.darkblue,
+                                          fontName='Helvetica-Bold')
+    
+    content_body_style = ParagraphStyle('ContentBody',
+                                       parent=styles['Normal'],
+                                       fontSize=10,
+                                       spaceAfter=6,
+                                       spaceBefore=3,
+                                       alignment=TA_JUSTIFY,
+                                       fontName='Helvetica')
+    
+    # Process HTML elements
+    for element in soup.find_all(['h1', 'h2', 'h3', 'h4', 'p', 'table', 'ul', 'ol']):
+        try:
+            if element.name in ['h1', 'h2', 'h3', 'h4']:
+                text = element.get_text().strip()
+                if text:
+                    story.append(Paragraph(text, content_heading_style))
+                    story.append(Spacer(1, 6))
+                    
+            elif element.name == 'p':
+                text = element.get_text().strip()
+                if text and len(text) > 2:  # Avoid empty paragraphs
+                    # Handle special formatting
+                    if text.startswith('**') and text.endswith('**'):
+                        # Bold text
+                        bold_style = ParagraphStyle('BoldText',
+                                                   parent=content_body_style,
+                                                   fontName='Helvetica-Bold')
+                        story.append(Paragraph(text[2:-2], bold_style))
+                    else:
+                        story.append(Paragraph(text, content_body_style))
+                    story.append(Spacer(1, 4))
+                    
+            elif element.name == 'table':
+                # Convert HTML table to ReportLab table
+                rows = element.find_all('tr')
+                if rows:
+                    table_data = []
+                    for row in rows:
+                        cells = row.find_all(['td', 'th'])
+                        row_data = [cell.get_text().strip() for cell in cells]
+                        if row_data:  # Only add non-empty rows
+                            table_data.append(row_data)
+                    
+                    if table_data:
+                        # Calculate column widths
+                        num_cols = len(table_data[0]) if table_data else 1
+                        col_width = 6.5 * inch / num_cols
+                        
+                        table = Table(table_data, colWidths=[col_width] * num_cols)
+                        table.setStyle(TableStyle([
+                            ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
+                            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                            ('FONTSIZE', (0, 0), (-1, -1), 9),
+                            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+                            ('TOPPADDING', (0, 0), (-1, -1), 6),
+                            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+                            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+                            ('VALIGN', (0, 0), (-1, -1), 'TOP')
+                        ]))
+                        
+                        story.append(table)
+                        story.append(Spacer(1, 10))
+                        
+            elif element.name in ['ul', 'ol']:
+                items = element.find_all('li')
+                for item in items:
+                    text = item.get_text().strip()
+                    if text:
+                        story.append(Paragraph(f"• {text}", content_body_style))
+                        story.append(Spacer(1, 3))
+                story.append(Spacer(1, 8))
+                
+        except Exception as element_error:
+            # Skip problematic elements but continue processing
+            continue
+    
+    return story
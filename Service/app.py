@@ -0,0 +1,142 @@
+"""
+HTTP API for running research jobs in the background.
+
+POST /research/jobs queues a common_structure run in the SQLite job queue and
+returns immediately with a job id; worker processes (Service.worker) execute
+the jobs and clients poll GET /research/jobs/{job_id} (or follow the
+server-sent events of GET /research/jobs/{job_id}/events) and fetch the report
+from GET /research/jobs/{job_id}/result. Queued jobs survive a restart, and
+jobs whose worker died are requeued once their lease expires.
+
+GET /metrics exposes Prometheus metrics of the API and, via the snapshots they
+store in the job database, of the worker processes.
+
+Usage:
+    uvicorn Service.app:app --host 0.0.0.0 --port 8000
+    python -m Service.worker --workers 2
+"""
+from Middleware.middleware import AuthenticationMiddleware, RateLimitMiddleware, MetricsMiddleware
+from FunctionTools.metrics import MetricsSnapshotStore, REGISTRY, RESEARCH_JOBS, render
+from Service.job_queue import JobQueue, COMPLETED, FAILED
+from starlette.concurrency import run_in_threadpool
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from typing import List, Optional
+import asyncio
+import json
+import time
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+job_queue = JobQueue()
+metrics_store = MetricsSnapshotStore(job_queue.path)
+
+
+def _collect_job_counts() -> None:
+    for status, count in job_queue.counts().items():
+        RESEARCH_JOBS.set(count, status=status)
+
+
+REGISTRY.add_collector(_collect_job_counts)
+
+
+class ResearchRequest(BaseModel):
+    company_name: str
+    country: str
+    prompt: str
+    search_queries: Optional[List[str]] = None
+    support_urls: Optional[List[str]] = None
+    enable_validation: bool = True
+    max_cost: Optional[float] = None
+    max_seconds: Optional[float] = None
+    max_calls: Optional[int] = None
+
+
+app = FastAPI(title="GTM Researcher")
+if os.getenv("SERVICE_MIDDLEWARE_ENABLED", "true").lower() in ("1", "true", "yes"):
+    app.add_middleware(AuthenticationMiddleware)
+    app.add_middleware(RateLimitMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+
+# Handlers are sync so SQLite access runs on the threadpool, never on the event loop
+@app.post("/research/jobs", status_code=202)
+def submit_job(request: ResearchRequest):
+    job_id = job_queue.enqueue(request.model_dump())
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.get("/research/jobs")
+def list_jobs(limit: int = 50):
+    return {"counts": job_queue.counts(), "jobs": job_queue.recent(limit)}
+
+
+@app.get("/research/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/research/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = job_queue.get(job_id, include_result=True)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=500, detail=f"Job failed: {job['error']}")
+    if job["status"] != COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return job
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus text exposition of this process's metrics merged with the workers' latest snapshots"""
+    return PlainTextResponse(render([REGISTRY.snapshot()] + metrics_store.load()),
+                             media_type="text/plain; version=0.0.4")
+
+
+@app.get("/research/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """
+    Server-sent events of a job's progress, ending once the job has finished.
+    Reconnecting clients resume after the id in their Last-Event-ID header.
+    """
+    job = await run_in_threadpool(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    last_id = int(request.headers.get("last-event-id") or 0)
+    poll_seconds = float(os.getenv("SSE_POLL_SECONDS", 0.5))
+    keepalive_seconds = float(os.getenv("SSE_KEEPALIVE_SECONDS", 15))
+
+    async def event_stream():
+        nonlocal last_id
+        last_sent = time.monotonic()
+        while True:
+            events = await run_in_threadpool(job_queue.events, job_id, last_id)
+            for event in events:
+                last_id = event["id"]
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            if events:
+                last_sent = time.monotonic()
+                continue
+
+            # Workers record the final event before the job is marked finished
+            status = (await run_in_threadpool(job_queue.get, job_id))["status"]
+            if status in (COMPLETED, FAILED):
+                yield f"event: end\ndata: {json.dumps({'job_id': job_id, 'status': status})}\n\n"
+                return
+            if await request.is_disconnected():
+                return
+            if time.monotonic() - last_sent >= keepalive_seconds:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            await asyncio.sleep(poll_seconds)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,228 @@
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import sqlite3
+import json
+import time
+import uuid
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class JobQueue:
+    """
+    Persistent FIFO of research jobs shared by the API process and its workers.
+
+    Jobs live in a SQLite database (RESEARCH_JOB_DB) in WAL mode, so they survive
+    a restart and can be claimed by several worker processes. Every operation
+    opens its own short-lived connection, which keeps the queue safe to use from
+    request handler threads and from other processes.
+
+    A claimed job is leased to its worker, which renews the lease with
+    ``heartbeat`` while it runs the job. Only jobs whose lease has expired, i.e.
+    whose worker died, are put back on the queue by ``requeue_expired``, and a
+    job is failed instead once it has been attempted ``max_attempts`` times.
+    """
+
+    def __init__(self, path: str = None, lease_seconds: float = None, max_attempts: int = None):
+        """
+        Args:
+            path: SQLite file holding the jobs (default: RESEARCH_JOB_DB or .research_jobs.sqlite3)
+            lease_seconds: Seconds without a heartbeat after which a running job counts as abandoned
+                (default: RESEARCH_JOB_LEASE_SECONDS or 60)
+            max_attempts: Times a job is started before an abandoned one is failed rather than requeued
+                (default: RESEARCH_JOB_MAX_ATTEMPTS or 3)
+        """
+        self.path = path or os.getenv("RESEARCH_JOB_DB", ".research_jobs.sqlite3")
+        self.lease_seconds = float(lease_seconds if lease_seconds is not None
+                                   else os.getenv("RESEARCH_JOB_LEASE_SECONDS", 60))
+        self.max_attempts = int(max_attempts if max_attempts is not None else os.getenv("RESEARCH_JOB_MAX_ATTEMPTS", 3))
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, request TEXT NOT NULL, "
+                "result TEXT, error TEXT, worker TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL, heartbeat_at REAL)"
+            )
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "heartbeat_at" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_events ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, type TEXT NOT NULL, "
+                "created_at REAL NOT NULL, data TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, id)")
+
+    @contextmanager
+    def _connect(self):
+        """Connection committed on success and closed afterwards"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, request: Dict) -> str:
+        """
+        Add a job to the end of the queue
+
+        Args:
+            request: Keyword arguments for common_structure
+
+        Returns:
+            str: Job id
+        """
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute("INSERT INTO jobs (id, status, request, created_at) VALUES (?, ?, ?, ?)",
+                         (job_id, QUEUED, json.dumps(request), time.time()))
+        return job_id
+
+    def claim(self, worker: str) -> Optional[Dict]:
+        """
+        Atomically take the oldest queued job, mark it running and lease it to the worker
+
+        Returns:
+            dict: Job id and request, or None if the queue is empty
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, started_at = ?, heartbeat_at = ?, attempts = attempts + 1 "
+                "WHERE id = (SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1) "
+                "RETURNING id, request",
+                (RUNNING, worker, now, now, QUEUED)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"id": row["id"], "request": json.loads(row["request"])}
+
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        """
+        Renew the worker's lease on a running job
+
+        Returns:
+            bool: False if the job is no longer leased to the worker, e.g. because it was requeued
+        """
+        with self._connect() as conn:
+            cursor = conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND worker = ? AND status = ?",
+                                  (time.time(), job_id, worker, RUNNING))
+            return cursor.rowcount > 0
+
+    def complete(self, job_id: str, result: Dict, worker: str) -> bool:
+        """Store the result of a job still leased to the worker; returns False if the lease was lost"""
+        with self._connect() as conn:
+            cursor = conn.execute("UPDATE jobs SET status = ?, result = ?, finished_at = ? "
+                                  "WHERE id = ? AND worker = ? AND status = ?",
+                                  (COMPLETED, json.dumps(result, default=str), time.time(), job_id, worker, RUNNING))
+            return cursor.rowcount > 0
+
+    def fail(self, job_id: str, error: str, worker: str) -> bool:
+        """Mark a job still leased to the worker failed; returns False if the lease was lost"""
+        with self._connect() as conn:
+            cursor = conn.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                                  "WHERE id = ? AND worker = ? AND status = ?",
+                                  (FAILED, error, time.time(), job_id, worker, RUNNING))
+            return cursor.rowcount > 0
+
+    def requeue_expired(self) -> Dict[str, int]:
+        """
+        Put running jobs whose lease has expired back on the queue
+
+        Jobs already attempted max_attempts times are failed instead, so a job
+        that keeps killing its worker is not retried forever.
+
+        Returns:
+            dict: Number of jobs requeued and failed
+        """
+        # Jobs claimed before leases existed have no heartbeat; their start time stands in
+        expired = time.time() - self.lease_seconds
+        with self._connect() as conn:
+            failed = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                "WHERE status = ? AND COALESCE(heartbeat_at, started_at) < ? AND attempts >= ?",
+                (FAILED, f"Worker stopped responding on each of {self.max_attempts} attempts", time.time(),
+                 RUNNING, expired, self.max_attempts)
+            ).rowcount
+            # Events of the abandoned attempt would be replayed alongside the new attempt's
+            conn.execute("DELETE FROM job_events WHERE job_id IN (SELECT id FROM jobs "
+                         "WHERE status = ? AND COALESCE(heartbeat_at, started_at) < ?)", (RUNNING, expired))
+            requeued = conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, started_at = NULL, heartbeat_at = NULL "
+                "WHERE status = ? AND COALESCE(heartbeat_at, started_at) < ?",
+                (QUEUED, RUNNING, expired)
+            ).rowcount
+        return {"requeued": requeued, "failed": failed}
+
+    def add_event(self, job_id: str, event: Dict) -> None:
+        """Append a progress event to a job's event log"""
+        with self._connect() as conn:
+            conn.execute("INSERT INTO job_events (job_id, type, created_at, data) VALUES (?, ?, ?, ?)",
+                         (job_id, event["type"], event.get("timestamp", time.time()), json.dumps(event, default=str)))
+
+    def events(self, job_id: str, after_id: int = 0, limit: int = 500) -> List[Dict]:
+        """
+        Progress events of a job recorded after the given event id
+
+        Returns:
+            list: Events in order, each with its ``id``
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, data FROM job_events WHERE job_id = ? AND id > ? ORDER BY id LIMIT ?",
+                                (job_id, after_id, limit)).fetchall()
+        return [{"id": row["id"], **json.loads(row["data"])} for row in rows]
+
+    def get(self, job_id: str, include_result: bool = False) -> Optional[Dict]:
+        """
+        Status of a job, with its queue position while it is queued
+
+        Returns:
+            dict: Job fields, or None if the id is unknown
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            job = {
+                "job_id": row["id"],
+                "status": row["status"],
+                "request": json.loads(row["request"]),
+                "attempts": row["attempts"],
+                "created_at": row["created_at"],
+                "started_at": row["started_at"],
+                "finished_at": row["finished_at"],
+                "error": row["error"]
+            }
+            if row["status"] == QUEUED:
+                job["queue_position"] = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at <= ?",
+                    (QUEUED, row["created_at"])
+                ).fetchone()[0]
+        if include_result:
+            job["result"] = json.loads(row["result"]) if row["result"] else None
+        return job
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs in each status"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in (QUEUED, RUNNING, COMPLETED, FAILED)} | {row[0]: row[1] for row in rows}
+
+    def recent(self, limit: int = 50) -> List[Dict]:
+        """Most recent jobs, newest first"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, status, created_at, finished_at FROM jobs "
+                                "ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [{"job_id": row["id"], "status": row["status"], "created_at": row["created_at"],
+                 "finished_at": row["finished_at"]} for row in rows]
@@ -0,0 +1,131 @@
+"""
+Worker processes that execute research jobs from the SQLite job queue.
+
+Workers run separately from the API, so the API can be served by several
+processes (uvicorn --workers N) without each starting its own pool:
+
+    python -m Service.worker --workers 2
+
+Each worker renews the lease on the job it runs with a heartbeat. Between jobs
+workers requeue the running jobs whose lease has expired, which are the jobs
+of workers that died or were stopped.
+"""
+from FunctionTools.metrics import MetricsSnapshotStore
+from Service.job_queue import JobQueue
+from typing import List
+import multiprocessing
+import traceback
+import sqlite3
+import threading
+import argparse
+import socket
+import time
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def run_worker(worker_id: str, db_path: str = None, poll_interval: float = None) -> None:
+    """
+    Claim and execute jobs until the process is stopped
+
+    Args:
+        worker_id: Name recorded on the jobs this worker claims
+        db_path: Job queue database (default: RESEARCH_JOB_DB)
+        poll_interval: Seconds to sleep when the queue is empty (default: RESEARCH_WORKER_POLL_SECONDS or 1)
+    """
+    # Pipeline modules build API clients at import time, so load them in the worker only
+    from FunctionTools.version_one.common import common_structure
+
+    queue = JobQueue(db_path)
+    # The API serves the workers' metrics from the snapshots stored next to the jobs
+    MetricsSnapshotStore(queue.path).start_publishing(worker_id)
+    poll_interval = float(poll_interval or os.getenv("RESEARCH_WORKER_POLL_SECONDS", 1))
+    print(f"Worker {worker_id} started.")
+    while True:
+        expired = queue.requeue_expired()
+        if expired["requeued"] or expired["failed"]:
+            print(f"Worker {worker_id} requeued {expired['requeued']} and failed {expired['failed']} abandoned jobs.")
+        job = queue.claim(worker_id)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        print(f"Worker {worker_id} executing job {job['id']} for:", job["request"].get("company_name"))
+        done = threading.Event()
+        heartbeat = threading.Thread(target=_heartbeat, args=(queue, job["id"], worker_id, done), daemon=True)
+        heartbeat.start()
+        try:
+            result = common_structure(**job["request"],
+                                      on_progress=lambda event, job_id=job["id"]: queue.add_event(job_id, event))
+            stored = queue.complete(job["id"], result, worker_id)
+        except Exception as e:
+            traceback.print_exc()
+            stored = queue.fail(job["id"], str(e), worker_id)
+        finally:
+            done.set()
+            heartbeat.join()
+        if not stored:
+            print(f"Worker {worker_id} lost the lease on job {job['id']}; its outcome was discarded.")
+
+
+def _heartbeat(queue: JobQueue, job_id: str, worker_id: str, done: threading.Event) -> None:
+    """Renew the lease on a job several times per lease period until it is done"""
+    while not done.wait(queue.lease_seconds / 3):
+        try:
+            leased = queue.heartbeat(job_id, worker_id)
+        except sqlite3.Error as e:
+            # A missed heartbeat is retried on the next one; the lease outlasts several
+            print(f"Worker {worker_id} heartbeat for job {job_id} failed: {e}")
+            continue
+        if not leased:
+            print(f"Worker {worker_id} no longer holds the lease on job {job_id}.")
+            return
+
+
+def start_workers(count: int, db_path: str = None) -> List[multiprocessing.Process]:
+    """
+    Start worker processes
+
+    Workers are spawned rather than forked so they do not inherit the server's threads and sockets.
+
+    Returns:
+        list: The started processes
+    """
+    context = multiprocessing.get_context("spawn")
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    processes = []
+    for index in range(count):
+        process = context.Process(target=run_worker, args=(f"{prefix}-{index}", db_path),
+                                  name=f"research-worker-{index}", daemon=True)
+        process.start()
+        processes.append(process)
+    return processes
+
+
+def stop_workers(processes: List[multiprocessing.Process], timeout: float = 10) -> None:
+    """Terminate worker processes; jobs they were running are requeued once their lease expires"""
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join(timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Execute research jobs from the SQLite job queue")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("RESEARCH_SERVICE_WORKERS", 2)),
+                        help="Worker processes to start")
+    parser.add_argument("--db", default=None, help="Job queue database (default: RESEARCH_JOB_DB)")
+    args = parser.parse_args()
+
+    processes = start_workers(args.workers, args.db)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        stop_workers(processes)
+
+
+if __name__ == "__main__":
+    main()
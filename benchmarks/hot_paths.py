@@ -0,0 +1,316 @@
+"""
+Micro-benchmarks of the CPU-bound hot paths, checked against a stored baseline.
+
+Times, on synthetic inputs at several scales:
+
+    pdf_markdown[runs=N]    process_markdown_for_reportlab over the reports of N runs
+    docx_report[runs=N]     generate_docx_report for N runs
+    chunk_pages[mb=N]       DocumentChunker.chunk_page_wise over N MB of text
+    chunk_headers[mb=N]     DocumentChunker.chunk_markdown_header_wise over N MB of markdown
+    bm25[mb=N]              HybridRetriever.hybrid_retrieve building BM25 over N MB of chunks
+    rate_limit_memory       10,000 SlidingWindowLimiter hits over 1,000 clients
+    rate_limit_sqlite       1,000 SQLiteRateLimitBackend hits over 1,000 clients
+    audit_log               10,000 AuditLogWriter rows, including the final flush
+
+Each benchmark sets up its input untimed, then runs at least --min-rounds
+rounds and until --min-time seconds have passed (at most --max-rounds rounds).
+Its median round is compared with the baseline's median, which a single slow or
+fast round does not move. A benchmark slower than the baseline by more than
+--threshold is measured again, and fails the suite with exit status 1 if the
+second measurement exceeds the threshold too. Benchmarks whose dependencies are
+not installed are reported as skipped. Benchmarks missing from the baseline
+fail the suite too, so a missing or stale baseline cannot pass; exploratory runs
+can report them as new instead with --allow-missing-baseline.
+
+Baselines are machine specific, so none is committed. CI keeps the baseline of
+its benchmark runner outside the tree, e.g. in a cache keyed on the runner
+type, saves it on main and compares changes against it:
+
+    python -m benchmarks.hot_paths --baseline "$CACHE/hot_paths_baseline.json" --save-baseline
+    python -m benchmarks.hot_paths --baseline "$CACHE/hot_paths_baseline.json"
+
+Usage:
+    python -m benchmarks.hot_paths --save-baseline
+    python -m benchmarks.hot_paths --threshold 0.2
+    python -m benchmarks.hot_paths --allow-missing-baseline --only chunk
+    python -m benchmarks.hot_paths --only bm25 --text-mb 1,10,100
+"""
+from datetime import datetime
+from typing import Callable, Dict, List
+import statistics
+import importlib
+import argparse
+import platform
+import tempfile
+import random
+import json
+import time
+import sys
+import os
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hot_paths_baseline.json")
+
+WORDS = ("revenue growth market regulatory filing subsidiary acquisition board director quarterly margin "
+         "guidance litigation compliance customer segment product launch partnership investment capital "
+         "headcount expansion risk outlook dividend shareholder audit operations supply chain").split()
+
+
+def sentence(rng: random.Random, words: int = 18) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def markdown_report(rng: random.Random, sections: int = 12) -> str:
+    """A synthetic final report shaped like the pipeline's: headings, paragraphs, lists and a table"""
+    parts = [f"# {sentence(rng, 4)[:-1]}"]
+    for section in range(sections):
+        parts.append(f"## {section + 1}. {sentence(rng, 3)[:-1]}")
+        parts.extend(" ".join(sentence(rng) for _ in range(4)) for _ in range(3))
+        parts.append("**" + sentence(rng, 8) + "**")
+        parts.append("\n".join(f"- {sentence(rng, 10)}" for _ in range(5)))
+        if section % 3 == 0:
+            rows = [f"| {rng.choice(WORDS)} | {rng.randint(1, 999)} | {sentence(rng, 5)} |" for _ in range(6)]
+            parts.append("| Metric | Value | Note |\n|---|---|---|\n" + "\n".join(rows))
+    return "\n\n".join(parts)
+
+
+def markdown_text(rng: random.Random, megabytes: float) -> str:
+    """About ``megabytes`` MB of markdown made of synthetic reports"""
+    reports = [markdown_report(rng) for _ in range(8)]
+    size = int(megabytes * 1_000_000)
+    text = []
+    length = 0
+    while length < size:
+        report = reports[len(text) % len(reports)]
+        text.append(report)
+        length += len(report) + 2
+    return "\n\n".join(text)
+
+
+def research_results(rng: random.Random, runs: int) -> List[Dict]:
+    """Streamlit research_results entries for ``runs`` successful runs with timings"""
+    results = []
+    for index in range(runs):
+        phases = {name: {"start_seconds": 0.0, "wall_seconds": 12.5, "provider_seconds": 30.1,
+                         "queue_wait_seconds": 1.2, "calls": 10, "tokens": 12000, "cost": 0.012}
+                  for name in ("question_generation", "initial_research", "gap_analysis", "synthesis")}
+        results.append({
+            "run_number": index + 1,
+            "company_name": f"Company {index + 1}",
+            "country": "India",
+            "elapsed_minutes": 2.5,
+            "result": {"final_data": {
+                "web_response": markdown_report(rng),
+                "timings": {"wall_seconds": 150.0, "provider_seconds": 120.4, "queue_wait_seconds": 4.8,
+                            "tokens": 48000, "cost": 0.048, "phases": phases, "calls": [],
+                            "query_latency": {"perplexity": {"count": 30, "p50": 4.1, "p90": 8.0,
+                                                             "p99": 12.2, "max": 13.0}}}
+            }}
+        })
+    return results
+
+
+def bench_pdf_markdown(runs: int) -> Callable[[], None]:
+    from reportlab.lib.styles import getSampleStyleSheet
+    from Reports.pdf_report import process_markdown_for_reportlab
+
+    rng = random.Random(runs)
+    reports = [markdown_report(rng) for _ in range(runs)]
+    styles = getSampleStyleSheet()
+
+    def run():
+        story = []
+        for report in reports:
+            process_markdown_for_reportlab(report, styles, story)
+    return run
+
+
+def bench_docx_report(runs: int) -> Callable[[], None]:
+    from Reports.docx_report import generate_docx_report
+
+    results = research_results(random.Random(runs), runs)
+    return lambda: generate_docx_report(results)
+
+
+def bench_chunk_pages(megabytes: float) -> Callable[[], None]:
+    from elsai_core.utilities.splitters import DocumentChunker
+
+    text = markdown_text(random.Random(1), megabytes)
+    chunker = DocumentChunker()
+    return lambda: chunker.chunk_page_wise(text, "benchmark.md")
+
+
+def bench_chunk_headers(megabytes: float) -> Callable[[], None]:
+    from elsai_core.utilities.splitters import DocumentChunker
+
+    text = markdown_text(random.Random(1), megabytes)
+    chunker = DocumentChunker()
+    return lambda: chunker.chunk_markdown_header_wise(text, "benchmark.md")
+
+
+def bench_bm25(megabytes: float) -> Callable[[], None]:
+    # BM25Retriever imports rank_bm25 lazily; fail the setup rather than the timed call without it
+    importlib.import_module("rank_bm25")
+    from elsai_core.retrievers.hybrid_retriever import HybridRetriever
+
+    text = markdown_text(random.Random(1), megabytes)
+    chunks = [chunk for chunk in text.split("\n\n") if chunk.strip()]
+    retriever = HybridRetriever()
+    return lambda: retriever.hybrid_retrieve(chunks, [], "quarterly revenue growth and regulatory filings")
+
+
+def bench_rate_limit_memory() -> Callable[[], None]:
+    from Middleware.rate_limiter import SlidingWindowLimiter
+
+    keys = [f"10.0.{i // 256}.{i % 256}" for i in range(1000)]
+    rng = random.Random(0)
+    hits = [rng.choice(keys) for _ in range(10_000)]
+
+    def run():
+        limiter = SlidingWindowLimiter(100, 3600)
+        for key in hits:
+            limiter.hit(key)
+    return run
+
+
+def bench_rate_limit_sqlite(directory: str) -> Callable[[], None]:
+    from Middleware.rate_limiter import SQLiteRateLimitBackend
+
+    keys = [f"10.0.{i // 256}.{i % 256}" for i in range(1000)]
+    rng = random.Random(0)
+    hits = [rng.choice(keys) for _ in range(1000)]
+    backend = SQLiteRateLimitBackend(100, 3600, path=os.path.join(directory, "rate_limit.sqlite3"))
+
+    def run():
+        for key in hits:
+            backend.hit(key)
+    return run
+
+
+def bench_audit_log(directory: str) -> Callable[[], None]:
+    from Middleware.rate_limiter import AuditLogWriter
+
+    path = os.path.join(directory, "request_log.csv")
+    timestamp = datetime.utcnow()
+
+    def run():
+        with open(path, "w") as file:
+            file.write("timestamp,ip\n")
+        writer = AuditLogWriter(path, flush_interval=0.01)
+        for index in range(10_000):
+            writer.log(f"10.0.{index % 256}.1", timestamp)
+        writer.close()
+    return run
+
+
+def suite(runs: List[int], text_mb: List[float], directory: str) -> Dict[str, Callable[[], Callable[[], None]]]:
+    """Benchmark name -> setup returning the timed callable"""
+    benchmarks = {}
+    for count in runs:
+        benchmarks[f"pdf_markdown[runs={count}]"] = lambda count=count: bench_pdf_markdown(count)
+        benchmarks[f"docx_report[runs={count}]"] = lambda count=count: bench_docx_report(count)
+    for megabytes in text_mb:
+        size = f"{megabytes:g}"
+        benchmarks[f"chunk_pages[mb={size}]"] = lambda megabytes=megabytes: bench_chunk_pages(megabytes)
+        benchmarks[f"chunk_headers[mb={size}]"] = lambda megabytes=megabytes: bench_chunk_headers(megabytes)
+        benchmarks[f"bm25[mb={size}]"] = lambda megabytes=megabytes: bench_bm25(megabytes)
+    benchmarks["rate_limit_memory"] = bench_rate_limit_memory
+    benchmarks["rate_limit_sqlite"] = lambda: bench_rate_limit_sqlite(directory)
+    benchmarks["audit_log"] = lambda: bench_audit_log(directory)
+    return benchmarks
+
+
+def measure(fn: Callable[[], None], min_time: float, min_rounds: int, max_rounds: int) -> Dict:
+    """Round times of fn, repeated for min_rounds and until min_time has passed, or until max_rounds have run"""
+    rounds = []
+    while not rounds or ((len(rounds) < min_rounds or sum(rounds) < min_time) and len(rounds) < max_rounds):
+        started = time.perf_counter()
+        fn()
+        rounds.append(time.perf_counter() - started)
+    return {"min": round(min(rounds), 6), "median": round(statistics.median(rounds), 6), "rounds": len(rounds)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CPU-bound hot paths against a stored baseline")
+    parser.add_argument("--runs", default="1,10,100", help="Comma-separated run counts of the report benchmarks")
+    parser.add_argument("--text-mb", default="1,10", help="Comma-separated MB of text of the chunking and BM25 "
+                                                          "benchmarks (e.g. 1,10,100)")
+    parser.add_argument("--only", default=None, help="Run only benchmarks whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=3.0, help="Seconds to repeat each benchmark for")
+    parser.add_argument("--min-rounds", type=int, default=5, help="Rounds each benchmark runs at least")
+    parser.add_argument("--max-rounds", type=int, default=50, help="Rounds after which a benchmark stops")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Store the results as the baseline (merged into an existing one) instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Fail when a benchmark's median is this fraction slower than its baseline's")
+    parser.add_argument("--allow-missing-baseline", action="store_true",
+                        help="Report benchmarks without a baseline as new instead of failing")
+    args = parser.parse_args()
+
+    baseline = {"benchmarks": {}}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    machine = {"python": platform.python_version(), "machine": platform.machine(), "processor": platform.processor(),
+               "system": platform.system(), "cpus": os.cpu_count()}
+    if not args.save_baseline and baseline.get("machine") not in (None, machine):
+        print(f"Warning: the baseline was saved on a different machine ({baseline['machine']})\n")
+
+    results = {}
+    regressions = []
+    missing = []
+    print(f"{'benchmark':<26}{'min (ms)':>12}{'median (ms)':>13}{'rounds':>8}{'base med. (ms)':>15}{'change':>9}  status")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, setup in suite([int(value) for value in args.runs.split(",")],
+                                 [float(value) for value in args.text_mb.split(",")], directory).items():
+            if args.only and args.only not in name:
+                continue
+            try:
+                fn = setup()
+            except ImportError as e:
+                print(f"{name:<26}{'':>48}  skipped ({e.name or e} not installed)")
+                continue
+            result = measure(fn, args.min_time, args.min_rounds, args.max_rounds)
+            results[name] = result
+
+            previous = baseline["benchmarks"].get(name)
+            if previous is None:
+                reference, change, status = "", "", "new"
+                if not args.allow_missing_baseline and not args.save_baseline:
+                    status = "NO BASELINE"
+                    missing.append(name)
+            else:
+                ratio = result["median"] / previous["median"] - 1
+                if ratio > args.threshold and not args.save_baseline:
+                    # A regression has to show again in a second measurement, so a burst of load does not fail the suite
+                    retry = measure(fn, args.min_time, args.min_rounds, args.max_rounds)
+                    if retry["median"] < result["median"]:
+                        result = results[name] = retry
+                        ratio = result["median"] / previous["median"] - 1
+                reference, change = f"{previous['median'] * 1e3:.2f}", f"{ratio:+.1%}"
+                status = "ok"
+                if ratio > args.threshold and not args.save_baseline:
+                    status = "REGRESSED"
+                    regressions.append(name)
+            print(f"{name:<26}{result['min'] * 1e3:>12.2f}{result['median'] * 1e3:>13.2f}{result['rounds']:>8}"
+                  f"{reference:>15}{change:>9}  {status}")
+
+    if args.save_baseline:
+        baseline = {"machine": machine, "saved_at": datetime.now().isoformat(timespec="seconds"),
+                    "benchmarks": {**baseline["benchmarks"], **results}}
+        with open(args.baseline, "w") as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print(f"\nSaved {len(results)} benchmarks to {args.baseline}")
+        return
+
+    if missing:
+        print(f"\n{len(missing)} benchmark(s) have no baseline in {args.baseline}: {', '.join(missing)}")
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+    if missing or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
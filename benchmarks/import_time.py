@@ -0,0 +1,93 @@
+"""
+Cold-start import benchmark for the Streamlit app.
+
+Streamlit starts every session by executing ``streamlit_app.py`` in a fresh
+script run, so whatever the script imports at module level is paid before the
+first widget is drawn. This benchmark measures that cost in fresh interpreters
+for the module set the app used to import eagerly and for the set it imports
+now that report libraries and the pipeline are deferred.
+
+Usage:
+    python -m benchmarks.import_time --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules imported at the top of streamlit_app.py before imports were deferred
+EAGER_IMPORTS = [
+    "streamlit",
+    "FunctionTools.version_one.common",
+    "markdown",
+    "reportlab.lib.pagesizes",
+    "reportlab.platypus",
+    "reportlab.lib.styles",
+    "docx",
+    "bs4",
+]
+
+# Modules imported at the top of streamlit_app.py now
+DEFERRED_IMPORTS = [
+    "streamlit",
+]
+
+# The pipeline connects to Azure OpenAI and Tavily at import time; dummy values keep that offline
+DUMMY_ENV = {
+    "AZURE_OPENAI_API_KEY": "benchmark",
+    "AZURE_OPENAI_ENDPOINT": "https://benchmark.invalid",
+    "OPENAI_API_VERSION": "2024-02-01",
+    "TAVILY_API_KEY": "benchmark",
+}
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_imports(modules: list, repeat: int) -> list:
+    """
+    Imports the given modules in fresh interpreters and returns the wall time of each attempt.
+
+    Args:
+        modules (list): Module names to import
+        repeat (int): Number of fresh interpreters to start
+
+    Returns:
+        list: Import time in seconds for each attempt
+    """
+    code = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        + "".join(f"import {module}\n" for module in modules)
+        + "print(time.perf_counter() - start)\n"
+    )
+    env = {**os.environ, **{k: os.environ.get(k, v) for k, v in DUMMY_ENV.items()}}
+    timings = []
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=env,
+                                   capture_output=True, text=True, check=True)
+        timings.append(float(completed.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Streamlit app cold-start import time")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per configuration")
+    args = parser.parse_args()
+
+    results = {
+        "before (eager imports)": time_imports(EAGER_IMPORTS, args.repeat),
+        "after (deferred imports)": time_imports(DEFERRED_IMPORTS, args.repeat),
+    }
+
+    print(f"{'configuration':<28}{'median (s)':>12}{'min (s)':>12}{'max (s)':>12}")
+    for name, timings in results.items():
+        print(f"{name:<28}{statistics.median(timings):>12.3f}{min(timings):>12.3f}{max(timings):>12.3f}")
+
+    before = statistics.median(results["before (eager imports)"])
+    after = statistics.median(results["after (deferred imports)"])
+    print(f"\nCold-start import time reduced by {before - after:.3f}s ({(1 - after / before) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Load benchmark of the API middleware stack: BaseHTTPMiddleware vs pure ASGI,
+and the rate limit backends behind the pure ASGI stack.
+
+Starts a uvicorn server per middleware implementation and rate limit backend,
+each serving a plain JSON endpoint and a streaming endpoint (20 chunks, 5ms
+apart) behind the authentication and rate-limit middleware, and drives them
+with concurrent clients. The "base" stack re-creates the previous
+BaseHTTPMiddleware dispatch methods around the same license client and the
+in-memory rate limiter, so the comparison isolates the middleware style; the
+"asgi" stack runs once per --backends entry, so the cost of the shared SQLite
+backend is measured against the in-memory one. License validation uses a local
+stand-in transport and the rate limit is high enough never to reject.
+
+Reports requests/sec and p50/p99 latency, plus p99 time to first byte for the
+streaming endpoint.
+
+Usage:
+    python -m benchmarks.middleware_load --requests 3000 --concurrency 100
+    python -m benchmarks.middleware_load --backends memory sqlite
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STREAM_CHUNKS = 20
+STREAM_CHUNK_DELAY = 0.005
+
+
+def build_app(stack: str):
+    """Builds the benchmark app with the given middleware stack ("base" or "asgi")."""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+    from starlette.middleware.base import BaseHTTPMiddleware
+    from Middleware.license_client import LicenseClient
+    import Middleware.middleware as middleware
+
+    async def accept_all(request):
+        return httpx.Response(200, json={"status": "Success"})
+
+    middleware.license_client = LicenseClient(transport=httpx.MockTransport(accept_all))
+
+    class BaseAuthenticationMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request: Request, call_next):
+            if "authkey" not in request.headers:
+                return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+            if await middleware.license_client.validate(request.headers["authkey"]):
+                return await call_next(request)
+            return JSONResponse(status_code=401, content={"detail": "Invalid license key"})
+
+    class BaseRateLimitMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request: Request, call_next):
+            ip = request.client.host
+            if not middleware.rate_limiter.hit(ip):
+                return JSONResponse(status_code=429, content={"detail": "Rate limit exceeded. Try again later."})
+            middleware.log_request(ip)
+            start_time = time.perf_counter()
+            response = await call_next(request)
+            response.headers["X-Process-Time"] = str(time.perf_counter() - start_time)
+            return response
+
+    app = FastAPI()
+    if stack == "base":
+        app.add_middleware(BaseAuthenticationMiddleware)
+        app.add_middleware(BaseRateLimitMiddleware)
+    else:
+        app.add_middleware(middleware.AuthenticationMiddleware)
+        app.add_middleware(middleware.RateLimitMiddleware)
+
+    @app.get("/plain")
+    async def plain():
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for index in range(STREAM_CHUNKS):
+                yield f"data: chunk {index}\n\n"
+                await asyncio.sleep(STREAM_CHUNK_DELAY)
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return app
+
+
+def serve(stack: str, port: int) -> None:
+    import uvicorn
+    uvicorn.run(build_app(stack), host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def load(url: str, requests: int, concurrency: int) -> dict:
+    """Sends requests from concurrency workers and returns latency figures."""
+    latencies, first_bytes, errors = [], [], 0
+    remaining = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60, headers={"authkey": "benchmark"}) as client:
+
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                started = time.perf_counter()
+                first_byte = None
+                try:
+                    async with client.stream("GET", url) as response:
+                        async for _ in response.aiter_raw():
+                            if first_byte is None:
+                                first_byte = time.perf_counter() - started
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.TransportError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                first_bytes.append(first_byte or 0.0)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "rps": requests / wall,
+        "p50": statistics.median(latencies),
+        "p99": quantiles[98],
+        "ttfb_p99": statistics.quantiles(first_bytes, n=100)[98],
+        "errors": errors,
+    }
+
+
+def wait_until_ready(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/plain", headers={"authkey": "benchmark"}, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Benchmark server on port {port} did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare BaseHTTPMiddleware and pure ASGI middleware under load")
+    parser.add_argument("--requests", type=int, default=3000, help="Requests per endpoint and stack")
+    parser.add_argument("--concurrency", type=int, default=100, help="Concurrent client connections")
+    parser.add_argument("--backends", nargs="+", default=["memory", "sqlite"],
+                        help="Rate limit backends to run the pure ASGI stack with")
+    parser.add_argument("--serve", choices=["base", "asgi"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+
+    print(f"{args.requests} requests per endpoint, {args.concurrency} concurrent connections\n")
+    print(f"{'stack':<7}{'backend':<9}{'endpoint':<10}{'req/s':>10}{'p50 (ms)':>11}{'p99 (ms)':>11}"
+          f"{'ttfb p99 (ms)':>15}{'errors':>8}")
+    runs = [("base", "memory")] + [("asgi", backend) for backend in args.backends]
+    with tempfile.TemporaryDirectory() as tmp:
+        for stack, backend in runs:
+            env = {**os.environ, "RATE_LIMIT_BACKEND": backend, "RATE_LIMIT": str(10 ** 9),
+                   "RATE_LIMIT_DB": os.path.join(tmp, f"rate_limit_{stack}_{backend}.sqlite3")}
+            port = free_port()
+            # Run from a temporary directory so the audit log does not land in the repository
+            server = subprocess.Popen([sys.executable, "-m", "benchmarks.middleware_load", "--serve", stack,
+                                       "--port", str(port)], cwd=tmp, env={**env, "PYTHONPATH": REPO_ROOT})
+            try:
+                wait_until_ready(port)
+                for endpoint in ("plain", "stream"):
+                    result = asyncio.run(load(f"http://127.0.0.1:{port}/{endpoint}", args.requests, args.concurrency))
+                    print(f"{stack:<7}{backend:<9}{endpoint:<10}{result['rps']:>10.0f}{result['p50'] * 1e3:>11.1f}"
+                          f"{result['p99'] * 1e3:>11.1f}{result['ttfb_p99'] * 1e3:>15.1f}{result['errors']:>8}")
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
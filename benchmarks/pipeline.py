@@ -0,0 +1,130 @@
+"""
+End-to-end benchmark of the research pipeline against local API stand-ins.
+
+Starts the Perplexity, Tavily and Azure OpenAI stand-ins of benchmarks.standins
+and runs common_structure (the enhanced_research pipeline, or the basic one
+with --pipeline basic) for several companies in parallel at each query
+concurrency setting (PPLX_MAX_CONCURRENCY). Each setting runs in a fresh
+process so the shared query scheduler and HTTP clients start cold. No real API
+is called and nothing is billed.
+
+Reports, per setting, the batch wall time, throughput, failed runs, run time
+p50/max and the mean wall time of each pipeline phase, plus the requests the
+stand-ins served.
+
+Usage:
+    python -m benchmarks.pipeline --runs 4 --concurrency 1,4,8 --latency-scale 0.2
+    python -m benchmarks.pipeline --throttle-rate 0.05 --perplexity-latency lognormal:3:0.8
+"""
+from benchmarks.standins import add_standin_arguments, standin_arguments, standin_env, start_standin_process
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+import statistics
+import subprocess
+import argparse
+import json
+import time
+import sys
+import os
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROMPT = "Summarise the company's business model, leadership, recent financial performance and regulatory filings."
+
+
+def run_setting(runs: int, parallel_runs: int, pipeline: str, support_urls: int) -> Dict:
+    """Execute the runs in this process and return wall time, run times and mean phase times"""
+    from FunctionTools.version_one.common import common_structure
+
+    def one_run(index: int) -> Dict:
+        started = time.perf_counter()
+        try:
+            result = common_structure(company_name=f"Benchmark Company {index}", country="India",
+                                      prompt=PROMPT, enable_validation=pipeline == "enhanced",
+                                      support_urls=[f"https://example.com/company/{index}/page/{page}"
+                                                    for page in range(support_urls)] or None)
+        except Exception as e:
+            return {"ok": False, "seconds": time.perf_counter() - started, "error": str(e)[:200]}
+        return {"ok": True, "seconds": time.perf_counter() - started,
+                "phases": {name: stats["wall_seconds"]
+                           for name, stats in result["final_data"]["timings"]["phases"].items()}}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=parallel_runs) as executor:
+        results = list(executor.map(one_run, range(runs)))
+    wall = time.perf_counter() - started
+
+    phases = {}
+    for result in results:
+        for name, seconds in result.get("phases", {}).items():
+            phases.setdefault(name, []).append(seconds)
+    seconds = [result["seconds"] for result in results if result["ok"]]
+    return {
+        "wall_seconds": wall,
+        "failed": sum(not result["ok"] for result in results),
+        "errors": sorted({result["error"] for result in results if not result["ok"]}),
+        "run_p50": statistics.median(seconds) if seconds else 0.0,
+        "run_max": max(seconds, default=0.0),
+        "phases": {name: statistics.mean(values) for name, values in phases.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the research pipeline against local API stand-ins")
+    parser.add_argument("--runs", type=int, default=4, help="Research runs per concurrency setting")
+    parser.add_argument("--parallel-runs", type=int, default=None,
+                        help="Runs executed at the same time (default: all of them)")
+    parser.add_argument("--concurrency", default="1,4,8",
+                        help="Comma-separated PPLX_MAX_CONCURRENCY settings to compare")
+    parser.add_argument("--pipeline", choices=["enhanced", "basic"], default="enhanced",
+                        help="enhanced_research with validation, or the basic single-pass pipeline")
+    parser.add_argument("--support-urls", type=int, default=2, help="Support URLs extracted with Tavily per run")
+    add_standin_arguments(parser)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    parallel_runs = args.parallel_runs or args.runs
+
+    if args.worker:
+        print(json.dumps(run_setting(args.runs, parallel_runs, args.pipeline, args.support_urls)))
+        return
+
+    import httpx
+
+    standin, base_url = start_standin_process(standin_arguments(args))
+    try:
+        print(f"{args.runs} {args.pipeline} runs ({parallel_runs} at a time) per setting, "
+              f"latency scale {args.latency_scale}, error rate {args.error_rate}, throttle rate {args.throttle_rate}\n")
+        print(f"{'concurrency':>11}{'wall (s)':>10}{'runs/min':>10}{'failed':>8}{'run p50 (s)':>13}{'run max (s)':>13}")
+        phase_rows = []
+        for concurrency in [int(value) for value in args.concurrency.split(",")]:
+            env = {**os.environ, **standin_env(base_url), "PPLX_MAX_CONCURRENCY": str(concurrency),
+                   "PYTHONPATH": REPO_ROOT}
+            completed = subprocess.run([sys.executable, "-m", "benchmarks.pipeline", "--worker", "--runs", str(args.runs),
+                                        "--parallel-runs", str(parallel_runs), "--pipeline", args.pipeline,
+                                        "--support-urls", str(args.support_urls)],
+                                       cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+            if completed.returncode != 0:
+                print(completed.stderr[-2000:])
+                raise SystemExit(f"Benchmark worker for concurrency {concurrency} failed")
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            print(f"{concurrency:>11}{result['wall_seconds']:>10.1f}{args.runs / result['wall_seconds'] * 60:>10.1f}"
+                  f"{result['failed']:>8}{result['run_p50']:>13.1f}{result['run_max']:>13.1f}")
+            for error in result["errors"]:
+                print(f"{'':>11}failed: {error}")
+            phase_rows.append((concurrency, result["phases"]))
+
+        phases = list(dict.fromkeys(name for _, row in phase_rows for name in row))
+        print(f"\nMean phase wall time (s)\n{'concurrency':>11}" + "".join(f"{name[:18]:>20}" for name in phases))
+        for concurrency, row in phase_rows:
+            print(f"{concurrency:>11}" + "".join(f"{row.get(name, 0.0):>20.2f}" for name in phases))
+
+        stats = httpx.get(f"{base_url}/stats").json()
+        print("\nStand-in requests: " + ", ".join(f"{provider} {counts['requests']} ({counts['throttled']} throttled, "
+                                                  f"{counts['errors']} errors)" for provider, counts in stats.items()))
+    finally:
+        standin.terminate()
+        standin.wait()
+
+
+if __name__ == "__main__":
+    main()
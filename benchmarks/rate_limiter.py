@@ -0,0 +1,84 @@
+"""
+Per-request cost of the rate limiter as the request log grows.
+
+The previous RateLimitMiddleware scanned the whole request_log.csv to count an
+IP's recent requests and reopened the file to append a row on every request,
+so each request cost O(log size). The in-memory SlidingWindowLimiter with the
+batched AuditLogWriter does O(1) work per request regardless of how many rows
+the audit log already holds. This benchmark measures both at increasing log
+sizes (up to 1M rows by default) in a temporary directory.
+
+Usage:
+    python -m benchmarks.rate_limiter --rows 1000 10000 100000 1000000
+"""
+from Middleware.rate_limiter import SlidingWindowLimiter, AuditLogWriter
+from datetime import datetime, timedelta
+import argparse
+import tempfile
+import random
+import time
+import csv
+import os
+
+WINDOW_SECONDS = 3600
+
+
+def legacy_request(path: str, ip: str) -> None:
+    """The CSV scan and append the middleware used to run on every request"""
+    cutoff = datetime.utcnow() - timedelta(seconds=WINDOW_SECONDS)
+    count = 0
+    with open(path, mode='r') as file:
+        for row in csv.DictReader(file):
+            if row["ip"] == ip and datetime.fromisoformat(row["timestamp"]) > cutoff:
+                count += 1
+    with open(path, mode='a', newline='') as file:
+        csv.writer(file).writerow([datetime.utcnow().isoformat(), ip])
+
+
+def write_log(path: str, rows: int, ips: list) -> None:
+    now = datetime.utcnow()
+    with open(path, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["timestamp", "ip"])
+        writer.writerows([(now - timedelta(seconds=random.randint(0, 2 * WINDOW_SECONDS))).isoformat(),
+                          random.choice(ips)] for _ in range(rows))
+
+
+def time_per_request(fn, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    return (time.perf_counter() - started) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CSV-scan and in-memory rate limiting per request")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000],
+                        help="Request log sizes to measure")
+    parser.add_argument("--legacy-requests", type=int, default=5, help="Requests timed for the CSV scan")
+    parser.add_argument("--requests", type=int, default=100_000, help="Requests timed for the in-memory limiter")
+    args = parser.parse_args()
+
+    ips = [f"10.0.{i // 256}.{i % 256}" for i in range(1000)]
+    print(f"{'log rows':>10}{'csv scan (ms/req)':>20}{'in-memory (us/req)':>21}{'speedup':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f"request_log_{rows}.csv")
+            write_log(path, rows, ips)
+            legacy = time_per_request(lambda: legacy_request(path, random.choice(ips)), args.legacy_requests)
+
+            limiter = SlidingWindowLimiter(100, WINDOW_SECONDS)
+            audit_log = AuditLogWriter(path)
+
+            def request():
+                ip = random.choice(ips)
+                if limiter.hit(ip):
+                    audit_log.log(ip)
+
+            current = time_per_request(request, args.requests)
+            audit_log.close()
+            print(f"{rows:>10}{legacy * 1e3:>20.2f}{current * 1e6:>21.2f}{legacy / current:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
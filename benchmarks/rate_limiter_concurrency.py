@@ -0,0 +1,97 @@
+"""
+Correctness and throughput of the rate limit backends under multi-process load.
+
+Several processes, standing in for uvicorn/gunicorn workers, send requests for
+the same set of client IPs at once. With a limit of ``--limit`` requests per IP
+and a window longer than the run, exactly ``--limit`` requests per IP must be
+allowed in total, however the load is spread over the processes. The in-memory
+backend gives every process its own counters and lets through up to
+``processes * limit``; the SQLite backend shares them and must hit the limit
+exactly. Exits non-zero if a shared backend allows the wrong number.
+
+Usage:
+    python -m benchmarks.rate_limiter_concurrency --processes 8 --requests 5000
+"""
+from Middleware.rate_limiter import get_rate_limit_backend
+import multiprocessing
+import tempfile
+import argparse
+import random
+import time
+import sys
+import os
+
+# Backends whose counters are shared between processes
+SHARED_BACKENDS = {"sqlite"}
+
+
+def worker(backend_name: str, db_path: str, limit: int, ips: list, requests: int, start, results) -> None:
+    os.environ["RATE_LIMIT_DB"] = db_path
+    backend = get_rate_limit_backend(limit, 24 * 3600, name=backend_name)
+    start.wait()
+    allowed = {}
+    started = time.perf_counter()
+    for _ in range(requests):
+        ip = random.choice(ips)
+        if backend.hit(ip):
+            allowed[ip] = allowed.get(ip, 0) + 1
+    results.put((allowed, time.perf_counter() - started))
+
+
+def run(backend_name: str, processes: int, requests: int, limit: int, ips: list) -> dict:
+    context = multiprocessing.get_context("spawn")
+    start = context.Event()
+    results = context.Queue()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "rate_limit.sqlite3")
+        workers = [context.Process(target=worker, args=(backend_name, db_path, limit, ips, requests, start, results))
+                   for _ in range(processes)]
+        for process in workers:
+            process.start()
+        # Let every process build its backend before the clock starts
+        time.sleep(2)
+        started = time.perf_counter()
+        start.set()
+        outcomes = [results.get() for _ in workers]
+        wall = time.perf_counter() - started
+        for process in workers:
+            process.join()
+
+    allowed = {}
+    for per_ip, _ in outcomes:
+        for ip, count in per_ip.items():
+            allowed[ip] = allowed.get(ip, 0) + count
+    return {
+        "allowed": sum(allowed.values()),
+        "expected": limit * len(ips),
+        "max_per_ip": max(allowed.values(), default=0),
+        "throughput": processes * requests / wall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process rate limiter correctness and throughput")
+    parser.add_argument("--processes", type=int, default=8, help="Concurrent worker processes")
+    parser.add_argument("--requests", type=int, default=5000, help="Requests sent by each process")
+    parser.add_argument("--limit", type=int, default=100, help="Requests allowed per IP")
+    parser.add_argument("--ips", type=int, default=50, help="Distinct client IPs")
+    parser.add_argument("--backends", nargs="+", default=["memory", "sqlite"], help="Backends to compare")
+    args = parser.parse_args()
+
+    ips = [f"10.0.0.{i}" for i in range(args.ips)]
+    print(f"{args.processes} processes x {args.requests} requests, limit {args.limit} per IP, {args.ips} IPs\n")
+    print(f"{'backend':<10}{'allowed':>10}{'expected':>10}{'max/IP':>8}{'req/s':>12}  result")
+    failed = False
+    for name in args.backends:
+        result = run(name, args.processes, args.requests, args.limit, ips)
+        correct = result["allowed"] == result["expected"] and result["max_per_ip"] == args.limit
+        if name in SHARED_BACKENDS and not correct:
+            failed = True
+        verdict = "exact" if correct else "over limit" if result["allowed"] > result["expected"] else "under limit"
+        print(f"{name:<10}{result['allowed']:>10}{result['expected']:>10}{result['max_per_ip']:>8}"
+              f"{result['throughput']:>12.0f}  {verdict}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
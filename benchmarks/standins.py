@@ -0,0 +1,350 @@
+"""
+Local HTTP stand-ins for the Perplexity, Tavily and Azure OpenAI APIs.
+
+Serves the endpoints the pipeline calls, with the response shapes it parses:
+
+    POST /chat/completions                                  Perplexity chat completions
+    POST /search, POST /extract                             Tavily search and extract
+    POST /openai/deployments/{deployment}/chat/completions  Azure OpenAI, streamed or not
+    GET  /stats                                             requests, errors and throttles per provider
+
+Every response is delayed by a latency drawn from the provider's distribution:
+"fixed:SECONDS", "uniform:LOW:HIGH" or "lognormal:MEDIAN:SIGMA". A share of
+requests fail with 429 (throttle rate) or 500 (error rate). Azure answers are
+shaped by the prompt: a JSON question list for question generation, one line
+per item for gap and claim extraction, a SUPPORT_SCORE analysis for claim
+validation and report text otherwise.
+
+``standin_env`` returns the environment that points the pipeline at a running
+stand-in, and ``start_standin_process`` runs one in a subprocess so its threads
+do not compete with the pipeline under test for the GIL.
+
+Usage:
+    python -m benchmarks.standins --port 8900 --perplexity-latency lognormal:1.5:0.5 --throttle-rate 0.02
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List
+import subprocess
+import threading
+import tempfile
+import argparse
+import random
+import socket
+import json
+import math
+import sys
+import time
+import os
+import re
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROVIDERS = ("perplexity", "tavily", "azure")
+
+DEFAULT_LATENCY = {
+    "perplexity": "lognormal:1.5:0.5",
+    "tavily": "lognormal:0.8:0.4",
+    "azure": "lognormal:1.0:0.4",
+}
+
+DEFAULT_RESPONSE_CHARS = {
+    "perplexity": 3000,
+    "tavily": 1500,
+    "azure": 4000,
+}
+
+FILLER = ("The company reported steady growth across its core markets, expanded its partner network and "
+          "disclosed new regulatory filings covering its subsidiaries and recent acquisitions. ")
+
+
+def parse_latency(spec: str, scale: float = 1.0) -> Callable[[random.Random], float]:
+    """
+    Latency sampler for a distribution spec
+
+    Args:
+        spec: "fixed:SECONDS", "uniform:LOW:HIGH" or "lognormal:MEDIAN:SIGMA"
+        scale: Factor applied to every sampled latency
+
+    Returns:
+        callable: Takes a random.Random and returns seconds
+    """
+    kind, *params = spec.split(":")
+    values = [float(param) for param in params]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0] * scale
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(*values) * scale
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1]) * scale
+    raise ValueError(f"Invalid latency distribution '{spec}'. Use fixed:S, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA.")
+
+
+def filler_text(chars: int, prefix: str = "") -> str:
+    text = prefix + FILLER * (chars // len(FILLER) + 1)
+    return text[:max(chars, len(prefix))]
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the stand-in configuration and request counters."""
+    daemon_threads = True
+
+    def __init__(self, address, latency: Dict[str, str] = None, latency_scale: float = 1.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0, response_chars: Dict[str, int] = None,
+                 list_items: int = 10, seed: int = None):
+        super().__init__(address, StandInHandler)
+        latency = {**DEFAULT_LATENCY, **(latency or {})}
+        self.samplers = {provider: parse_latency(spec, latency_scale) for provider, spec in latency.items()}
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.response_chars = {**DEFAULT_RESPONSE_CHARS, **(response_chars or {})}
+        self.list_items = list_items
+        self.random = random.Random(seed)
+        self.stats = {provider: {"requests": 0, "errors": 0, "throttled": 0} for provider in PROVIDERS}
+        self.lock = threading.Lock()
+
+    def draw(self, provider: str):
+        """Count a request and return (latency, fault), fault being None, 429 or 500"""
+        with self.lock:
+            latency = self.samplers[provider](self.random)
+            roll = self.random.random()
+            fault = 429 if roll < self.throttle_rate else 500 if roll < self.throttle_rate + self.error_rate else None
+            stats = self.stats[provider]
+            stats["requests"] += 1
+            if fault == 429:
+                stats["throttled"] += 1
+            elif fault == 500:
+                stats["errors"] += 1
+        return latency, fault
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StandInServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/stats":
+            with self.server.lock:
+                self._json(200, self.server.stats)
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        path = self.path.split("?")[0]
+        azure = re.fullmatch(r"/openai/deployments/([^/]+)/chat/completions", path)
+        if path == "/chat/completions":
+            provider, respond = "perplexity", self._perplexity
+        elif path in ("/search", "/extract"):
+            provider, respond = "tavily", self._tavily_search if path == "/search" else self._tavily_extract
+        elif azure:
+            provider, respond = "azure", lambda body, latency: self._azure(body, latency, azure.group(1))
+        else:
+            self._json(404, {"error": f"no stand-in for {path}"})
+            return
+
+        latency, fault = self.server.draw(provider)
+        if fault == 429:
+            time.sleep(latency * 0.1)
+            self._json(429, {"error": {"code": "429", "message": "Rate limit exceeded"}}, {"Retry-After": "1"})
+            return
+        if fault == 500:
+            time.sleep(latency)
+            self._json(500, {"error": {"code": "500", "message": "Internal server error"}})
+            return
+        respond(body, latency)
+
+    def _json(self, status: int, payload, headers: Dict[str, str] = None) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _perplexity(self, body: Dict, latency: float) -> None:
+        time.sleep(latency)
+        question = body["messages"][-1]["content"]
+        content = filler_text(self.server.response_chars["perplexity"], f"Findings for: {question[-120:]}\n\n")
+        tokens = (len(question) + len(content)) // 4
+        self._json(200, {
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(question) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": tokens, "cost": {"total_cost": round(tokens * 1e-6, 6)}},
+            "citations": [f"https://example.com/source/{abs(hash(question)) % 1000}/{index}" for index in range(3)]
+        })
+
+    def _tavily_search(self, body: Dict, latency: float) -> None:
+        time.sleep(latency)
+        results = [{"url": f"https://example.com/result/{index}", "title": f"Result {index}",
+                    "content": filler_text(self.server.response_chars["tavily"], body.get("query", "") + ": ")}
+                   for index in range(int(body.get("max_results") or 2))]
+        self._json(200, {"query": body.get("query"), "results": results, "response_time": latency})
+
+    def _tavily_extract(self, body: Dict, latency: float) -> None:
+        time.sleep(latency)
+        urls = body.get("urls") or []
+        urls = [urls] if isinstance(urls, str) else urls
+        results = [{"url": url, "raw_content": filler_text(self.server.response_chars["tavily"], url + ": ")}
+                   for url in urls]
+        self._json(200, {"results": results, "failed_results": [], "response_time": latency})
+
+    def _azure(self, body: Dict, latency: float, deployment: str) -> None:
+        prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+        content = self._azure_content(prompt)
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                 "total_tokens": (len(prompt) + len(content)) // 4}
+        base = {"id": "chatcmpl-standin", "created": int(time.time()), "model": deployment}
+        if body.get("stream"):
+            self._azure_stream(base, content, usage, latency,
+                               (body.get("stream_options") or {}).get("include_usage", False))
+            return
+        time.sleep(latency)
+        self._json(200, {**base, "object": "chat.completion", "usage": usage, "choices": [
+            {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}]})
+
+    def _azure_content(self, prompt: str) -> str:
+        items = self.server.list_items
+        if '"questions"' in prompt:
+            return json.dumps({"questions": [f"Question {index + 1} about the company" for index in range(items)]})
+        if "SUPPORT_SCORE" in prompt:
+            return "SUPPORT_SCORE: 0.8\nEVIDENCE_TYPE: supporting\nREASONING: The sources agree with the claim."
+        if "one per line" in prompt:
+            return "\n".join(f"Item {index + 1} that needs more research" for index in range(items))
+        return filler_text(self.server.response_chars["azure"], "# Research Report\n\n")
+
+    def _azure_stream(self, base: Dict, content: str, usage: Dict, latency: float, include_usage: bool) -> None:
+        """Server-sent chunks: half the latency before the first token, the rest spread over the chunks"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        pieces = [content[index:index + 40] for index in range(0, len(content), 40)] or [""]
+        time.sleep(latency / 2)
+        for index, piece in enumerate(pieces):
+            chunk = {**base, "object": "chat.completion.chunk", "choices": [
+                {"index": 0, "delta": {"role": "assistant", "content": piece} if index == 0 else {"content": piece},
+                 "finish_reason": "stop" if index == len(pieces) - 1 else None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            time.sleep(latency / 2 / len(pieces))
+        if include_usage:
+            self.wfile.write(f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def standin_env(base_url: str) -> Dict[str, str]:
+    """
+    Environment pointing the pipeline at a stand-in, with caches and hedging off
+
+    Runs are recorded in a run history of their own, so stand-in latencies do
+    not end up in the history that estimates and budgets real runs.
+    """
+    return {
+        "PPLX_API_URL": f"{base_url}/chat/completions",
+        "PPLX_API_KEY": "standin",
+        "TAVILY_API_BASE_URL": base_url,
+        "TAVILY_API_KEY": "tvly-standin",
+        "AZURE_OPENAI_ENDPOINT": base_url,
+        "AZURE_OPENAI_API_KEY": "standin",
+        "OPENAI_API_VERSION": "2024-10-21",
+        "LLM_CACHE_ENABLED": "false",
+        "LLM_SEMANTIC_CACHE_ENABLED": "false",
+        "AZURE_OPENAI_HEDGING_ENABLED": "false",
+        "RESEARCH_HISTORY_PATH": os.path.join(tempfile.gettempdir(), "research_history_standin.sqlite3"),
+        "NO_PROXY": "127.0.0.1,localhost",
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_standin_process(args: List[str] = (), timeout: float = 30):
+    """
+    Start a stand-in server in a subprocess
+
+    Args:
+        args: Extra command line options, e.g. ["--throttle-rate", "0.05"]
+
+    Returns:
+        tuple: (subprocess.Popen, base URL)
+    """
+    import httpx
+
+    port = free_port()
+    process = subprocess.Popen([sys.executable, "-m", "benchmarks.standins", "--port", str(port), *args],
+                               cwd=REPO_ROOT)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base_url}/stats", timeout=1)
+            return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"Stand-in server on port {port} did not start")
+
+
+def add_standin_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options configuring the stand-ins, shared with the benchmarks that start them"""
+    for provider in PROVIDERS:
+        parser.add_argument(f"--{provider}-latency", default=DEFAULT_LATENCY[provider],
+                            help=f"Latency distribution of {provider} responses (default: {DEFAULT_LATENCY[provider]})")
+        parser.add_argument(f"--{provider}-chars", type=int, default=DEFAULT_RESPONSE_CHARS[provider],
+                            help=f"Characters per {provider} response (default: {DEFAULT_RESPONSE_CHARS[provider]})")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Factor applied to every latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--list-items", type=int, default=10,
+                        help="Questions, gap queries and claims returned by list-producing LLM calls")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed of latencies and faults")
+
+
+def standin_arguments(args: argparse.Namespace) -> List[str]:
+    """Command line options of a stand-in process from parsed add_standin_arguments options"""
+    options = []
+    for provider in PROVIDERS:
+        options += [f"--{provider}-latency", getattr(args, f"{provider}_latency"),
+                    f"--{provider}-chars", str(getattr(args, f"{provider}_chars"))]
+    options += ["--latency-scale", str(args.latency_scale), "--error-rate", str(args.error_rate),
+                "--throttle-rate", str(args.throttle_rate), "--list-items", str(args.list_items)]
+    if args.seed is not None:
+        options += ["--seed", str(args.seed)]
+    return options
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve local stand-ins for the Perplexity, Tavily and Azure OpenAI APIs")
+    parser.add_argument("--port", type=int, default=8900)
+    add_standin_arguments(parser)
+    args = parser.parse_args()
+
+    server = StandInServer(
+        ("127.0.0.1", args.port),
+        latency={provider: getattr(args, f"{provider}_latency") for provider in PROVIDERS},
+        latency_scale=args.latency_scale,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        response_chars={provider: getattr(args, f"{provider}_chars") for provider in PROVIDERS},
+        list_items=args.list_items,
+        seed=args.seed
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
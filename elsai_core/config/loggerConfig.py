@@ -3,14 +3,20 @@ import logging
 def setup_logger():
     """
     Sets up a logger with console output at INFO level.
+    The console handler is only added once, so repeated calls are cheap.
     Returns:
         logger (logging.Logger): Configured logger.
     """
     logger = logging.getLogger()
     logger.setLevel(logging.DEBUG)
 
+    # Reuse the console handler added by an earlier call
+    if any(getattr(handler, "_elsai_console", False) for handler in logger.handlers):
+        return logger
+
     # Console handler to log to terminal
     console_handler = logging.StreamHandler()
+    console_handler._elsai_console = True
     console_handler.setLevel(logging.INFO)
     # Create a formatter and set it for the handler
     formatter = logging.Formatter('%(levelname)s: %(message)s')
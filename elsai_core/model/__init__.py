@@ -1,7 +1,14 @@
 from .openai_connector import OpenAIConnector
 from .azure_openai_connector import AzureOpenAIConnector
+from .llm_cache import LLMResponseCache, CachedChatModel
+from .semantic_cache import SemanticLLMCache
+from .hedging import HedgedChatModel
 
 __all__ = [
     OpenAIConnector,
-    AzureOpenAIConnector
+    AzureOpenAIConnector,
+    LLMResponseCache,
+    CachedChatModel,
+    SemanticLLMCache,
+    HedgedChatModel
 ]
\ No newline at end of file
@@ -1,4 +1,8 @@
 from elsai_core.config.loggerConfig import setup_logger
+from elsai_core.model.llm_cache import CachedChatModel, get_llm_cache, llm_cache_enabled
+from elsai_core.model.semantic_cache import get_semantic_cache, semantic_cache_enabled
+from elsai_core.model.client_registry import get_or_create_client, get_http_client, get_http_async_client
+from elsai_core.model.hedging import HedgedChatModel, hedging_enabled
 import os
 from langchain_openai import AzureChatOpenAI
 from dotenv import load_dotenv
@@ -14,13 +18,42 @@ class AzureOpenAIConnector:
         self.azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT", None)  
         self.openai_api_version = os.getenv("OPENAI_API_VERSION", None)
         self.temperature = float(os.getenv("AZURE_OPENAI_TEMPERATURE", 0.1))
+        # Token usage on streamed responses needs an API version that supports stream_options
+        self.stream_usage = os.getenv("AZURE_OPENAI_STREAM_USAGE", "true").lower() in ("1", "true", "yes")
+        self.hedge_deployment = os.getenv("AZURE_OPENAI_HEDGE_DEPLOYMENT", None)
+        self.hedge_endpoint = os.getenv("AZURE_OPENAI_HEDGE_ENDPOINT", None)
+        self.hedge_api_key = os.getenv("AZURE_OPENAI_HEDGE_API_KEY", None)
 
-    def connect_azure_open_ai(self, deploymentname: str):
+    def _get_client(self, deploymentname: str, azure_endpoint: str, openai_api_key: str):
+        """Returns the shared AzureChatOpenAI client for a deployment and endpoint."""
+        client_key = ("azure", deploymentname, azure_endpoint, self.openai_api_version,
+                      self.temperature, self.stream_usage, openai_api_key)
+        return get_or_create_client(client_key, lambda: AzureChatOpenAI(
+                deployment_name=deploymentname,
+                openai_api_key=openai_api_key,
+                azure_endpoint=azure_endpoint,  
+                openai_api_version=self.openai_api_version,
+                temperature=self.temperature,
+                stream_usage=self.stream_usage,
+                http_client=get_http_client(),
+                http_async_client=get_http_async_client()
+            ))
+
+    def connect_azure_open_ai(self, deploymentname: str, use_cache: bool = None,
+                              use_semantic_cache: bool = None, hedge: bool = None):
         """
         Connects to the Azure OpenAI API using the provided model name.
 
         Args:
             deploymentname (str): The name of the OpenAI model to use.
+            use_cache (bool, optional): Serve repeated prompts from the persistent LLM
+                response cache. Defaults to the LLM_CACHE_ENABLED environment variable.
+            use_semantic_cache (bool, optional): Serve near-identical prompts for the same
+                company and country from the semantic cache. Defaults to the
+                LLM_SEMANTIC_CACHE_ENABLED environment variable.
+            hedge (bool, optional): Send a duplicate request to AZURE_OPENAI_HEDGE_DEPLOYMENT
+                (and/or AZURE_OPENAI_HEDGE_ENDPOINT) when the primary exceeds its latency
+                percentile. Defaults to the AZURE_OPENAI_HEDGING_ENABLED environment variable.
 
         Raises:
             ValueError: If the endpoint, API key, or model name is missing.
@@ -43,14 +76,30 @@ class AzureOpenAIConnector:
             raise ValueError("Model name is missing.")
 
         try:
-            llm = AzureChatOpenAI(
-                    deployment_name=deploymentname,
-                    openai_api_key=self.openai_api_key,
-                    azure_endpoint=self.azure_endpoint,  
-                    openai_api_version=self.openai_api_version,
-                    temperature=self.temperature
-                )
+            llm = self._get_client(deploymentname, self.azure_endpoint, self.openai_api_key)
+            if hedge is None:
+                hedge = hedging_enabled()
+            if hedge:
+                secondary = self._get_client(self.hedge_deployment or deploymentname,
+                                             self.hedge_endpoint or self.azure_endpoint,
+                                             self.hedge_api_key or self.openai_api_key)
+                primary = llm
+                hedge_key = ("azure-hedged", id(primary), id(secondary))
+                llm = get_or_create_client(hedge_key, lambda: HedgedChatModel(primary, secondary))
             self.logger.info(f"Successfully connected to Azure OpenAI model: {llm}")
+            if use_cache is None:
+                use_cache = llm_cache_enabled()
+            if use_semantic_cache is None:
+                use_semantic_cache = semantic_cache_enabled()
+            if use_cache or use_semantic_cache:
+                params = {
+                    "azure_endpoint": self.azure_endpoint,
+                    "openai_api_version": self.openai_api_version,
+                    "temperature": self.temperature
+                }
+                return CachedChatModel(llm, get_llm_cache() if use_cache else None, deploymentname,
+                                       params=params,
+                                       semantic_cache=get_semantic_cache() if use_semantic_cache else None)
             return llm
         except Exception as e:
             self.logger.error(f"Error connecting to Azure OpenAI: {e}")
@@ -0,0 +1,74 @@
+import os
+import threading
+import httpx
+
+_clients = {}
+_clients_lock = threading.Lock()
+_http_client = None
+_http_async_client = None
+_http_lock = threading.Lock()
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 100)),
+        max_keepalive_connections=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", 20)),
+        keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", 30))
+    )
+
+
+def _http_timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        float(os.getenv("LLM_HTTP_READ_TIMEOUT", 120)),
+        connect=float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", 10)),
+        pool=float(os.getenv("LLM_HTTP_POOL_TIMEOUT", 30))
+    )
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Returns the process-wide HTTP client shared by every LLM chat client.
+
+    Connection limits, keep-alive and timeouts come from the LLM_HTTP_* environment variables.
+    """
+    global _http_client
+    with _http_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(limits=_http_limits(), timeout=_http_timeout())
+        return _http_client
+
+
+def get_http_async_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide async HTTP client shared by every LLM chat client.
+    """
+    global _http_async_client
+    with _http_lock:
+        if _http_async_client is None:
+            _http_async_client = httpx.AsyncClient(limits=_http_limits(), timeout=_http_timeout())
+        return _http_async_client
+
+
+def get_or_create_client(key: tuple, factory):
+    """
+    Returns the chat client registered under key, building it with factory on first use.
+
+    Args:
+        key (tuple): Provider, deployment and every parameter the client was built with
+        factory (Callable): Zero-argument function that builds the client
+
+    Returns:
+        The cached chat client
+    """
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = factory()
+            _clients[key] = client
+        return client
+
+
+def clear_clients() -> None:
+    """Forgets every cached chat client, e.g. after credentials are rotated."""
+    with _clients_lock:
+        _clients.clear()
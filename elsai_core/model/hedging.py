@@ -0,0 +1,314 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from elsai_core.config.loggerConfig import setup_logger
+
+HEDGED_KEY = "llm_hedged"
+HEDGE_WINNER_KEY = "llm_hedge_winner"
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_HEDGE_MAX_WORKERS", 32)),
+                               thread_name_prefix="llm-hedge")
+
+
+class HedgedChatModel:
+    """
+    Sends a duplicate request to a secondary chat model when the primary is slow.
+
+    The hedge delay is the configured percentile of recent primary latencies (or
+    ``initial_delay`` until ``min_samples`` latencies have been observed). If the
+    primary has not answered by then, the same request goes to the secondary and
+    the first successful response wins.
+
+    ``ainvoke`` cancels the losing request. ``invoke`` runs both requests on worker
+    threads; a losing request that has not started is cancelled, but one already in
+    flight cannot be interrupted and its response is discarded when it arrives.
+
+    ``stream`` hedges on the time to the first chunk, with its own latency window:
+    the stream that produces a chunk first is streamed to the end and the other
+    is closed once its next chunk arrives.
+    """
+
+    def __init__(self, primary, secondary, percentile: float = None, min_samples: int = None,
+                 initial_delay: float = None, window: int = 200):
+        """
+        Args:
+            primary: Chat model that normally serves the request
+            secondary: Chat model on another deployment or endpoint used for the hedge
+            percentile (float, optional): Latency percentile that triggers a hedge. Defaults to LLM_HEDGE_PERCENTILE.
+            min_samples (int, optional): Latencies needed before the percentile is trusted. Defaults to LLM_HEDGE_MIN_SAMPLES.
+            initial_delay (float, optional): Hedge delay in seconds before enough samples exist. Defaults to LLM_HEDGE_INITIAL_DELAY.
+            window (int, optional): Number of recent primary latencies kept. Defaults to 200.
+        """
+        self.logger = setup_logger()
+        self.primary = primary
+        self.secondary = secondary
+        self.percentile = float(percentile if percentile is not None else os.getenv("LLM_HEDGE_PERCENTILE", 95))
+        self.min_samples = int(min_samples if min_samples is not None else os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))
+        self.initial_delay = float(initial_delay if initial_delay is not None
+                                   else os.getenv("LLM_HEDGE_INITIAL_DELAY", 15))
+        self._latencies = deque(maxlen=window)
+        self._first_chunk_latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "hedged": 0, "secondary_wins": 0, "latency_saved": 0.0}
+
+    def hedge_delay(self, first_chunk: bool = False) -> float:
+        """Returns how long to wait for the primary's response, or its first streamed chunk, before sending the hedge."""
+        with self._lock:
+            samples = sorted(self._first_chunk_latencies if first_chunk else self._latencies)
+        if not samples or len(samples) < self.min_samples:
+            return self.initial_delay
+        index = min(int(len(samples) * self.percentile / 100), len(samples) - 1)
+        return samples[index]
+
+    def _record_latency(self, latency: float, first_chunk: bool = False) -> None:
+        with self._lock:
+            (self._first_chunk_latencies if first_chunk else self._latencies).append(latency)
+
+    def _count(self, counter: str, amount=1) -> None:
+        with self._lock:
+            self._stats[counter] += amount
+
+    def invoke(self, input, config=None, **kwargs):
+        self._count("requests")
+        delay = self.hedge_delay()
+        # The hedge delay and latency run from when a worker thread starts the call, not while it waits
+        # for one; hedging a call that has not started would only add to a saturated pool
+        primary_started = _Started()
+        primary_future = _executor.submit(_timed, primary_started, self.primary.invoke, input, config, **kwargs)
+        primary_started.wait()
+        try:
+            response = primary_future.result(timeout=max(delay - primary_started.elapsed(), 0))
+            self._record_latency(primary_started.elapsed())
+            return response
+        except FutureTimeoutError:
+            pass
+
+        self._count("hedged")
+        self.logger.info("Primary LLM call exceeded %.2fs, sending hedged request.", delay)
+        secondary_future = _executor.submit(self.secondary.invoke, input, config, **kwargs)
+        pending = {primary_future, secondary_future}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                finished = time.perf_counter()
+                if future is primary_future:
+                    self._record_latency(finished - primary_started.at)
+                    secondary_future.cancel()
+                    return _mark_hedged(future.result(), "primary")
+
+                self._count("secondary_wins")
+                primary_future.cancel()
+                primary_future.add_done_callback(
+                    lambda f: self._on_primary_lost(f, primary_started, finished))
+                return _mark_hedged(future.result(), "secondary")
+        raise error
+
+    def _on_primary_lost(self, future, primary_started: "_Started", secondary_finished: float) -> None:
+        """Records the primary's latency and the time the hedge saved once the losing call ends."""
+        if future.cancelled() or future.exception() is not None:
+            return
+        primary_finished = time.perf_counter()
+        self._record_latency(primary_finished - primary_started.at)
+        self._count("latency_saved", primary_finished - secondary_finished)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        self._count("requests")
+        delay = self.hedge_delay()
+        started = time.perf_counter()
+        primary_task = asyncio.ensure_future(self.primary.ainvoke(input, config, **kwargs))
+        done, _ = await asyncio.wait({primary_task}, timeout=delay)
+        if done:
+            self._record_latency(time.perf_counter() - started)
+            return primary_task.result()
+
+        self._count("hedged")
+        self.logger.info("Primary LLM call exceeded %.2fs, sending hedged request.", delay)
+        secondary_task = asyncio.ensure_future(self.secondary.ainvoke(input, config, **kwargs))
+        pending = {primary_task, secondary_task}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                for other in pending:
+                    other.cancel()
+                if task is primary_task:
+                    self._record_latency(time.perf_counter() - started)
+                    return _mark_hedged(task.result(), "primary")
+                if primary_task in pending:
+                    # The cancelled primary's latency is at least the time it has run, which keeps the
+                    # slow calls that triggered hedges in the window instead of only the fast ones
+                    self._record_latency(time.perf_counter() - started)
+                self._count("secondary_wins")
+                return _mark_hedged(task.result(), "secondary")
+        raise error
+
+    def stream(self, input, config=None, **kwargs):
+        self._count("requests")
+        delay = self.hedge_delay(first_chunk=True)
+        events = queue.Queue()
+        primary = _StreamRun(self.primary, input, config, kwargs, events)
+        secondary = None
+        running = [primary]
+        primary.started.wait()
+        hedge_at = primary.started.at + delay
+        try:
+            # Wait for the first chunk, sending the hedge if the primary has not produced one by the delay
+            while True:
+                try:
+                    timeout = None if secondary is not None else max(hedge_at - time.perf_counter(), 0)
+                    run, chunk, error = events.get(timeout=timeout)
+                except queue.Empty:
+                    self._count("hedged")
+                    self.logger.info("Primary LLM stream had no chunk after %.2fs, sending hedged request.", delay)
+                    secondary = _StreamRun(self.secondary, input, config, kwargs, events)
+                    running.append(secondary)
+                    continue
+                if error is not None:
+                    running.remove(run)
+                    if not running or secondary is None:
+                        raise error
+                    continue
+                break
+
+            winner = run
+            if winner is not primary:
+                self._count("secondary_wins")
+            if primary in running:
+                # A losing primary has no chunk yet, so its elapsed time is a lower bound of its latency
+                self._record_latency(primary.elapsed(), first_chunk=True)
+            for other in running:
+                if other is not winner:
+                    other.cancel()
+            if chunk is None:
+                # The winner ended without producing a chunk
+                return
+            if secondary is not None:
+                chunk = _mark_hedged(chunk, "primary" if winner is primary else "secondary")
+            yield chunk
+
+            while True:
+                run, chunk, error = events.get()
+                if run is not winner:
+                    continue
+                if error is not None:
+                    raise error
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            # Also reached when the caller stops reading early
+            for run in running:
+                run.cancel()
+
+    def stats(self) -> dict:
+        """
+        Returns request count, hedge rate, how often the hedge won and latency saved.
+        Latency saved is measured on the ``invoke`` path, where the losing primary runs to completion.
+        """
+        current_delay = self.hedge_delay()
+        first_chunk_delay = self.hedge_delay(first_chunk=True)
+        with self._lock:
+            requests, hedged = self._stats["requests"], self._stats["hedged"]
+            return {
+                "requests": requests,
+                "hedged": hedged,
+                "hedge_rate": round(hedged / requests, 3) if requests else 0.0,
+                "secondary_wins": self._stats["secondary_wins"],
+                "latency_saved_seconds": round(self._stats["latency_saved"], 2),
+                "current_hedge_delay": round(current_delay, 2),
+                "current_first_chunk_hedge_delay": round(first_chunk_delay, 2)
+            }
+
+    def __getattr__(self, name):
+        return getattr(self.primary, name)
+
+
+class _Started:
+    """When a call submitted to the executor was picked up by a worker thread"""
+
+    def __init__(self):
+        self.at = None
+        self._event = threading.Event()
+
+    def mark(self) -> None:
+        self.at = time.perf_counter()
+        self._event.set()
+
+    def wait(self) -> None:
+        """Blocks until the call has started"""
+        self._event.wait()
+
+    def elapsed(self) -> float:
+        """Seconds since the call started, 0 while it waits for a worker thread"""
+        return time.perf_counter() - self.at if self.at is not None else 0.0
+
+
+def _timed(started: _Started, fn, *args, **kwargs):
+    """Calls fn, first marking when the call starts"""
+    started.mark()
+    return fn(*args, **kwargs)
+
+
+class _StreamRun:
+    """
+    Reads a chat model stream on a worker thread into a queue shared with the competing stream.
+
+    Each item is ``(run, chunk, error)``; a chunk and error of None mark the end of the stream.
+    """
+
+    def __init__(self, model, input, config, kwargs: dict, events: queue.Queue):
+        self.started = _Started()
+        self._stop = threading.Event()
+        self._events = events
+        self._future = _executor.submit(self._read, model, input, config, kwargs)
+
+    def _read(self, model, input, config, kwargs: dict) -> None:
+        self.started.mark()
+        try:
+            chunks = model.stream(input, config, **kwargs)
+            try:
+                for chunk in chunks:
+                    if self._stop.is_set():
+                        return
+                    self._events.put((self, chunk, None))
+            finally:
+                close = getattr(chunks, "close", None)
+                if close is not None:
+                    close()
+        except Exception as e:
+            self._events.put((self, None, e))
+            return
+        self._events.put((self, None, None))
+
+    def elapsed(self) -> float:
+        """Seconds since the stream started reading, 0 while it waits for a worker thread"""
+        return self.started.elapsed()
+
+    def cancel(self) -> None:
+        """Stops the stream at its next chunk, or before it starts"""
+        self._stop.set()
+        self._future.cancel()
+
+
+def _mark_hedged(response, winner: str):
+    """Tags a hedged response with the deployment that won."""
+    response.response_metadata[HEDGED_KEY] = True
+    response.response_metadata[HEDGE_WINNER_KEY] = winner
+    return response
+
+
+def hedging_enabled() -> bool:
+    """Returns True if AZURE_OPENAI_HEDGING_ENABLED turns hedged requests on."""
+    return os.getenv("AZURE_OPENAI_HEDGING_ENABLED", "false").lower() in ("1", "true", "yes")
@@ -0,0 +1,307 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, convert_to_messages
+from langchain_core.prompt_values import PromptValue
+from elsai_core.config.loggerConfig import setup_logger
+from elsai_core.model.semantic_cache import semantic_cache_excluded_phases
+
+CACHE_HIT_KEY = "llm_cache_hit"
+SIMILARITY_KEY = "llm_cache_similarity"
+LATENCY_SAVED_KEY = "llm_cache_latency_saved"
+UNLABELLED_PHASE = "unlabelled"
+
+
+class LLMResponseCache:
+    """
+    Persistent exact-match cache of chat completions backed by SQLite.
+
+    Entries are keyed on the deployment, the model parameters and the full message
+    content, expire after a TTL and are evicted least-recently-used once the cache
+    holds more than ``max_entries`` completions.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = None, ttl_seconds: float = None):
+        """
+        Args:
+            path (str, optional): SQLite file to store completions in. Defaults to LLM_CACHE_PATH.
+            max_entries (int, optional): Maximum number of stored completions. Defaults to LLM_CACHE_MAX_ENTRIES.
+            ttl_seconds (float, optional): Lifetime of a completion in seconds. Defaults to LLM_CACHE_TTL_SECONDS.
+        """
+        self.logger = setup_logger()
+        self.path = path or os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite3")
+        self.max_entries = int(max_entries if max_entries is not None else os.getenv("LLM_CACHE_MAX_ENTRIES", 5000))
+        self.ttl_seconds = float(ttl_seconds if ttl_seconds is not None
+                                 else os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(deployment: str, params: dict, messages: list) -> str:
+        """
+        Builds the cache key for a completion request.
+
+        Args:
+            deployment (str): Deployment or model name
+            params (dict): Model parameters that influence the completion
+            messages (list): (role, content) pairs of the request
+
+        Returns:
+            str: Hex digest identifying the request
+        """
+        payload = json.dumps({"deployment": deployment, "params": params, "messages": messages},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, phase: str = None):
+        """
+        Returns the stored completion for a key, or None if it is missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self._stats[phase or UNLABELLED_PHASE]["misses"] += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self._stats[phase or UNLABELLED_PHASE]["hits"] += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, response: dict) -> None:
+        """
+        Stores a completion and evicts the least recently used entries beyond max_entries.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(response, default=str), now, now)
+            )
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        """Removes every stored completion."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """
+        Returns process-wide hit and miss counts per pipeline phase.
+        """
+        with self._lock:
+            return summarize_cache_usage(self._stats)
+
+
+class CachedChatModel:
+    """
+    Wraps a LangChain chat model and serves repeated requests from the LLM caches.
+
+    The exact-match LLMResponseCache is consulted first. If a SemanticLLMCache is
+    attached and the call's ``config["metadata"]`` names a ``company_name`` and
+    ``country``, a miss falls through to a similarity search over past prompts for
+    that company and country, except in the phases LLM_SEMANTIC_CACHE_EXCLUDED_PHASES
+    names (synthesis and final_answer by default). The pipeline phase is read from
+    ``config["metadata"]["phase"]`` for hit-rate reporting. Pass ``use_cache=False``
+    to bypass both caches for a single call. Every other attribute is forwarded to
+    the wrapped model.
+    """
+
+    def __init__(self, llm, cache: LLMResponseCache, deployment: str, params: dict = None,
+                 semantic_cache=None):
+        self.llm = llm
+        self.cache = cache
+        self.deployment = deployment
+        self.params = params or {}
+        self.semantic_cache = semantic_cache
+
+    def invoke(self, input, config=None, *, use_cache: bool = True, **kwargs):
+        if not use_cache:
+            return self.llm.invoke(input, config, **kwargs)
+
+        lookup = self._lookup(input, config, kwargs)
+        if lookup["hit"] is not None:
+            return lookup["hit"]
+
+        started = time.perf_counter()
+        response = self.llm.invoke(input, config, **kwargs)
+        self._store(lookup, response, time.perf_counter() - started)
+        return response
+
+    def stream(self, input, config=None, *, use_cache: bool = True, **kwargs):
+        """
+        Streams the completion, yielding a cached completion as a single chunk.
+        """
+        if not use_cache:
+            yield from self.llm.stream(input, config, **kwargs)
+            return
+
+        lookup = self._lookup(input, config, kwargs)
+        if lookup["hit"] is not None:
+            hit = lookup["hit"]
+            yield AIMessageChunk(content=hit.content, response_metadata=hit.response_metadata)
+            return
+
+        started = time.perf_counter()
+        response = None
+        for chunk in self.llm.stream(input, config, **kwargs):
+            response = chunk if response is None else response + chunk
+            yield chunk
+        if response is not None:
+            self._store(lookup, response, time.perf_counter() - started)
+
+    def _lookup(self, input, config, kwargs) -> dict:
+        """Checks the exact and semantic caches and returns what is needed to store a miss."""
+        lookup_started = time.perf_counter()
+        metadata = (config or {}).get("metadata") or {}
+        lookup = {
+            "hit": None, "key": None, "embedding": None, "prompt_hash": None,
+            "phase": metadata.get("phase"),
+            "company_name": metadata.get("company_name"),
+            "country": metadata.get("country"),
+        }
+        messages = _message_pairs(input)
+
+        if self.cache is not None:
+            lookup["key"] = self.cache.make_key(self.deployment, {**self.params, **kwargs}, messages)
+            cached = self.cache.get(lookup["key"], phase=lookup["phase"])
+            if cached is not None:
+                lookup["hit"] = _cached_message(cached["content"], cached.get("response_metadata", {}),
+                                                cached.get("latency", 0.0) - (time.perf_counter() - lookup_started))
+                return lookup
+
+        lookup["semantic"] = bool(self.semantic_cache is not None and lookup["company_name"] and lookup["country"]
+                                  and lookup["phase"] not in semantic_cache_excluded_phases())
+        if lookup["semantic"]:
+            prompt_text = "\n".join(str(content) for _, content in messages)
+            lookup["embedding"] = self.semantic_cache.embed(prompt_text)
+            lookup["prompt_hash"] = self.semantic_cache.prompt_hash(prompt_text)
+            match = self.semantic_cache.search(lookup["embedding"], self.deployment, lookup["phase"],
+                                               lookup["company_name"], lookup["country"],
+                                               lookup_started=lookup_started, prompt_hash=lookup["prompt_hash"])
+            if match is not None:
+                lookup["hit"] = _cached_message(match.content, {SIMILARITY_KEY: round(match.similarity, 4)},
+                                                match.original_latency - (time.perf_counter() - lookup_started))
+        return lookup
+
+    def _store(self, lookup: dict, response, latency: float) -> None:
+        """Stores a fresh completion in the caches that missed."""
+        if lookup["key"] is not None:
+            self.cache.set(lookup["key"], {"content": response.content,
+                                           "response_metadata": response.response_metadata,
+                                           "latency": latency})
+        if lookup.get("semantic"):
+            self.semantic_cache.add(lookup["embedding"], self.deployment, lookup["phase"],
+                                    lookup["company_name"], lookup["country"], response.content, latency,
+                                    prompt_hash=lookup["prompt_hash"])
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+def _cached_message(content: str, response_metadata: dict, latency_saved: float) -> AIMessage:
+    """Builds the AIMessage returned for a cache hit."""
+    return AIMessage(
+        content=content,
+        response_metadata={**response_metadata, CACHE_HIT_KEY: True,
+                           LATENCY_SAVED_KEY: round(max(latency_saved, 0.0), 3)}
+    )
+
+
+def _message_pairs(input) -> list:
+    """Normalises chat model input into (role, content) pairs."""
+    if isinstance(input, str):
+        messages = [HumanMessage(content=input)]
+    elif isinstance(input, PromptValue):
+        messages = input.to_messages()
+    else:
+        messages = convert_to_messages(input)
+    return [(message.type, message.content) for message in messages]
+
+
+def is_cache_hit(response) -> bool:
+    """Returns True if the response was served from the LLM response cache."""
+    return bool(getattr(response, "response_metadata", {}).get(CACHE_HIT_KEY))
+
+
+def record_cache_usage(usage: dict, phase: str, response) -> None:
+    """
+    Counts a response as a cache hit or miss for the given phase.
+
+    Args:
+        usage (dict): Per-phase counters to update in place
+        phase (str): Pipeline phase that issued the call
+        response: Chat model response
+    """
+    counters = usage.setdefault(phase or UNLABELLED_PHASE, {"hits": 0, "misses": 0})
+    if not is_cache_hit(response):
+        counters["misses"] += 1
+        return
+    counters["hits"] += 1
+    metadata = response.response_metadata
+    counters["latency_saved"] = counters.get("latency_saved", 0.0) + metadata.get(LATENCY_SAVED_KEY, 0.0)
+    if SIMILARITY_KEY in metadata:
+        counters["semantic_hits"] = counters.get("semantic_hits", 0) + 1
+        counters["similarity_total"] = counters.get("similarity_total", 0.0) + metadata[SIMILARITY_KEY]
+
+
+def summarize_cache_usage(usage: dict) -> dict:
+    """
+    Adds hit rates, mean semantic similarity and latency saved to per-phase counters.
+    """
+    summary = {}
+    for phase, counters in usage.items():
+        total = counters["hits"] + counters["misses"]
+        semantic_hits = counters.get("semantic_hits", 0)
+        summary[phase] = {
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "hit_rate": round(counters["hits"] / total, 3) if total else 0.0,
+            "semantic_hits": semantic_hits,
+            "avg_similarity": round(counters.get("similarity_total", 0.0) / semantic_hits, 4) if semantic_hits else 0.0,
+            "latency_saved_seconds": round(counters.get("latency_saved", 0.0), 2)
+        }
+    return summary
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Returns the process-wide LLM response cache, creating it on first use."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMResponseCache()
+        return _shared_cache
+
+
+def llm_cache_enabled() -> bool:
+    """Returns True if LLM_CACHE_ENABLED turns the response cache on."""
+    return os.getenv("LLM_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
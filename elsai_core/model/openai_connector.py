@@ -1,4 +1,7 @@
 from elsai_core.config.loggerConfig import setup_logger
+from elsai_core.model.llm_cache import CachedChatModel, get_llm_cache, llm_cache_enabled
+from elsai_core.model.semantic_cache import get_semantic_cache, semantic_cache_enabled
+from elsai_core.model.client_registry import get_or_create_client, get_http_client, get_http_async_client
 import os
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
@@ -13,12 +16,18 @@ class OpenAIConnector:
         self.access_key = os.getenv("OPENAI_API_KEY", None)
         
 
-    def connect_open_ai(self, modelname: str="gpt-4o-mini"):
+    def connect_open_ai(self, modelname: str="gpt-4o-mini", use_cache: bool = None,
+                        use_semantic_cache: bool = None):
         """
         Connects to the OpenAI API using the provided model name.
 
         Args:
             modelname (str): The name of the OpenAI model to use.
+            use_cache (bool, optional): Serve repeated prompts from the persistent LLM
+                response cache. Defaults to the LLM_CACHE_ENABLED environment variable.
+            use_semantic_cache (bool, optional): Serve near-identical prompts for the same
+                company and country from the semantic cache. Defaults to the
+                LLM_SEMANTIC_CACHE_ENABLED environment variable.
 
         Raises:
             ValueError: If the access key or model name is missing.
@@ -32,11 +41,22 @@ class OpenAIConnector:
             raise ValueError("Model name is missing.")
 
         try:
-            llm = ChatOpenAI(
+            client_key = ("openai", modelname, self.access_key)
+            llm = get_or_create_client(client_key, lambda: ChatOpenAI(
                 openai_api_key = self.access_key, 
                 model_name= modelname, 
-            )
+                http_client=get_http_client(),
+                http_async_client=get_http_async_client()
+            ))
             self.logger.info(f"Successfully connected to OpenAI model: {llm}")
+            if use_cache is None:
+                use_cache = llm_cache_enabled()
+            if use_semantic_cache is None:
+                use_semantic_cache = semantic_cache_enabled()
+            if use_cache or use_semantic_cache:
+                return CachedChatModel(llm, get_llm_cache() if use_cache else None, modelname,
+                                       params={"temperature": llm.temperature},
+                                       semantic_cache=get_semantic_cache() if use_semantic_cache else None)
             return llm
         except Exception as e:
             self.logger.error(f"Error connecting to OpenAI: {e}")
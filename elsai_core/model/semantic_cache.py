@@ -0,0 +1,221 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+import numpy as np
+from elsai_core.config.loggerConfig import setup_logger
+
+# Keeps prompts comfortably inside the embedding model's input limit
+MAX_EMBEDDED_CHARS = 20000
+
+# Phases whose prompts carry a run's research context; they differ in what the
+# context says rather than in how they are phrased, so they only use the exact cache
+SEMANTIC_CACHE_EXCLUDED_PHASES = "synthesis,final_answer"
+
+
+@dataclass
+class SemanticMatch:
+    content: str
+    similarity: float
+    original_latency: float
+
+
+class SemanticLLMCache:
+    """
+    Local vector index of past prompts used to answer near-identical requests.
+
+    Prompts are normalised (case and whitespace), embedded with
+    AzureOpenAIEmbeddingModel and stored in SQLite together with their completion.
+    A lookup only considers entries for the same deployment, phase, company and
+    country, and returns the closest completion if its cosine similarity reaches
+    the configured threshold.
+
+    Only the first MAX_EMBEDDED_CHARS normalised characters are embedded. Longer
+    prompts are also stored with a hash of their full normalised text, and only
+    match an entry with the same hash, so prompts differing past the embedded
+    part never share a completion.
+    """
+
+    def __init__(self, embedding_model=None, path: str = None, threshold: float = None,
+                 max_entries: int = None, ttl_seconds: float = None):
+        """
+        Args:
+            embedding_model (optional): Object exposing embed_query(text). Defaults to AzureOpenAIEmbeddingModel().
+            path (str, optional): SQLite file holding the index. Defaults to LLM_SEMANTIC_CACHE_PATH.
+            threshold (float, optional): Minimum cosine similarity for a hit. Defaults to LLM_SEMANTIC_CACHE_THRESHOLD.
+            max_entries (int, optional): Maximum number of indexed prompts. Defaults to LLM_SEMANTIC_CACHE_MAX_ENTRIES.
+            ttl_seconds (float, optional): Lifetime of an entry in seconds. Defaults to LLM_CACHE_TTL_SECONDS.
+        """
+        self.logger = setup_logger()
+        if embedding_model is None:
+            from elsai_core.embeddings import AzureOpenAIEmbeddingModel
+            embedding_model = AzureOpenAIEmbeddingModel()
+        self.embedding_model = embedding_model
+        self.path = path or os.getenv("LLM_SEMANTIC_CACHE_PATH", ".llm_semantic_cache.sqlite3")
+        self.threshold = float(threshold if threshold is not None else os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", 0.95))
+        self.max_entries = int(max_entries if max_entries is not None
+                               else os.getenv("LLM_SEMANTIC_CACHE_MAX_ENTRIES", 5000))
+        self.ttl_seconds = float(ttl_seconds if ttl_seconds is not None
+                                 else os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "similarity_total": 0.0, "latency_saved": 0.0}
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS semantic_cache ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, deployment TEXT, phase TEXT, "
+                "company TEXT, country TEXT, embedding BLOB NOT NULL, content TEXT NOT NULL, "
+                "latency REAL NOT NULL, created_at REAL NOT NULL, prompt_hash TEXT)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(semantic_cache)")}
+            if "prompt_hash" not in columns:
+                self._conn.execute("ALTER TABLE semantic_cache ADD COLUMN prompt_hash TEXT")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS semantic_cache_scope "
+                "ON semantic_cache (deployment, phase, company, country)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def normalize(prompt: str) -> str:
+        """Lower-cases the prompt, collapses runs of whitespace and cuts it to MAX_EMBEDDED_CHARS."""
+        return re.sub(r"\s+", " ", prompt).strip().lower()[:MAX_EMBEDDED_CHARS]
+
+    @staticmethod
+    def prompt_hash(prompt: str):
+        """
+        Hash of the full normalised prompt if it is longer than what is embedded.
+
+        Returns:
+            str: Hex digest, or None if the whole prompt is embedded
+        """
+        normalized = re.sub(r"\s+", " ", prompt).strip().lower()
+        if len(normalized) <= MAX_EMBEDDED_CHARS:
+            return None
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def embed(self, prompt: str):
+        """
+        Embeds a normalised prompt.
+
+        Returns:
+            numpy.ndarray: Unit-length embedding, or None if embedding failed
+        """
+        vector = np.asarray(self.embedding_model.embed_query(self.normalize(prompt)), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if not vector.size or norm == 0:
+            return None
+        return vector / norm
+
+    def search(self, embedding, deployment: str, phase: str, company: str, country: str,
+               lookup_started: float = None, prompt_hash: str = None):
+        """
+        Finds the most similar stored prompt within the same scope.
+
+        Args:
+            embedding (numpy.ndarray): Unit-length embedding of the prompt
+            deployment (str): Deployment the completion must come from
+            phase (str): Pipeline phase of the request
+            company (str): Company the prompt is about
+            country (str): Country the prompt is about
+            lookup_started (float, optional): perf_counter() value when the lookup began, used for latency savings
+            prompt_hash (str, optional): prompt_hash() of the prompt, which a match must share
+
+        Returns:
+            SemanticMatch: The best match at or above the threshold, or None
+        """
+        with self._lock:
+            self._stats["lookups"] += 1
+            rows = self._conn.execute(
+                "SELECT embedding, content, latency FROM semantic_cache "
+                "WHERE deployment IS ? AND phase IS ? AND company = ? AND country = ? AND created_at >= ? "
+                "AND prompt_hash IS ?",
+                (deployment, phase, company.strip().lower(), country.strip().lower(),
+                 time.time() - self.ttl_seconds, prompt_hash)
+            ).fetchall()
+        if embedding is None or not rows:
+            return None
+
+        matrix = np.vstack([np.frombuffer(row[0], dtype=np.float32) for row in rows])
+        similarities = matrix @ embedding
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        if similarity < self.threshold:
+            return None
+
+        match = SemanticMatch(content=rows[best][1], similarity=similarity, original_latency=rows[best][2])
+        lookup_latency = time.perf_counter() - lookup_started if lookup_started else 0.0
+        with self._lock:
+            self._stats["hits"] += 1
+            self._stats["similarity_total"] += similarity
+            self._stats["latency_saved"] += max(match.original_latency - lookup_latency, 0.0)
+        return match
+
+    def add(self, embedding, deployment: str, phase: str, company: str, country: str,
+            content: str, latency: float, prompt_hash: str = None) -> None:
+        """
+        Indexes a completion and evicts the oldest entries beyond max_entries.
+        """
+        if embedding is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO semantic_cache (deployment, phase, company, country, embedding, content, latency, "
+                "created_at, prompt_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (deployment, phase, company.strip().lower(), country.strip().lower(),
+                 embedding.astype(np.float32).tobytes(), content, latency, time.time(), prompt_hash)
+            )
+            self._conn.execute(
+                "DELETE FROM semantic_cache WHERE id IN ("
+                "SELECT id FROM semantic_cache ORDER BY id DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        """Removes every indexed prompt."""
+        with self._lock:
+            self._conn.execute("DELETE FROM semantic_cache")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """
+        Returns process-wide lookup count, hit rate, mean hit similarity and latency saved.
+        """
+        with self._lock:
+            lookups, hits = self._stats["lookups"], self._stats["hits"]
+            return {
+                "lookups": lookups,
+                "hits": hits,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "avg_similarity": round(self._stats["similarity_total"] / hits, 4) if hits else 0.0,
+                "latency_saved_seconds": round(self._stats["latency_saved"], 2)
+            }
+
+
+_shared_semantic_cache = None
+_shared_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticLLMCache:
+    """Returns the process-wide semantic LLM cache, creating it on first use."""
+    global _shared_semantic_cache
+    with _shared_semantic_cache_lock:
+        if _shared_semantic_cache is None:
+            _shared_semantic_cache = SemanticLLMCache()
+        return _shared_semantic_cache
+
+
+def semantic_cache_excluded_phases() -> set:
+    """Returns the phases LLM_SEMANTIC_CACHE_EXCLUDED_PHASES keeps out of the semantic cache."""
+    phases = os.getenv("LLM_SEMANTIC_CACHE_EXCLUDED_PHASES", SEMANTIC_CACHE_EXCLUDED_PHASES)
+    return {phase.strip() for phase in phases.split(",") if phase.strip()}
+
+
+def semantic_cache_enabled() -> bool:
+    """Returns True if LLM_SEMANTIC_CACHE_ENABLED turns the semantic cache on."""
+    return os.getenv("LLM_SEMANTIC_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")